@@ -0,0 +1,249 @@
+"""
+Bounding volume hierarchy over axis aligned boxes, for spatial queries on
+brushes.
+"""
+import heapq
+import math
+from typing import Iterable, Sequence
+
+try:
+	from . import t3d
+except ImportError:
+	import t3d
+
+# Most boxes in a leaf.
+LEAF_SIZE:int=4
+
+Point=tuple[float,float,float]
+
+def brush_bounds(b:t3d.Brush)->tuple[Point,Point]:
+	"""
+	Bounding box of a Brush's transformed vertices.
+	Brushes without vertices get an empty box that nothing overlaps.
+	"""
+	matrix:list[list[float]]=b.get_matrix()
+	points:list[Point]=[t3d.transform_point(matrix,v.coords) for p in b.polygons for v in p.vertices]
+	if not points:
+		return (math.inf,)*3,(-math.inf,)*3
+	xs,ys,zs=zip(*points)
+	return (min(xs),min(ys),min(zs)),(max(xs),max(ys),max(zs))
+
+def _overlap(lo1:Point,hi1:Point,lo2:Point,hi2:Point)->bool:
+	return (lo1[0]<=hi2[0] and lo2[0]<=hi1[0] and lo1[1]<=hi2[1] and lo2[1]<=hi1[1]
+		and lo1[2]<=hi2[2] and lo2[2]<=hi1[2])
+
+def _union(boxes:Iterable[tuple[Point,Point]])->tuple[Point,Point]:
+	lows,highs=zip(*boxes)
+	return tuple(map(min,zip(*lows))),tuple(map(max,zip(*highs)))
+
+def _ray_hit(origin:Point,inverse:Point,lo:Point,hi:Point,max_distance:float)->float:
+	""" Distance along the ray to the box, or inf if missed. """
+	near:float=0.0
+	far:float=max_distance
+	for i in range(3):
+		if inverse[i]==math.inf or inverse[i]==-math.inf:
+			# Ray parallel to the slab.
+			if origin[i]<lo[i] or origin[i]>hi[i]:
+				return math.inf
+			continue
+		t1:float=(lo[i]-origin[i])*inverse[i]
+		t2:float=(hi[i]-origin[i])*inverse[i]
+		if t1>t2:
+			t1,t2=t2,t1
+		near=max(near,t1)
+		far=min(far,t2)
+		if near>far:
+			return math.inf
+	return near
+
+def _box_distance(point:Sequence[float],lo:Point,hi:Point)->float:
+	d:float=0.0
+	for i in range(3):
+		e:float=max(lo[i]-point[i],0.0,point[i]-hi[i])
+		d+=e*e
+	return d**0.5
+
+class BVH:
+	"""
+	Median split BVH stored in flat lists.
+	Item indices are positions in the list of boxes given to the constructor.
+	"""
+	# pylint:disable=too-many-instance-attributes
+	def __init__(self,boxes:Sequence[tuple[Point,Point]])->None:
+		self.boxes:list[tuple[Point,Point]]=list(boxes)
+		# Node data. Leaves have left==-1 and own items[start:start+count].
+		self.lo:list[Point]=[]
+		self.hi:list[Point]=[]
+		self.left:list[int]=[]
+		self.right:list[int]=[]
+		self.parent:list[int]=[]
+		self.start:list[int]=[]
+		self.count:list[int]=[]
+		self.items:list[int]=list(range(len(self.boxes)))
+		# Leaf node of every item.
+		self.leaf:list[int]=[0]*len(self.boxes)
+		self._build()
+
+	@classmethod
+	def from_brushes(cls,brushes:Iterable[t3d.Brush])->"BVH":
+		""" BVH of brush bounds. """
+		return cls([brush_bounds(b) for b in brushes])
+
+	def _node(self,parent:int,start:int,count:int)->int:
+		self.left.append(-1)
+		self.right.append(-1)
+		self.parent.append(parent)
+		self.start.append(start)
+		self.count.append(count)
+		return len(self.left)-1
+
+	def _build(self)->None:
+		if not self.boxes:
+			return
+		# Box centers per axis.
+		axes:list[list[float]]=[[(a[i]+b[i])*0.5 if a[i]<=b[i] else 0.0 for a,b in self.boxes] for i in range(3)]
+		stack:list[int]=[self._node(-1,0,len(self.items))]
+		while stack:
+			node:int=stack.pop()
+			start:int=self.start[node]
+			count:int=self.count[node]
+			if count<=LEAF_SIZE:
+				for i in self.items[start:start+count]:
+					self.leaf[i]=node
+				continue
+			# Split at the median along the longest axis of the centers.
+			members:list[int]=self.items[start:start+count]
+			extents:list[float]=[]
+			for values in axes:
+				v:list[float]=list(map(values.__getitem__,members))
+				extents.append(max(v)-min(v))
+			members.sort(key=axes[extents.index(max(extents))].__getitem__)
+			self.items[start:start+count]=members
+			half:int=count//2
+			self.left[node]=self._node(node,start,half)
+			self.right[node]=self._node(node,start+half,count-half)
+			stack+=(self.left[node],self.right[node])
+		# Children come after their parent, fit bounds from the last node up.
+		self.lo=[()]*len(self.left)
+		self.hi=[()]*len(self.left)
+		for node in reversed(range(len(self.left))):
+			self._fit(node)
+
+	def _fit(self,node:int)->None:
+		if self.left[node]<0:
+			self.lo[node],self.hi[node]=_union(self.boxes[i] for i in self._leaf_items(node))
+		else:
+			l:int=self.left[node]
+			r:int=self.right[node]
+			self.lo[node],self.hi[node]=_union(((self.lo[l],self.hi[l]),(self.lo[r],self.hi[r])))
+
+	def update(self,index:int,box:tuple[Point,Point])->None:
+		""" Change the box of one item and refit the nodes above it. """
+		self.boxes[index]=box
+		node:int=self.leaf[index]
+		while node>=0:
+			self._fit(node)
+			node=self.parent[node]
+
+	def _leaf_items(self,node:int)->list[int]:
+		s:int=self.start[node]
+		return self.items[s:s+self.count[node]]
+
+	def query_box(self,lo:Sequence[float],hi:Sequence[float])->list[int]:
+		""" Items whose box overlaps lo-hi, in ascending order. """
+		ret:list[int]=[]
+		if not self.items:
+			return ret
+		stack:list[int]=[0]
+		while stack:
+			node:int=stack.pop()
+			if not _overlap(self.lo[node],self.hi[node],lo,hi):
+				continue
+			if self.left[node]<0:
+				ret+=[i for i in self._leaf_items(node) if _overlap(*self.boxes[i],lo,hi)]
+			else:
+				stack+=(self.left[node],self.right[node])
+		ret.sort()
+		return ret
+
+	def query_ray(
+		self,
+		origin:Sequence[float],
+		direction:Sequence[float],
+		max_distance:float=math.inf
+		)->list[tuple[float,int]]:
+		"""
+		Items whose box the ray hits, as (distance,item) sorted by distance.
+		Distances are in units of direction's length.
+		"""
+		inverse:Point=tuple(1/d if d else math.inf for d in direction)
+		ret:list[tuple[float,int]]=[]
+		if not self.items:
+			return ret
+		stack:list[int]=[0]
+		while stack:
+			node:int=stack.pop()
+			if _ray_hit(origin,inverse,self.lo[node],self.hi[node],max_distance)==math.inf:
+				continue
+			if self.left[node]<0:
+				for i in self._leaf_items(node):
+					t:float=_ray_hit(origin,inverse,*self.boxes[i],max_distance)
+					if t!=math.inf:
+						ret.append((t,i))
+			else:
+				stack+=(self.left[node],self.right[node])
+		ret.sort()
+		return ret
+
+	def nearest(self,point:Sequence[float])->tuple[int,float]|None:
+		"""
+		Item whose box is closest to point and the distance to that box.
+		Distance is 0 inside a box. None if there are no items.
+		"""
+		if not self.items:
+			return None
+		best:tuple[int,float]|None=None
+		heap:list[tuple[float,int]]=[(_box_distance(point,self.lo[0],self.hi[0]),0)]
+		while heap:
+			d,node=heapq.heappop(heap)
+			if best and d>=best[1]:
+				break
+			if self.left[node]<0:
+				for i in self._leaf_items(node):
+					di:float=_box_distance(point,*self.boxes[i])
+					if not best or di<best[1]:
+						best=(i,di)
+			else:
+				for child in (self.left[node],self.right[node]):
+					heapq.heappush(heap,(_box_distance(point,self.lo[child],self.hi[child]),child))
+		return best
+
+	def overlap_pairs(self)->list[tuple[int,int]]:
+		""" All pairs of items with overlapping boxes, as sorted (i,j) with i<j. """
+		ret:list[tuple[int,int]]=[]
+		if not self.items:
+			return ret
+		stack:list[tuple[int,int]]=[(0,0)]
+		while stack:
+			a,b=stack.pop()
+			if a!=b and not _overlap(self.lo[a],self.hi[a],self.lo[b],self.hi[b]):
+				continue
+			a_leaf:bool=self.left[a]<0
+			b_leaf:bool=self.left[b]<0
+			if a_leaf and b_leaf:
+				items_a:list[int]=self._leaf_items(a)
+				items_b:list[int]=self._leaf_items(b)
+				for n,i in enumerate(items_a):
+					for j in (items_a[n+1:] if a==b else items_b):
+						if _overlap(*self.boxes[i],*self.boxes[j]):
+							ret.append((i,j) if i<j else (j,i))
+			elif a==b:
+				l:int=self.left[a]
+				r:int=self.right[a]
+				stack+=((l,l),(r,r),(l,r))
+			elif b_leaf or (not a_leaf and self.count[a]>=self.count[b]):
+				stack+=((self.left[a],b),(self.right[a],b))
+			else:
+				stack+=((a,self.left[b]),(a,self.right[b]))
+		ret.sort()
+		return ret
@@ -0,0 +1,361 @@
+"""
+CSG evaluator building the level surface from brushes, like UnrealEd's
+BSP rebuild.
+
+The world starts solid. Brushes are applied in file order: csg_subtract
+carves empty space and csg_add fills it again. Rather than growing one
+BSP tree for the whole level, every brush gets its own small BSP tree and
+each brush face is split by the trees of the brushes overlapping it.
+A face fragment is part of the result when no later brush contains it,
+and when the last earlier brush containing it left that place solid for
+a subtract brush, or empty for an add brush.
+Changing one brush only needs the brushes overlapping it to be redone.
+"""
+import math
+from collections import Counter
+from typing import Iterable, Sequence
+
+try:
+	from . import bvh, geometry, t3d
+except ImportError:
+	import bvh
+	import geometry
+	import t3d
+
+# Plane thickness for classifying points, in Unreal units.
+# Same as UnrealEd's THRESH_SPLIT_POLY_WITH_PLANE. Vertices of rotated or
+# hand edited brushes are seldom more coplanar than that.
+EPSILON:float=0.25
+# Distance vertices are welded within to pair up polygon edges.
+WELD_DISTANCE:float=0.1
+
+_COPLANAR,_FRONT,_BACK,_SPANNING=0,1,2,3
+
+Point=tuple[float,float,float]
+
+class Plane:
+	""" Plane with unit normal and distance w from the origin. """
+	__slots__=("normal","w")
+	def __init__(self,normal:Point,w:float)->None:
+		self.normal:Point=normal
+		self.w:float=w
+
+	@classmethod
+	def from_points(cls,points:Sequence[Point])->"Plane":
+		""" Plane of a polygon. """
+		normal:Point=geometry.polygon_normal(points)
+		return cls(normal,sum(geometry.dot(normal,p) for p in points)/len(points))
+
+class Fragment:
+	""" Convex polygon piece of a brush face. """
+	__slots__=("points","plane","brush","polygon")
+	def __init__(self,points:list[Point],plane:Plane,brush:int,polygon:int)->None:
+		self.points:list[Point]=points
+		self.plane:Plane=plane
+		# Index of the Brush and Polygon it comes from.
+		self.brush:int=brush
+		self.polygon:int=polygon
+
+	def derive(self,points:list[Point])->"Fragment":
+		""" Piece of this fragment. """
+		return Fragment(points,self.plane,self.brush,self.polygon)
+
+def split(plane:Plane,f:Fragment)->tuple[list[Fragment],list[Fragment],list[Fragment],list[Fragment]]:
+	"""
+	Split a fragment by a plane.
+	Return coplanar front, coplanar back, front and back pieces.
+	"""
+	normal:Point=plane.normal
+	types:list[int]=[]
+	polygon_type:int=0
+	for p in f.points:
+		t:float=normal[0]*p[0]+normal[1]*p[1]+normal[2]*p[2]-plane.w
+		kind:int=_BACK if t< -EPSILON else _FRONT if t>EPSILON else _COPLANAR
+		polygon_type|=kind
+		types.append(kind)
+	if polygon_type==_COPLANAR:
+		if geometry.dot(normal,f.plane.normal)>0:
+			return [f],[],[],[]
+		return [],[f],[],[]
+	if polygon_type==_FRONT:
+		return [],[],[f],[]
+	if polygon_type==_BACK:
+		return [],[],[],[f]
+	front:list[Point]=[]
+	back:list[Point]=[]
+	count:int=len(f.points)
+	for i in range(count):
+		j:int=(i+1)%count
+		ti:int=types[i]
+		tj:int=types[j]
+		vi:Point=f.points[i]
+		vj:Point=f.points[j]
+		if ti!=_BACK:
+			front.append(vi)
+		if ti!=_FRONT:
+			back.append(vi)
+		if (ti|tj)==_SPANNING:
+			d:Point=geometry.sub(vj,vi)
+			t=(plane.w-geometry.dot(normal,vi))/geometry.dot(normal,d)
+			v:Point=(vi[0]+d[0]*t,vi[1]+d[1]*t,vi[2]+d[2]*t)
+			front.append(v)
+			back.append(v)
+	return [],[],[f.derive(front)] if len(front)>=3 else [],[f.derive(back)] if len(back)>=3 else []
+
+class Node:
+	""" BSP tree node of a closed brush with outward facing planes. """
+	__slots__=("plane","front","back")
+	def __init__(self,fragments:list[Fragment])->None:
+		self.plane:Plane|None=None
+		self.front:Node|None=None
+		self.back:Node|None=None
+		if fragments:
+			self._build(fragments)
+
+	def _build(self,fragments:list[Fragment])->None:
+		self.plane=fragments[0].plane
+		front:list[Fragment]=[]
+		back:list[Fragment]=[]
+		# Coplanar pieces don't add planes.
+		for f in fragments[1:]:
+			_,_,fr,bk=split(self.plane,f)
+			front+=fr
+			back+=bk
+		if front:
+			self.front=Node(front)
+		if back:
+			self.back=Node(back)
+
+	def partition(self,f:Fragment,inside:list[Fragment],outside:list[Fragment])->None:
+		"""
+		Sort pieces of f into inside and outside of the solid.
+		Pieces on a face of the solid count as outside when facing the same
+		way, and as inside when facing the other way.
+		"""
+		if self.plane is None:
+			outside.append(f)
+			return
+		cf,cb,fr,bk=split(self.plane,f)
+		for piece in cf+fr:
+			if self.front:
+				self.front.partition(piece,inside,outside)
+			else:
+				outside.append(piece)
+		for piece in cb+bk:
+			if self.back:
+				self.back.partition(piece,inside,outside)
+			else:
+				inside.append(piece)
+
+class Solid:
+	""" A brush in world space, ready for CSG. """
+	__slots__=("csg","solid","faces","tree","bounds_min","bounds_max")
+	def __init__(self,index:int,b:t3d.Brush)->None:
+		self.csg:str=b.csg
+		# Non solid brushes add their faces where there is empty space.
+		self.solid:bool=False
+		matrix:list[list[float]]=b.get_matrix()
+		polygons:list[list[Point]]=[[t3d.transform_point(matrix,v.coords) for v in p.vertices] for p in b.polygons]
+		# Make faces point outward whatever the winding and scale sign.
+		if signed_volume(polygons)<0:
+			polygons=[p[::-1] for p in polygons]
+		self.faces:list[Fragment]=[Fragment(p,Plane.from_points(p),index,i)
+			for i,p in enumerate(polygons) if len(p)>=3 and geometry.polygon_normal(p)!=(0.0,0.0,0.0)]
+		# Sheets and open brushes can't tell inside from outside.
+		self.solid=not b.polyflags&t3d.PF_NOT_SOLID and is_closed(polygons)
+		self.tree:Node=Node(self.faces)
+		points:list[Point]=[x for p in polygons for x in p] or [(0.0,0.0,0.0)]
+		self.bounds_min:Point=tuple(min(x[i] for x in points)-EPSILON for i in range(3))
+		self.bounds_max:Point=tuple(max(x[i] for x in points)+EPSILON for i in range(3))
+
+	def partition(self,f:Fragment,inside:list[Fragment],outside:list[Fragment])->None:
+		""" Node.partition() skipping fragments outside the bounding box. """
+		for i in range(3):
+			lo:float=self.bounds_min[i]
+			hi:float=self.bounds_max[i]
+			if all(p[i]<lo for p in f.points) or all(p[i]>hi for p in f.points):
+				outside.append(f)
+				return
+		self.tree.partition(f,inside,outside)
+
+def signed_volume(polygons:Iterable[Sequence[Point]])->float:
+	""" Volume enclosed by polygons, negative if they face inward. """
+	volume:float=0.0
+	for p in polygons:
+		for i in range(1,len(p)-1):
+			volume+=geometry.dot(p[0],geometry.cross(p[i],p[i+1]))
+	return volume/6
+
+def _paired(edges:Iterable[tuple[int,int]])->bool:
+	""" True if every edge is matched by its reverse. """
+	count:Counter[tuple[int,int]]=Counter()
+	for a,b in edges:
+		count[a,b]+=1
+		count[b,a]-=1
+	return not any(count.values())
+
+def is_closed(polygons:Iterable[Sequence[Point]],distance:float=WELD_DISTANCE)->bool:
+	"""
+	True if every edge of polygons is matched by the reverse edge of
+	another, as for closed surfaces. Vertices closer than distance are
+	welded and edges split at the vertices lying on them, so T-junctions
+	still pair up.
+	"""
+	loops:list[list[Point]]=[list(p) for p in polygons]
+	points,remap=t3d.weld_vertices([x for p in loops for x in p],distance)
+	edges:list[tuple[int,int]]=[]
+	first:int=0
+	for p in loops:
+		loop:list[int]=remap[first:first+len(p)]
+		first+=len(p)
+		edges+=[(a,b) for a,b in zip(loop,loop[1:]+loop[:1]) if a!=b]
+	if not edges:
+		return False
+	if _paired(edges):
+		return True
+	used:list[int]=sorted(set(remap))
+	split:list[tuple[int,int]]=[]
+	for a,b in edges:
+		direction:Point=geometry.sub(points[b],points[a])
+		length:float=geometry.dot(direction,direction)
+		along:list[tuple[float,int]]=[]
+		for v in used:
+			offset:Point=geometry.sub(points[v],points[a])
+			t:float=geometry.dot(offset,direction)
+			if v not in (a,b) and 0<t<length:
+				side:Point=geometry.cross(offset,direction)
+				if geometry.dot(side,side)<=distance*distance*length:
+					along.append((t,v))
+		chain:list[int]=[a,*(v for _,v in sorted(along)),b]
+		split+=zip(chain,chain[1:])
+	return _paired(split)
+
+class CsgModel:
+	"""
+	Level surface built from brushes.
+	Call update() after changing one brush, then polygons() or
+	get_pydata() for the new surface.
+	"""
+	def __init__(self,brushes:Sequence[t3d.Brush])->None:
+		self.brushes:list[t3d.Brush]=list(brushes)
+		self.solids:list[Solid|None]=[self._solid(i,b) for i,b in enumerate(self.brushes)]
+		self.bvh:bvh.BVH=bvh.BVH([self._bounds(s) for s in self.solids])
+		self.surfaces:list[list[Fragment]]=[[] for _ in self.brushes]
+		self._evaluate(range(len(self.brushes)))
+
+	@staticmethod
+	def _solid(index:int,b:t3d.Brush)->Solid|None:
+		""" Solid for brushes taking part in CSG. """
+		if b.group=="cube" or b.csg not in ("csg_add","csg_subtract"):
+			return None
+		return Solid(index,b)
+
+	@staticmethod
+	def _bounds(solid:Solid|None)->tuple[Point,Point]:
+		""" Box of a solid for the BVH, empty if None. """
+		if solid is None:
+			return (math.inf,)*3,(-math.inf,)*3
+		return solid.bounds_min,solid.bounds_max
+
+	def overlapping(self,solid:Solid)->list[int]:
+		""" Indices of solids whose bounds overlap solid, in file order. """
+		return [i for i in self.bvh.query_box(solid.bounds_min,solid.bounds_max) if self.solids[i] is not solid]
+
+	def cutting(self,solid:Solid)->list[int]:
+		""" Indices of solid brushes whose bounds overlap solid, in file order. """
+		return [i for i in self.overlapping(solid) if self.solids[i].solid]
+
+	def update(self,index:int,b:t3d.Brush)->int:
+		"""
+		Replace the Brush at index and recompute the surfaces it affects.
+		Return the number of brushes evaluated.
+		"""
+		affected:set[int]={index}
+		old:Solid|None=self.solids[index]
+		if old and old.solid:
+			affected.update(self.overlapping(old))
+		self.brushes[index]=b
+		self.solids[index]=self._solid(index,b)
+		new:Solid|None=self.solids[index]
+		self.bvh.update(index,self._bounds(new))
+		if new and new.solid:
+			affected.update(self.overlapping(new))
+		self._evaluate(sorted(affected))
+		return len(affected)
+
+	def _evaluate(self,indices:Iterable[int])->None:
+		for k in indices:
+			self.surfaces[k]=self._surface(k)
+
+	def _surface(self,k:int)->list[Fragment]:
+		""" Visible pieces of the faces of brush k. """
+		solid:Solid|None=self.solids[k]
+		if solid is None:
+			return []
+		others:list[int]=self.cutting(solid)
+		later:list[int]
+		earlier:list[int]
+		if not solid.solid:
+			# Only what is there in the end matters.
+			later,earlier=[],others[::-1]
+		else:
+			later=[j for j in others if j>k]
+			earlier=[j for j in reversed(others) if j<k]
+		visible:list[Fragment]=[]
+		for face in solid.faces:
+			pieces:list[Fragment]=[face]
+			# Later brushes replace whatever they contain.
+			for j in later:
+				outside:list[Fragment]=[]
+				for piece in pieces:
+					self.solids[j].partition(piece,[],outside)
+				pieces=outside
+				if not pieces:
+					break
+			# The last earlier brush containing a piece decides what is there.
+			for j in earlier:
+				if not pieces:
+					break
+				outside=[]
+				inside:list[Fragment]=[]
+				for piece in pieces:
+					self.solids[j].partition(piece,inside,outside)
+				empty:bool=self.solids[j].csg=="csg_subtract"
+				if empty!=(solid.solid and solid.csg=="csg_subtract"):
+					visible+=inside
+				pieces=outside
+			# Pieces outside every earlier brush are in the initial solid.
+			if solid.solid and solid.csg=="csg_subtract":
+				visible+=pieces
+		return visible
+
+	def polygons(self)->list[Fragment]:
+		"""
+		Visible surface, facing empty space.
+		Subtract brush faces are reversed since they look inward.
+		"""
+		ret:list[Fragment]=[]
+		for k,surface in enumerate(self.surfaces):
+			flip:bool=self.brushes[k].csg=="csg_subtract"
+			ret+=[f.derive(f.points[::-1]) if flip else f for f in surface]
+		return ret
+
+	def get_pydata(self)->tuple[list[Point],list,list[list[int]],list[Fragment]]:
+		"""
+		Return data for bpy.types.Mesh.from_pydata(), with shared vertices,
+		and the fragments matching each face.
+		"""
+		fragments:list[Fragment]=self.polygons()
+		verts:list[Point]=[]
+		index:dict[tuple,int]={}
+		faces:list[list[int]]=[]
+		for f in fragments:
+			face:list[int]=[]
+			for p in f.points:
+				key:tuple=tuple(round(c,4) for c in p)
+				if key not in index:
+					index[key]=len(verts)
+					verts.append(p)
+				face.append(index[key])
+			faces.append(face)
+		return verts,[],faces,fragments
@@ -1,16 +1,29 @@
 """
 Exporter.
 """
+import json
 import math
 
 import bmesh
 import bpy
 from mathutils import Euler, Matrix, Vector,geometry
+import numpy
 
 try:
-	from .t3d import Brush, Polygon, Vertex
+	from . import geometry as t3d_geometry
+	from . import t3d_validate, textures
+	from .t3d import PF_NOT_SOLID, Brush, Polygon, Vertex, serialize_brushes_parallel, snap_brushes
+	from .t3d_validate import polygon_planes
 except ImportError:
-	from t3d import Brush, Polygon, Vertex
+	import geometry as t3d_geometry
+	import t3d_validate
+	import textures
+	from t3d import PF_NOT_SOLID, Brush, Polygon, Vertex, serialize_brushes_parallel, snap_brushes
+	from t3d_validate import polygon_planes
+
+# Distance from their plane above which polygons are repaired on export,
+# UnrealEd's THRESH_POINT_ON_PLANE.
+PLANAR_TOLERANCE:float=0.1
 
 DEBUG=0
 def _print(*_):
@@ -18,45 +31,68 @@ def _print(*_):
 if DEBUG:
 	_print=print
 
-TEXTURE_SIZE:float=256.0
+def mesh_polygons(o:'bpy.types.Object',scale_multiplier:float=1.0,cache:dict[tuple,list[Polygon]]|None=None)->list[Polygon]:
+	"""
+	Polygons of a mesh object in its local space.
+	cache: Polygons by mesh and materials, so linked duplicates and
+	instances of a mesh are only converted once. They share the Polygon
+	objects.
+	"""
+	materials:list=slot_materials(o)
+	# Materials can be linked to the object rather than the mesh.
+	key:tuple=(o.data.as_pointer(),*(m.name if m else "" for m in materials))
+	if cache is not None and key in cache:
+		return cache[key]
 
-def brush_from_object(o:'bpy.types.Object',scale_multiplier:float=1.0)->Brush|str:
-	""" Turn Blender Object into t3d.Brush. """
-
-	if o.type!="MESH":
-		_print(f"{o} is not a mesh.")
-		return ""
-
-	_print(f"Exporting {o.name}...")
+	# Polygon attributes kept by the importer.
+	texture_names,flags,pans=face_polygon_attributes(o.data)
 
 	bm:bmesh.types.BMesh=bmesh.new()
 	bm.from_mesh(o.data)
 
+	sizes:list[tuple[int,int]]=material_texture_sizes(o)
 	poly_list:list[Polygon]=[]
 	f:bmesh.types.BMFace
 	for f in bm.faces:
 		vertices:list[bmesh.types.BMVert]=[v for v in f.verts if isinstance(v,bmesh.types.BMVert)]
 		verts:list[Vertex]=[Vertex((Vector(v.co)*scale_multiplier).to_tuple()) for v in vertices]
 		poly=Polygon(verts)
-		# Texture name.
-		poly.texture=get_material_name(o,f.material_index)
+		# Original texture name, or the material's.
+		poly.texture=face_texture(materials,f.material_index,texture_names[f.index] if texture_names else "")
+		poly.flags=int(flags[f.index])
+		poly.pan=(int(pans[f.index,0]),int(pans[f.index,1]))
 		# Texture coordinates.
-		poly.origin,poly.u,poly.v=polygon_texture_transform(f,bm)
+		size:tuple[int,int]=sizes[f.material_index] if sizes else textures.DEFAULT_SIZE
+		poly.origin,poly.u,poly.v=map(tuple,polygon_texture_transform(f,bm,size,poly.pan))
 		# Add to the list.
 		poly_list.append(poly)
-	bm.to_mesh(o.data)
 	bm.free()
 
-	# Instance Brush with location and name.
-	brush=Brush(poly_list,o.location*scale_multiplier)
+	if cache is not None:
+		cache[key]=poly_list
+	return poly_list
+
+def brush_from_polygons(
+	o:'bpy.types.Object',
+	polygons:list[Polygon],
+	location:Vector,
+	rotation:Euler,
+	scale:Vector,
+	scale_multiplier:float=1.0
+	)->Brush:
+	"""
+	Brush placed by Blender location, rotation and scale, with o's properties.
+	Its values are plain tuples, formatted the same here and in workers.
+	"""
+	brush=Brush(list(polygons),tuple(location*scale_multiplier))
 	brush.actor_name=o.name.replace(" ","_")
 
 	# Rotation and scaling.
-	if o.rotation_euler!=Euler((0,0,0)):
-		brush.rotation=Vector(o.rotation_euler)*65536/math.tau
-		brush.rotation.xy=-brush.rotation.xy
-	if o.scale!=Vector((0,0,0)):
-		brush.mainscale=o.scale
+	if rotation!=Euler((0,0,0)):
+		roll,pitch,yaw=Vector(rotation)*65536/math.tau
+		brush.rotation=(-roll,-pitch,yaw)
+	if scale!=Vector((0,0,0)):
+		brush.mainscale=tuple(scale)
 
 	# Custom properties.
 	brush.csg=o.get("csg",brush.csg)
@@ -65,21 +101,296 @@ def brush_from_object(o:'bpy.types.Object',scale_multiplier:float=1.0)->Brush|st
 
 	return brush
 
-def export(object_list,scale_multiplier:float=1.0)->str:
+def brush_from_object(o:'bpy.types.Object',scale_multiplier:float=1.0,cache:dict[tuple,list[Polygon]]|None=None)->Brush|str:
+	""" Turn Blender Object into t3d.Brush. """
+
+	if o.type!="MESH":
+		_print(f"{o} is not a mesh.")
+		return ""
+
+	_print(f"Exporting {o.name}...")
+	polygons:list[Polygon]=mesh_polygons(o,scale_multiplier,cache)
+	return brush_from_polygons(o,polygons,o.location,o.rotation_euler,o.scale,scale_multiplier)
+
+def brushes_from_instances(
+	object_list,
+	scale_multiplier:float=1.0,
+	cache:dict[tuple,list[Polygon]]|None=None
+	)->list[Brush]:
+	"""
+	Brushes of the collection and geometry nodes instances made by objects
+	of object_list, found in the evaluated depsgraph. Each instance is a
+	brush of its own, named after the instancer and the instanced object.
+	"""
+	instancers:set[str]={o.name for o in object_list if o.is_instancer}
+	brushes:list[Brush]=[]
+	if not instancers:
+		# Don't walk every instance of the scene for nothing.
+		return brushes
+	numbers:dict[str,int]={}
+	depsgraph=bpy.context.evaluated_depsgraph_get()
+	for instance in depsgraph.object_instances:
+		if not instance.is_instance or instance.object.type!="MESH":
+			continue
+		if instance.object.get("t3d_proxy") or "t3d_brushes" in instance.object.data:
+			continue
+		parent=instance.parent.original if instance.parent else None
+		if parent is None or parent.name not in instancers:
+			continue
+		location,rotation,scale=instance.matrix_world.decompose()
+		brush:Brush=brush_from_polygons(instance.object,mesh_polygons(instance.object,scale_multiplier,cache),
+			location,rotation.to_euler(),scale,scale_multiplier)
+		name:str=f"{parent.name}_{instance.object.name}".replace(" ","_")
+		numbers[name]=numbers.get(name,0)+1
+		brush.actor_name=f"{name}_{numbers[name]}"
+		brushes.append(brush)
+	return brushes
+
+def brushes_from_merged_object(o:'bpy.types.Object',scale_multiplier:float=1.0)->list[Brush]:
+	"""
+	Split an object created by the merged import mode back into t3d.Brush.
+	Faces are grouped by their brush_index attribute and moved back to
+	brush space using the matrices from the "t3d_brushes" side table.
 	"""
-	Export objects to a T3D text.
+	table:list[dict]=json.loads(o.data["t3d_brushes"])
+	texture_names,flags,pans=face_polygon_attributes(o.data)
+	brush_indices:numpy.ndarray|None=face_attribute(o.data,"brush_index")
+	to_local:list[Matrix]=[Matrix(entry["matrix"]).inverted_safe()@o.matrix_world for entry in table]
+	poly_lists:list[list[Polygon]]=[[] for _ in table]
+
+	bm:bmesh.types.BMesh=bmesh.new()
+	bm.from_mesh(o.data)
+	uvmap=bm.loops.layers.uv.active
+	materials:list=slot_materials(o)
+	sizes:list[tuple[int,int]]=material_texture_sizes(o)
+	f:bmesh.types.BMFace
+	for f in bm.faces:
+		brush_index:int=int(brush_indices[f.index]) if brush_indices is not None else 0
+		verts:list[Vector]=[to_local[brush_index]@v.co for v in f.verts]
+		poly=Polygon([Vertex((v*scale_multiplier).to_tuple()) for v in verts])
+		# Original texture name, or the material's.
+		poly.texture=face_texture(materials,f.material_index,texture_names[f.index] if texture_names else "")
+		poly.flags=int(flags[f.index])
+		poly.pan=(int(pans[f.index,0]),int(pans[f.index,1]))
+		# Texture coordinates.
+		if uvmap and len(verts)>2:
+			uvs:list[Vector]=[x[uvmap].uv for x in f.loops[0:3]]
+			size:tuple[int,int]=sizes[f.material_index] if sizes else textures.DEFAULT_SIZE
+			poly.origin,poly.u,poly.v=map(tuple,export_uv(verts[0:3],uvs,geometry.normal(verts),size,poly.pan))
+		poly_lists[brush_index].append(poly)
+	bm.free()
+
+	brushes:list[Brush]=[]
+	for entry,poly_list in zip(table,poly_lists):
+		if not poly_list:
+			continue
+		brush=Brush(poly_list,[c*scale_multiplier for c in entry["location"]])
+		brush.actor_name=entry["name"]
+		brush.brush_name=entry["brush_name"]
+		brush.csg=entry["csg"]
+		brush.group=entry["group"]
+		brush.polyflags=entry["polyflags"]
+		brush.rotation=tuple(entry["rotation"])
+		brush.mainscale=tuple(entry["mainscale"])
+		brush.postscale=tuple(entry["postscale"])
+		brush.prepivot=tuple(c*scale_multiplier for c in entry["prepivot"])
+		brushes.append(brush)
+	return brushes
+
+def brushes_from_any_object(o:'bpy.types.Object',scale_multiplier:float=1.0,cache:dict[tuple,list[Polygon]]|None=None)->list[Brush]:
+	"""
+	Turn a Blender Object into zero, one or many t3d.Brush.
+	cache: See mesh_polygons.
+	"""
+	if o.get("t3d_proxy"):
+		print(f"blender_t3d: {o.name} is an import proxy, realize it to export it.")
+		return []
+	if o.type=="MESH" and "t3d_brushes" in o.data:
+		return brushes_from_merged_object(o,scale_multiplier)
+	brush:Brush|str=brush_from_object(o,scale_multiplier,cache)
+	return [brush] if brush else []
+
+def object_bounds(o:'bpy.types.Object')->tuple[tuple[float,float,float],tuple[float,float,float]]:
+	"""
+	World space bounding box of a mesh object's vertices.
+	Objects without vertices get an empty box.
+	"""
+	count:int=len(o.data.vertices)
+	if not count:
+		return (math.inf,)*3,(-math.inf,)*3
+	coords:numpy.ndarray=numpy.empty(count*3,dtype=numpy.float32)
+	o.data.vertices.foreach_get("co",coords)
+	matrix:numpy.ndarray=numpy.array(o.matrix_world)
+	world:numpy.ndarray=coords.reshape(-1,3)@matrix[:3,:3].T+matrix[:3,3]
+	return tuple(world.min(axis=0).tolist()),tuple(world.max(axis=0).tolist())
+
+def validate_objects(objects,tolerance:float=t3d_validate.TOLERANCE)->t3d_validate.ValidationReport:
+	"""
+	Check that mesh objects are closed convex brushes, reading their meshes
+	in bulk. Brushes of merged objects are checked one by one and named
+	after their actor. Non-solid brushes are only reported as such.
+	"""
+	coords:list[numpy.ndarray]=[]
+	polygon_counts:list[numpy.ndarray]=[]
+	brush_polygon_counts:list[numpy.ndarray]=[]
+	names:list[str]=[]
+	solid:list[bool]=[]
+	for o in objects:
+		mesh=o.data
+		positions:numpy.ndarray=numpy.empty(len(mesh.vertices)*3,dtype=numpy.float64)
+		mesh.vertices.foreach_get("co",positions)
+		loop_vertex:numpy.ndarray=numpy.empty(len(mesh.loops),dtype=numpy.int64)
+		mesh.loops.foreach_get("vertex_index",loop_vertex)
+		counts:numpy.ndarray=numpy.empty(len(mesh.polygons),dtype=numpy.int64)
+		mesh.polygons.foreach_get("loop_total",counts)
+		brush_indices:numpy.ndarray|None=face_attribute(mesh,"brush_index") if "t3d_brushes" in mesh else None
+		if brush_indices is None:
+			names.append(o.name)
+			solid.append(not o.get("polyflags",0)&PF_NOT_SOLID)
+			brush_polygon_counts.append(numpy.array([len(counts)]))
+		else:
+			# Group the faces of each brush.
+			table:list[dict]=json.loads(mesh["t3d_brushes"])
+			order:numpy.ndarray=numpy.argsort(brush_indices,kind="stable")
+			starts:numpy.ndarray=(numpy.cumsum(counts)-counts)[order]
+			counts=counts[order]
+			loop_vertex=loop_vertex[numpy.repeat(starts-(numpy.cumsum(counts)-counts),counts)+numpy.arange(len(loop_vertex))]
+			names+=[entry["name"] for entry in table]
+			solid+=[not entry["polyflags"]&PF_NOT_SOLID for entry in table]
+			brush_polygon_counts.append(numpy.bincount(brush_indices,minlength=len(table)))
+		coords.append(positions.reshape(-1,3)[loop_vertex])
+		polygon_counts.append(counts)
+	if not names:
+		return t3d_validate.ValidationReport([])
+	return t3d_validate.report_arrays(numpy.concatenate(coords),numpy.concatenate(polygon_counts),
+		numpy.concatenate(brush_polygon_counts),names,tolerance,solid=solid)
+
+def split_nonplanar(p:Polygon,tolerance:float=PLANAR_TOLERANCE)->list[Polygon]:
+	"""
+	Split a polygon along its shortest diagonal until every part is within
+	tolerance of its plane. Parts keep the texture and mapping.
+	"""
+	coords:numpy.ndarray=numpy.array([v.coords for v in p.vertices],dtype=numpy.float64)
+	def split(loop:list[int])->list[list[int]]:
+		if len(loop)<4 or polygon_planes(coords[loop],numpy.array([len(loop)]))[2][0]<=tolerance:
+			return [loop]
+		count:int=len(loop)
+		diagonals:list[tuple[int,int]]=[(i,j) for i in range(count) for j in range(i+2,count) if j-i<count-1]
+		i,j=min(diagonals,key=lambda d:float(numpy.sum((coords[loop[d[0]]]-coords[loop[d[1]]])**2)))
+		return split(loop[i:j+1])+split(loop[j:]+loop[:i+1])
+	parts:list[Polygon]=[]
+	for loop in split(list(range(len(p.vertices)))):
+		part=Polygon([Vertex(p.vertices[k].coords) for k in loop])
+		part.origin=p.origin
+		part.pan=p.pan
+		part.u=p.u
+		part.v=p.v
+		part.texture=p.texture
+		part.flags=p.flags
+		parts.append(part)
+	return parts
+
+def repair_nonplanar(brushes:list[Brush],method:str='SPLIT',tolerance:float=PLANAR_TOLERANCE)->dict[str,int]:
+	"""
+	Find polygons of brushes whose vertices are farther than tolerance from
+	their best fit plane, all brushes at once, and repair them in place.
+	method: 'SPLIT' along shortest diagonals, 'FLATTEN' to move vertices
+	onto the plane, 'NONE' to only count them.
+	Return counts for export statistics.
+	"""
+	# Instances of a mesh share polygons, check them once.
+	polygons:list[Polygon]=list({id(p):p for b in brushes for p in b.polygons if len(p.vertices)>3}.values())
+	if not polygons:
+		return {"polygons nonplanar":0}
+	counts:numpy.ndarray=numpy.fromiter((len(p.vertices) for p in polygons),dtype=numpy.int64,count=len(polygons))
+	coords:numpy.ndarray=numpy.array([v.coords for p in polygons for v in p.vertices],dtype=numpy.float64)
+	centroids,normals,deviations=polygon_planes(coords,counts)
+	bad:list[int]=numpy.flatnonzero(deviations>tolerance).tolist()
+	stats:dict[str,int]={"polygons nonplanar":len(bad)}
+	if method=='FLATTEN':
+		starts:numpy.ndarray=numpy.cumsum(counts)-counts
+		for k in bad:
+			points:numpy.ndarray=coords[starts[k]:starts[k]+counts[k]]
+			points=points-numpy.outer((points-centroids[k])@normals[k],normals[k])
+			polygons[k].vertices=[Vertex(tuple(c)) for c in points.tolist()]
+		stats["polygons flattened"]=len(bad)
+	elif method=='SPLIT':
+		parts:dict[int,list[Polygon]]={id(polygons[k]):split_nonplanar(polygons[k],tolerance) for k in bad}
+		if parts:
+			for b in brushes:
+				b.polygons=[q for p in b.polygons for q in parts.get(id(p),(p,))]
+		stats["polygons split"]=sum(len(x)-1 for x in parts.values())
+	return stats
+
+def export(
+	object_list,
+	scale_multiplier:float=1.0,
+	jobs:int=0,
+	merge_coplanar:bool=False,
+	stats:dict[str,int]|None=None,
+	nonplanar:str='NONE',
+	snap_distance:float=0.0
+	)->str:
+	"""
+	Export objects to a T3D text. Collection and geometry nodes instances
+	made by the objects are exported as brushes too.
+	jobs: Number of worker processes formatting the text, 0 to do it here.
+	merge_coplanar: Merge adjacent faces sharing plane and texture mapping.
+	stats: Optional dictionary receiving counts from the export stages.
+	nonplanar: What to do with polygons that aren't flat, see
+	repair_nonplanar.
+	snap_distance: Snap vertices and locations to this grid and drop the
+	faces it flattens, 0 to keep them as they are.
 	Return empty string if nothing was exported.
 	"""
 	# TODO: In a .T3D file, the first brush is the red brush.
 	# Perhaps insert dummy red brush for file export.
-	t3d_text:str="".join(str(brush_from_object(obj,scale_multiplier)) for obj in object_list)
+	stats=stats if stats is not None else {}
+	# Meshes used by several objects or instances are converted once.
+	cache:dict[tuple,list[Polygon]]={}
+	brushes:list[Brush]=[b for obj in object_list for b in brushes_from_any_object(obj,scale_multiplier,cache)]
+	brushes+=brushes_from_instances(object_list,scale_multiplier,cache)
+	stats["brushes"]=len(brushes)
+	stats["polygons"]=sum(len(b.polygons) for b in brushes)
+	if snap_distance>0:
+		stats.update(snap_brushes(brushes,snap_distance))
+		stats["polygons"]=sum(len(b.polygons) for b in brushes)
+	if nonplanar!='NONE':
+		stats.update(repair_nonplanar(brushes,nonplanar))
+		stats["polygons"]=sum(len(b.polygons) for b in brushes)
+	if merge_coplanar:
+		merged:dict[tuple[int,...],list[Polygon]]={}
+		for b in brushes:
+			key:tuple[int,...]=tuple(map(id,b.polygons))
+			if key not in merged:
+				merged[key]=t3d_geometry.merge_coplanar(b.polygons)
+			b.polygons=list(merged[key])
+		polygons_after:int=sum(len(b.polygons) for b in brushes)
+		stats["polygons merged"]=stats["polygons"]-polygons_after
+		stats["polygons"]=polygons_after
+	t3d_text:str
+	if jobs>0 and brushes:
+		# Everything that needs bpy happens here, workers only get plain data.
+		t3d_text=serialize_brushes_parallel([b.to_data() for b in brushes],jobs)
+	else:
+		t3d_text="".join(str(b) for b in brushes)
 	if t3d_text:
 		t3d_text=f"""Begin Map\n{t3d_text}End Map\n"""
 	return t3d_text
 
-def export_uv(verts:list[Vector],uvs:list[Vector],normal:Vector)->tuple:
-	""" Return Origin,TextureU,TextureV in tuple. """
-	uvs=[Vector((uv.x,1-uv.y))*TEXTURE_SIZE for uv in uvs]
+def export_uv(
+	verts:list[Vector],
+	uvs:list[Vector],
+	normal:Vector,
+	size:tuple[int,int]=textures.DEFAULT_SIZE,
+	pan:tuple[int,int]=(0,0)
+	)->tuple:
+	"""
+	Return Origin,TextureU,TextureV in tuple.
+	size: Width and height of the texture.
+	pan: Polygon Pan included in the UVs, left out of Origin.
+	"""
+	uvs=[Vector((uv.x*size[0]-pan[0],(1-uv.y)*size[1]-pan[1])) for uv in uvs]
 	verts=rotate_triangle_towards_normal(verts,Vector((0,0,1)))
 	_print("Rotated verts to XY plane:",verts)
 	#height=verts[0].z
@@ -105,9 +416,69 @@ def export_uv(verts:list[Vector],uvs:list[Vector],normal:Vector)->tuple:
 	o=rot@o.to_3d()
 	return o,tu,tv
 
-def get_material_name(obj,material_index:int)->str:
-	""" Get material name using index. """
-	return obj.data.materials[material_index].name if len(obj.data.materials)>0 else ""
+def slot_materials(obj)->list:
+	""" Material of each slot, linked to the object or its mesh. None for empty slots. """
+	return [slot.material for slot in obj.material_slots]
+
+def material_texture_sizes(obj)->list[tuple[int,int]]:
+	""" Texture width and height of each material slot, from image headers. """
+	return [textures.texture_size("",image_path=textures.material_image_path(mat)) for mat in slot_materials(obj)]
+
+def face_attribute(mesh:'bpy.types.Mesh',name:str)->numpy.ndarray|None:
+	""" Values of an integer face attribute read in bulk, None if there is none. """
+	attribute=mesh.attributes.get(name)
+	if not attribute or attribute.domain!='FACE' or attribute.data_type!='INT':
+		return None
+	values:numpy.ndarray=numpy.empty(len(mesh.polygons),dtype=numpy.int32)
+	attribute.data.foreach_get("value",values)
+	return values
+
+def face_polygon_attributes(mesh:'bpy.types.Mesh')->tuple[list[str]|None,numpy.ndarray,numpy.ndarray]:
+	"""
+	Texture names, Flags and (N,2) Pan of every face as kept by the importer.
+	Texture names are None if unknown, missing Flags and Pan are zero.
+	"""
+	count:int=len(mesh.polygons)
+	flags:numpy.ndarray|None=face_attribute(mesh,"flags")
+	pans:numpy.ndarray=numpy.zeros((count,2),dtype=numpy.int32)
+	for i,name in enumerate(("pan_u","pan_v")):
+		values:numpy.ndarray|None=face_attribute(mesh,name)
+		if values is not None:
+			pans[:,i]=values
+	return face_texture_names(mesh),flags if flags is not None else numpy.zeros(count,dtype=numpy.int32),pans
+
+def face_texture_names(mesh:'bpy.types.Mesh')->list[str]|None:
+	"""
+	Texture name of every face, from the texture_index attribute and the
+	"t3d_textures" table, or from the "texture" string layer written by
+	older versions. None if the mesh has neither.
+	"""
+	table:list[str]=json.loads(mesh.get("t3d_textures","[]"))
+	indices:numpy.ndarray|None=face_attribute(mesh,"texture_index")
+	if table and indices is not None:
+		return [table[i] if 0<=i<len(table) else "" for i in indices.tolist()]
+	if "texture" not in mesh.attributes:
+		return None
+	bm:bmesh.types.BMesh=bmesh.new()
+	bm.from_mesh(mesh)
+	layer=bm.faces.layers.string.get("texture")
+	names:list[str]|None=[f[layer].decode("utf-8") for f in bm.faces] if layer else None
+	bm.free()
+	return names
+
+def face_texture(materials:list,material_index:int,texture:str)->str:
+	"""
+	Texture name of a face.
+	materials: From slot_materials.
+	texture: Name kept by the importer, used while the face has no material
+	or still has that texture's material. Otherwise the face was given
+	another material and takes its name.
+	"""
+	found=materials[material_index] if material_index<len(materials) else None
+	material:str=found.name if found else ""
+	if texture and (not material or material.lower()==texture.lower()):
+		return texture
+	return material
 
 def normal_rotation(n1:Vector,n2:Vector)->Matrix:
 	""" Rotation matrix between normals n1 to n2. """
@@ -131,7 +502,12 @@ def normal_rotation(n1:Vector,n2:Vector)->Matrix:
 	r:Matrix=i+axis_skew*math.sin(theta)+axis_skew@axis_skew*(1-math.cos(theta))
 	return r
 
-def polygon_texture_transform(face:'bmesh.types.BMFace',mesh:'bmesh.types.BMesh')->tuple:
+def polygon_texture_transform(
+	face:'bmesh.types.BMFace',
+	mesh:'bmesh.types.BMesh',
+	size:tuple[int,int]=textures.DEFAULT_SIZE,
+	pan:tuple[int,int]=(0,0)
+	)->tuple:
 	""" Compute the Origin, TextureU, TextureV for a given face. """
 	points:list[bmesh.types.BMLoop]=face.loops[0:3]
 	if len(points)<2 or len(mesh.loops.layers.uv)==0:
@@ -140,7 +516,7 @@ def polygon_texture_transform(face:'bmesh.types.BMFace',mesh:'bmesh.types.BMesh'
 	uvmap=mesh.loops.layers.uv[0]
 	verts:list[Vector]=[x.vert.co for x in points] # type: ignore
 	uvs:list[Vector]=[x[uvmap].uv for x in points] # type: ignore
-	return export_uv(verts,uvs,face.normal)
+	return export_uv(verts,uvs,face.normal,size,pan)
 
 def rotate_triangle_towards_normal(points:list[Vector],n:Vector)->list:
 	""" Return points after plane is rotated towards n. """
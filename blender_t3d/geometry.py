@@ -0,0 +1,176 @@
+"""
+Geometry operations on t3d types.
+"""
+from typing import Sequence
+
+try:
+	from . import t3d
+except ImportError:
+	import t3d
+
+# UnrealEd's FPoly vertex limit.
+MAX_POLYGON_VERTICES:int=16
+
+def cross(a:Sequence[float],b:Sequence[float])->tuple[float,float,float]:
+	""" Cross product. """
+	return (a[1]*b[2]-a[2]*b[1],a[2]*b[0]-a[0]*b[2],a[0]*b[1]-a[1]*b[0])
+
+def dot(a:Sequence[float],b:Sequence[float])->float:
+	""" Dot product. """
+	return a[0]*b[0]+a[1]*b[1]+a[2]*b[2]
+
+def sub(a:Sequence[float],b:Sequence[float])->tuple[float,float,float]:
+	""" Difference a-b. """
+	return (a[0]-b[0],a[1]-b[1],a[2]-b[2])
+
+def polygon_normal(points:Sequence[Sequence[float]])->tuple[float,float,float]:
+	""" Unit normal by Newell's method. Zero vector for degenerate polygons. """
+	x=y=z=0.0
+	for i,p in enumerate(points):
+		q:Sequence[float]=points[(i+1)%len(points)]
+		x+=(p[1]-q[1])*(p[2]+q[2])
+		y+=(p[2]-q[2])*(p[0]+q[0])
+		z+=(p[0]-q[0])*(p[1]+q[1])
+	length:float=(x*x+y*y+z*z)**0.5
+	if length==0:
+		return (0.0,0.0,0.0)
+	return (x/length,y/length,z/length)
+
+def is_convex(points:Sequence[Sequence[float]],normal:Sequence[float],epsilon:float=1e-6)->bool:
+	""" True if no corner of the polygon turns against normal. """
+	for i,p in enumerate(points):
+		e1:tuple=sub(p,points[i-1])
+		e2:tuple=sub(points[(i+1)%len(points)],p)
+		if dot(cross(e1,e2),normal)< -epsilon*(dot(e1,e1)*dot(e2,e2))**0.5:
+			return False
+	return True
+
+def is_collinear(a:Sequence[float],b:Sequence[float],c:Sequence[float],epsilon:float=1e-6)->bool:
+	""" True if b lies on the line from a to c. """
+	e1:tuple=sub(b,a)
+	e2:tuple=sub(c,b)
+	n:tuple=cross(e1,e2)
+	return dot(n,n)<=(epsilon**2)*dot(e1,e1)*dot(e2,e2) and dot(e1,e2)>0
+
+def _point_key(coords:Sequence[float])->tuple[float,...]:
+	return tuple(round(c,4) for c in coords)
+
+def _merge_key(p:t3d.Polygon,normal:Sequence[float])->tuple:
+	"""
+	Hash key of the plane, material and texture mapping of a polygon.
+	Mappings are equal when TextureU/V match and the UV offsets they give
+	with Origin and Pan match, whatever the Origin point.
+	"""
+	origin:Sequence[float]=p.origin or (0,0,0)
+	u:tuple=tuple(p.u)
+	v:tuple=tuple(p.v)
+	return (
+		p.texture,
+		p.flags,
+		*(round(c*1e3) for c in normal),
+		round(dot(normal,p.vertices[0].coords)*1e2),
+		*(round(c*1e3) for c in u+v),
+		round((p.pan[0]-dot(origin,u))*1e2),
+		round((p.pan[1]-dot(origin,v))*1e2),
+		)
+
+def _join(a_loop:list,b_loop:list,a:tuple,b:tuple)->list:
+	"""
+	Join two loops sharing the edge a->b in a_loop and b->a in b_loop.
+	Return an empty list if the result would not be a simple loop.
+	"""
+	k:int=a_loop.index(b)
+	m:int=b_loop.index(a)
+	merged:list=a_loop[k:]+a_loop[:k]+(b_loop[m:]+b_loop[:m])[1:-1]
+	if len(set(merged))!=len(merged):
+		return []
+	return merged
+
+def merge_coplanar(
+	polygons:list[t3d.Polygon],
+	max_vertices:int=MAX_POLYGON_VERTICES
+	)->list[t3d.Polygon]:
+	"""
+	Merge adjacent polygons sharing a plane, texture, flags and texture
+	mapping into convex polygons of at most max_vertices.
+	Candidates are found by hashing planes, then by shared edges, so
+	polygons are never compared pairwise.
+	A merged polygon keeps the attributes and position of its first part.
+	"""
+	# pylint:disable=too-many-locals
+	groups:dict[tuple,list[int]]={}
+	normals:list[tuple[float,float,float]]=[]
+	for i,p in enumerate(polygons):
+		normal:tuple[float,float,float]=polygon_normal([v.coords for v in p.vertices])
+		normals.append(normal)
+		key:tuple=_merge_key(p,normal) if len(p.vertices)>=3 and normal!=(0.0,0.0,0.0) else (i,)
+		groups.setdefault(key,[]).append(i)
+
+	points:dict[tuple,list[float]]={}
+	loops:dict[int,list[tuple]]={}
+	for i,p in enumerate(polygons):
+		loop:list[tuple]=[]
+		for v in p.vertices:
+			k:tuple=_point_key(v.coords)
+			points.setdefault(k,v.coords)
+			loop.append(k)
+		loops[i]=loop
+
+	for members in groups.values():
+		if len(members)<2:
+			continue
+		# Directed edge to polygon.
+		edges:dict[tuple,int]={}
+		for i in members:
+			loop=loops[i]
+			for n,a in enumerate(loop):
+				edges[(a,loop[(n+1)%len(loop)])]=i
+		for i in members:
+			if i not in loops:
+				continue
+			merged_any:bool=True
+			while merged_any:
+				merged_any=False
+				loop=loops[i]
+				for n,a in enumerate(loop):
+					b:tuple=loop[(n+1)%len(loop)]
+					j:int|None=edges.get((b,a))
+					if j is None or j==i or j not in loops:
+						continue
+					merged:list[tuple]=_join(loop,loops[j],a,b)
+					# Drop corners made straight by the merge.
+					for corner in (a,b):
+						if corner in merged and len(merged)>3:
+							c:int=merged.index(corner)
+							if is_collinear(points[merged[c-1]],points[corner],points[merged[(c+1)%len(merged)]]):
+								merged.pop(c)
+					if not merged or len(merged)>max_vertices:
+						continue
+					if not is_convex([points[x] for x in merged],normals[i]):
+						continue
+					for old in (loop,loops[j]):
+						for m,x in enumerate(old):
+							edges.pop((x,old[(m+1)%len(old)]),None)
+					del loops[j]
+					loops[i]=merged
+					for m,x in enumerate(merged):
+						edges[(x,merged[(m+1)%len(merged)])]=i
+					merged_any=True
+					break
+
+	ret:list[t3d.Polygon]=[]
+	for i,p in enumerate(polygons):
+		if i not in loops:
+			continue
+		if loops[i]==[_point_key(v.coords) for v in p.vertices]:
+			ret.append(p)
+			continue
+		poly:t3d.Polygon=t3d.Polygon([t3d.Vertex(points[k]) for k in loops[i]])
+		poly.origin=p.origin
+		poly.pan=p.pan
+		poly.u=p.u
+		poly.v=p.v
+		poly.texture=p.texture
+		poly.flags=p.flags
+		ret.append(poly)
+	return ret
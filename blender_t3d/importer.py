@@ -1,33 +1,35 @@
 """
 Importer.
 """
+import json
 import math
+import queue
 import time
 import typing
 from pathlib import Path
 
-import bmesh
-from bmesh.types import BMLayerItem
 import bpy
 from bpy.types import Material, Mesh
-from mathutils import Euler, Vector
+from mathutils import Euler, Matrix, Vector
+import numpy
 
 try:
-	from . import t3d, t3d_parser
+	from . import csg, t3d, t3d_parser, textures
 except ImportError:
+	import csg
 	import t3d
 	import t3d_parser
+	import textures
 
-TEXTURE_SIZE:float=256.0
+CSG_PREVIEW_NAME:str="CSG Preview"
+# Import modes making proxies instead of full brushes.
+PROXY_MODES:tuple[str,...]=('PROXY_BOUNDS','PROXY_MESH')
+# Corners of a box as (x,y,z) bits, and its outward faces.
+BOX_CORNERS:numpy.ndarray=numpy.array([(i&1,i>>1&1,i>>2&1) for i in range(8)],dtype=numpy.int64)
+BOX_FACES:tuple[tuple[int,int,int,int],...]=((0,4,6,2),(1,3,7,5),(0,1,5,4),(2,6,7,3),(0,2,3,1),(4,5,7,6))
 
-def convert_uv(vertex:Vector,
-			   origin:Vector,
-			   texture_u:Vector,
-			   texture_v:Vector,
-			   pan:Vector)->Vector:
-	""" Calculate UV coordinates from T3D Vertex and Polygon attributes. """
-	v:Vector=vertex-origin
-	return Vector((v.dot(texture_u),v.dot(texture_v)))+pan
+# Last CSG model built per scene, with the T3D text of its brushes.
+_csg_models:dict[str,tuple[list[str],csg.CsgModel]]={}
 
 def find_material(name:str)->Material|None:
 	"""
@@ -39,90 +41,101 @@ def find_material(name:str)->Material|None:
 			return m
 	return None
 
-def material_index_by_name(obj,matname:str)->int:
+def create_image_material(name:str,path:str)->Material:
 	"""
-	Get material index using material name in object.
-	If material is not found on object, return 0.
+	Create a material showing an image file.
+	Blender reads the pixels when the image is first displayed.
+	"""
+	mat:Material=bpy.data.materials.new(name)
+	mat.use_nodes=True
+	mat.use_backface_culling=True
+	nodes=mat.node_tree.nodes
+	image_node=nodes.new("ShaderNodeTexImage")
+	image_node.image=bpy.data.images.load(path,check_existing=True)
+	image_node.extension='REPEAT'
+	bsdf=nodes.get("Principled BSDF")
+	if bsdf:
+		mat.node_tree.links.new(image_node.outputs["Color"],bsdf.inputs["Base Color"])
+	return mat
+
+def get_material(name:str,texture_index:dict[str,str]|None=None)->Material|None:
+	"""
+	Find the material of a texture.
+	If there is none and texture_index has an image for it, create one.
+	"""
+	mat:Material|None=find_material(name)
+	if mat or not texture_index:
+		return mat
+	path:str|None=textures.find_texture(texture_index,name)
+	return create_image_material(name,path) if path else None
+
+def brush_transforms(b:t3d.Brush)->tuple[Vector,Euler,Vector,Vector]:
+	"""
+	Blender location, rotation, scale and post scale of a Brush.
+	PrePivot is folded into the location, as in t3d.Brush.get_matrix().
+	"""
+	rotation:Vector=Vector(b.rotation or (0,0,0))*math.tau/65536
+	rotation.xy=-rotation.xy
+	location=Vector([row[3] for row in b.get_matrix()[:3]])
+	return location,Euler(rotation.to_tuple()),Vector(b.mainscale or (1,1,1)),Vector(b.postscale or (1,1,1))
+
+def brush_matrix(b:t3d.Brush)->Matrix:
+	""" Matrix taking Brush vertices to world space, same as create_object. """
+	return Matrix(b.get_matrix())
+
+def create_object(
+	collection:bpy.types.Collection,
+	b:t3d.Brush,
+	weld_distance:float=0.0,
+	texture_index:dict[str,str]|None=None
+	)->tuple[bpy.types.Object,set[str]]:
+	"""
+	Create blender object from t3d.Brush.
+	Faces get the integer attributes flags, pan_u, pan_v and texture_index,
+	indexing the mesh's "t3d_textures" JSON list of names.
+	weld_distance: Share vertices closer than that, 0 to keep one vertex
+	per polygon corner.
+	texture_index: Images to make missing materials from.
 	"""
-	mat_dict:dict[str,int]={mat.name: i for i, mat in enumerate(obj.data.materials)}
-	try:
-		ret:int=mat_dict[matname]
-		return ret
-	except KeyError:
-		return 0
-
-def create_object(collection:bpy.types.Collection,b:t3d.Brush)->tuple[bpy.types.Object,set[str]]:
-	""" Create blender object from t3d.Brush. """
-	# Keep track of missing materials for this object.
-	missing_materials:set[str]=set()
 	# Create mesh.
 	m:bpy.types.Mesh=bpy.data.meshes.new(b.actor_name)
-	m.from_pydata(*b.get_pydata())
+	m.from_pydata(*b.get_pydata(weld_distance))
 	# Create object.
 	o:bpy.types.Object=bpy.data.objects.new(b.actor_name,m)
-	# Location.
-	o.location=b.location or (0,0,0)
 	# Color by CSG (for ViewPort Shading in Object mode).
 	o.color=(1,0.5,0,1) if b.csg=="csg_subtract" else (0,0,1,1)
 	# Apply transforms.
-	mainscale=Vector(b.mainscale or (1,1,1))
-	pivot=Vector(b.prepivot or (0,0,0))
-	postscale=Vector(b.postscale or (1,1,1))
-	rotation:Vector|Euler=Vector(b.rotation or (0,0,0))*math.tau/65536
-	rotation.xy=-rotation.xy
-	rotation=Euler(rotation.to_tuple())
-
-	pivot.rotate(rotation)
-	pivot*=postscale*mainscale
-
+	location,rotation,mainscale,_=brush_transforms(b)
 	o.scale=mainscale
 	o.rotation_euler=rotation
-	o.location-=pivot
+	o.location=location
 
 	# TODO: Shear
 
-	bm:bmesh.types.BMesh=bmesh.new()
-	bm.from_mesh(m)
-	# Create UV layer.
-	uv_layer:bmesh.types.BMLayerItem=bm.loops.layers.uv.verify()
+	# Unique texture names in order of appearance.
+	texture_table:dict[str,int]={}
+	for p in b.polygons:
+		texture_table.setdefault(p.texture,len(texture_table))
+	face_texture:numpy.ndarray=numpy.array([texture_table[p.texture] for p in b.polygons],dtype=numpy.int64)
+	slots,sizes,missing_materials=add_texture_materials(m,texture_table,texture_index)
+	m.polygons.foreach_set("material_index",slots[face_texture].astype(numpy.int32))
+	# Loop positions. Welded vertices are shared and faces may have lost
+	# corners, so read them back from the mesh.
+	loop_totals:numpy.ndarray=numpy.empty(len(m.polygons),dtype=numpy.int32)
+	m.polygons.foreach_get("loop_total",loop_totals)
+	loop_vertex:numpy.ndarray=numpy.empty(len(m.loops),dtype=numpy.int32)
+	m.loops.foreach_get("vertex_index",loop_vertex)
+	coords:numpy.ndarray=numpy.empty(len(m.vertices)*3,dtype=numpy.float32)
+	m.vertices.foreach_get("co",coords)
+	loop_polygon:numpy.ndarray=numpy.repeat(numpy.arange(len(loop_totals)),loop_totals)
+	uvs:numpy.ndarray=texture_coordinates(b.polygons,coords.reshape(-1,3)[loop_vertex],loop_polygon,
+		sizes[face_texture[loop_polygon]])
+	m.uv_layers.new().data.foreach_set("uv",uvs.astype(numpy.float32).ravel())
 	# Polygon attributes.
-	texture_names:list[str]=[p.texture for p in b.polygons]
-	flags:list[int]=[p.flags for p in b.polygons]
-	layer_texture:BMLayerItem[bytes]=bm.faces.layers.string.get("texture") or bm.faces.layers.string.new("texture")
-	layer_flags:BMLayerItem[int]=bm.faces.layers.int.get("flags") or bm.faces.layers.int.new("flags")
-	i:int
-	face:bmesh.types.BMFace
-	for i,face in enumerate(bm.faces):
-		if texture_names[i]:
-			face[layer_texture]=bytes(str(texture_names[i]),'utf-8')
-			# Note: material names are case sensitive in Blender but
-			# not in UnrealEd.
-			scene_mat:Material|None=find_material(texture_names[i])
-			if scene_mat:
-				object_mesh_data:Mesh=typing.cast(Mesh,o.data)
-				# Add material to object if it's not there yet.
-				if not scene_mat.name in object_mesh_data.materials:
-					object_mesh_data.materials.append(scene_mat)
-				# Assign the face.
-				face.material_index=material_index_by_name(o,scene_mat.name)
-			else:
-				# Missing material.
-				missing_materials.add(texture_names[i])
-		face[layer_flags]=flags[i]
-		# UV coordinates.
-		poly:t3d.Polygon=b.polygons[i]
-		for loop in face.loops:
-			vert:Vector=loop.vert.co
-			tu=Vector(poly.u)
-			tv=Vector(poly.v)
-			origin=Vector(poly.origin)
-			pan=Vector(poly.pan)
-			loop[uv_layer].uv=convert_uv(vert,origin,tu,tv,pan)/TEXTURE_SIZE
-			# Fix orientation.
-			loop[uv_layer].uv*=Vector((1,-1))
-
-	bm.to_mesh(m)
-	bm.free()
+	set_face_attribute(m,"flags",numpy.array([p.flags for p in b.polygons]))
+	set_face_attribute(m,"texture_index",face_texture)
+	set_pan_attributes(m,b.polygons)
+	m["t3d_textures"]=json.dumps(list(texture_table))
 
 	collection.objects.link(o)
 	# PostScale requires applying previous transforms.
@@ -130,6 +143,8 @@ def create_object(collection:bpy.types.Collection,b:t3d.Brush)->tuple[bpy.types.
 		o.select_set(True)
 		bpy.context.view_layer.objects.active=o
 		bpy.ops.object.transform_apply(scale=True,rotation=True,location=False)
+		# Deselect, or later applies would bake its PostScale too.
+		o.select_set(False)
 		o.scale=b.postscale
 
 	# Keep Unreal stuff as Object Custom Properties.
@@ -139,42 +154,501 @@ def create_object(collection:bpy.types.Collection,b:t3d.Brush)->tuple[bpy.types.
 
 	return o,missing_materials
 
-def import_t3d_file(
-	context:bpy.types.Context,
-	filepath:str,
-	snap_vertices:bool,
-	snap_distance:float,
-	flip:bool
-	)->dict[str,list[str]]:
-	""" Import T3D file into scene. """
-	# Missing materials that will be reported.
+def create_proxy_object(
+	collection:bpy.types.Collection,
+	b:t3d.Brush,
+	source:str,
+	bounds:bool=False
+	)->bpy.types.Object:
+	"""
+	Create a cheap stand-in for a Brush: its polygons in world space
+	around its location, without UVs, materials or attributes.
+	bounds: Only make its bounding box.
+	The object keeps the source file and actor name so realize_proxies can
+	replace it with the full brush later.
+	"""
+	local:numpy.ndarray=numpy.array([v.coords for p in b.polygons for v in p.vertices],dtype=numpy.float64).reshape(-1,3)
+	counts:numpy.ndarray=numpy.array([len(p.vertices) for p in b.polygons],dtype=numpy.int64)
+	matrix:numpy.ndarray=numpy.array(b.get_matrix(),dtype=numpy.float64)
+	coords:numpy.ndarray=local@matrix[:3,:3].T+matrix[:3,3]
+	if bounds and len(coords):
+		corners:numpy.ndarray=numpy.where(BOX_CORNERS,coords.max(axis=0),coords.min(axis=0))
+		coords=corners[numpy.array(BOX_FACES).ravel()]
+		counts=numpy.full(len(BOX_FACES),4)
+	location:numpy.ndarray=matrix[:3,3]
+	m:Mesh=mesh_from_arrays(b.actor_name,coords-location,numpy.cumsum(counts)-counts)
+	o:bpy.types.Object=bpy.data.objects.new(b.actor_name,m)
+	o.location=location.tolist()
+	o.color=(1,0.5,0,1) if b.csg=="csg_subtract" else (0,0,1,1)
+	# Subtract brushes would hide what they cut into.
+	o.display_type='WIRE' if b.csg=="csg_subtract" else 'SOLID'
+	o["csg"]=b.csg
+	o["group"]=b.group
+	o["polyflags"]=b.polyflags
+	o["t3d_proxy"]='BOUNDS' if bounds else 'MESH'
+	o["t3d_source"]=source
+	o["t3d_actor"]=b.actor_name
+	collection.objects.link(o)
+	return o
+
+def realize_proxies(
+	objects:typing.Iterable[bpy.types.Object],
+	flip:bool=False,
+	snap_distance:float=0.0,
+	weld_distance:float=0.0,
+	texture_folder:str=""
+	)->tuple[list[bpy.types.Object],set[str],list[str]]:
+	"""
+	Replace proxies among objects with full brushes, parsing only their
+	actors from the source files. Other objects are ignored.
+	snap_distance: Snap vertices to this grid, 0 to keep them as they are.
+	Return the new objects, missing materials and actors not found.
+	"""
+	by_source:dict[str,dict[str,bpy.types.Object]]={}
+	for o in objects:
+		if o.get("t3d_proxy"):
+			by_source.setdefault(o["t3d_source"],{})[o["t3d_actor"]]=o
+	texture_index:dict[str,str]=textures.index_textures(texture_folder) if texture_folder and by_source else {}
+	realized:list[bpy.types.Object]=[]
 	missing_materials:set[str]=set()
-	# Parse T3D file.
-	brushes:list[t3d.Brush]=t3d_parser.t3d_open(filepath)
+	not_found:list[str]=[]
+	for source,proxies in by_source.items():
+		with open(source,"rb") as raw, t3d_parser.open_t3d(raw) as file:
+			brushes:list[t3d.Brush]=list(t3d_parser.iter_brushes(file,proxies.keys(),source))
+		for b in brushes:
+			proxy:bpy.types.Object|None=proxies.pop(b.actor_name,None)
+			if proxy is None:
+				continue
+			collections:list[bpy.types.Collection]=list(proxy.users_collection)
+			mesh:Mesh=typing.cast(Mesh,proxy.data)
+			bpy.data.objects.remove(proxy)
+			if mesh.users==0:
+				bpy.data.meshes.remove(mesh)
+			if snap_distance:
+				b.snap(snap_distance)
+			o,obj_missing_mats=create_object(collections[0],b,weld_distance,texture_index)
+			for c in collections[1:]:
+				c.objects.link(o)
+			if b.csg.lower()=="csg_subtract" and flip:
+				o.data.flip_normals()
+			o.select_set(True)
+			missing_materials.update(obj_missing_mats)
+			realized.append(o)
+		not_found+=proxies
+	print(f"blender_t3d: Realized {len(realized)} proxies from {len(by_source)} files.")
+	return realized,missing_materials,not_found
+
+def mesh_from_arrays(name:str,coords:numpy.ndarray,loop_starts:numpy.ndarray)->Mesh:
+	"""
+	Create a mesh in one bulk write.
+	coords: (N,3) vertex positions, one vertex per loop.
+	loop_starts: First loop of every face, faces are contiguous.
+	"""
+	m:Mesh=bpy.data.meshes.new(name)
+	m.vertices.add(len(coords))
+	m.vertices.foreach_set("co",coords.astype(numpy.float32).ravel())
+	m.loops.add(len(coords))
+	m.loops.foreach_set("vertex_index",numpy.arange(len(coords),dtype=numpy.int32))
+	m.polygons.add(len(loop_starts))
+	m.polygons.foreach_set("loop_start",loop_starts.astype(numpy.int32))
+	if bpy.app.version<(4,0,0):
+		loop_totals:numpy.ndarray=numpy.diff(numpy.append(loop_starts,len(coords)))
+		m.polygons.foreach_set("loop_total",loop_totals.astype(numpy.int32))
+	m.update(calc_edges=True)
+	return m
+
+def set_face_attribute(m:Mesh,name:str,values:numpy.ndarray)->None:
+	""" Write an integer face attribute in bulk. """
+	attribute=m.attributes.get(name) or m.attributes.new(name,'INT','FACE')
+	attribute.data.foreach_set("value",values.astype(numpy.int32))
+
+def set_pan_attributes(m:Mesh,polygons:list[t3d.Polygon])->None:
+	"""
+	Keep polygon Pan in the pan_u and pan_v face attributes. UVs include it
+	too, the exporter takes it back out.
+	"""
+	pan:numpy.ndarray=numpy.array([p.pan for p in polygons],dtype=numpy.int64).reshape(-1,2)
+	set_face_attribute(m,"pan_u",pan[:,0])
+	set_face_attribute(m,"pan_v",pan[:,1])
+
+def add_texture_materials(
+	m:Mesh,
+	texture_names:typing.Iterable[str],
+	texture_index:dict[str,str]|None=None
+	)->tuple[numpy.ndarray,numpy.ndarray,set[str]]:
+	"""
+	Add the material of each texture to m, creating missing ones from
+	texture_index. Return the material slot and the width and height of
+	every texture, and the names of textures without material.
+	"""
+	materials_by_name:dict[str,Material]={}
+	for mat in reversed(bpy.data.materials):
+		materials_by_name[mat.name.lower()]=mat
+	slot_by_material:dict[str,int]={}
+	slots:list[int]=[]
+	sizes:list[tuple[int,int]]=[]
+	missing:set[str]=set()
+	# Slot without material for textures that have none.
+	empty_slot:int=-1
+	for texture in texture_names:
+		# Note: material names are case sensitive in Blender but not in
+		# UnrealEd.
+		scene_mat:Material|None=materials_by_name.get(texture.lower()) if texture else None
+		if not scene_mat and texture and texture_index:
+			scene_mat=get_material(texture,texture_index)
+		sizes.append(textures.texture_size(texture,texture_index,textures.material_image_path(scene_mat)))
+		if scene_mat:
+			if scene_mat.name not in slot_by_material:
+				slot_by_material[scene_mat.name]=len(m.materials)
+				m.materials.append(scene_mat)
+			slots.append(slot_by_material[scene_mat.name])
+		else:
+			if texture:
+				missing.add(texture)
+			# Not another texture's material, the exporter would take its name.
+			if empty_slot<0:
+				empty_slot=len(m.materials)
+				m.materials.append(None)
+			slots.append(empty_slot)
+	return (numpy.array(slots,dtype=numpy.int64),
+		numpy.array(sizes,dtype=numpy.float64).reshape(-1,2),missing)
+
+def texture_coordinates(
+	polygons:list[t3d.Polygon],
+	local:numpy.ndarray,
+	loop_polygon:numpy.ndarray,
+	loop_sizes:numpy.ndarray
+	)->numpy.ndarray:
+	"""
+	Blender UVs of loops.
+	local: (N,3) loop positions in Brush space.
+	loop_polygon: Index in polygons of each loop.
+	loop_sizes: (N,2) width and height of the texture of each loop.
+	"""
+	origin:numpy.ndarray=numpy.array([p.origin or (0,0,0) for p in polygons],dtype=numpy.float64).reshape(-1,3)
+	tu:numpy.ndarray=numpy.array([p.u for p in polygons],dtype=numpy.float64).reshape(-1,3)
+	tv:numpy.ndarray=numpy.array([p.v for p in polygons],dtype=numpy.float64).reshape(-1,3)
+	pan:numpy.ndarray=numpy.array([p.pan for p in polygons],dtype=numpy.float64).reshape(-1,2)
+	v:numpy.ndarray=local-origin[loop_polygon]
+	uvs:numpy.ndarray=numpy.empty((len(local),2))
+	uvs[:,0]=numpy.einsum("ni,ni->n",v,tu[loop_polygon])+pan[loop_polygon,0]
+	uvs[:,1]=numpy.einsum("ni,ni->n",v,tv[loop_polygon])+pan[loop_polygon,1]
+	# Fix orientation and scale by texture size.
+	uvs*=(1,-1)
+	uvs/=loop_sizes
+	return uvs
+
+def create_merged_object(
+	collection:bpy.types.Collection,
+	name:str,
+	brushes:list[t3d.Brush],
+	flip:bool,
+	texture_index:dict[str,str]|None=None
+	)->tuple[bpy.types.Object,set[str]]:
+	"""
+	Create a single Blender object holding all brushes in world space.
+	Faces get the integer attributes brush_index, csg, polyflags, flags,
+	pan_u, pan_v and texture_index. The mesh keeps side tables
+	"t3d_brushes" and "t3d_textures" (JSON) so the exporter can split it
+	back into brushes.
+	"""
+	polygons:list[tuple[int,t3d.Polygon,bool]]=[(bi,p,flip and b.csg=="csg_subtract")
+		for bi,b in enumerate(brushes) for p in b.polygons]
+	# Unique texture names in order of appearance.
+	texture_table:dict[str,int]={}
+	for _,p,_ in polygons:
+		texture_table.setdefault(p.texture,len(texture_table))
+	# Flat per loop data. Flipped polygons have their winding reversed.
+	local:numpy.ndarray=numpy.array([v.coords for _,p,flipped in polygons
+		for v in (reversed(p.vertices) if flipped else p.vertices)],dtype=numpy.float64).reshape(-1,3)
+	counts:numpy.ndarray=numpy.array([len(p.vertices) for _,p,_ in polygons],dtype=numpy.int64)
+	loop_starts:numpy.ndarray=numpy.cumsum(counts)-counts
+	face_brush:numpy.ndarray=numpy.array([bi for bi,_,_ in polygons],dtype=numpy.int64)
+	loop_polygon:numpy.ndarray=numpy.repeat(numpy.arange(len(polygons)),counts)
+	# World positions.
+	matrices:numpy.ndarray=numpy.array([b.get_matrix() for b in brushes],dtype=numpy.float64).reshape(-1,4,4)
+	loop_matrices:numpy.ndarray=matrices[face_brush[loop_polygon]]
+	coords:numpy.ndarray=numpy.einsum("nij,nj->ni",loop_matrices[:,:3,:3],local)+loop_matrices[:,:3,3]
+
+	m:Mesh=mesh_from_arrays(name,coords,loop_starts)
+	face_texture:numpy.ndarray=numpy.array([texture_table[p.texture] for _,p,_ in polygons],dtype=numpy.int64)
+	slots,sizes,missing_materials=add_texture_materials(m,texture_table,texture_index)
+	uvs:numpy.ndarray=texture_coordinates([p for _,p,_ in polygons],local,loop_polygon,
+		sizes[face_texture[loop_polygon]])
+	m.uv_layers.new().data.foreach_set("uv",uvs.astype(numpy.float32).ravel())
+	m.polygons.foreach_set("material_index",slots[face_texture].astype(numpy.int32))
+	# Face attributes.
+	csg:numpy.ndarray=numpy.array([t3d.CsgOper(b.csg).value for b in brushes],dtype=numpy.int64)
+	polyflags:numpy.ndarray=numpy.array([b.polyflags for b in brushes],dtype=numpy.int64)
+	set_face_attribute(m,"brush_index",face_brush)
+	set_face_attribute(m,"csg",csg[face_brush])
+	set_face_attribute(m,"polyflags",polyflags[face_brush])
+	set_face_attribute(m,"flags",numpy.array([p.flags for _,p,_ in polygons]))
+	set_face_attribute(m,"texture_index",face_texture)
+	set_pan_attributes(m,[p for _,p,_ in polygons])
+	# Side tables.
+	m["t3d_brushes"]=json.dumps([{
+		"name":b.actor_name,
+		"brush_name":b.brush_name,
+		"csg":b.csg,
+		"group":b.group,
+		"polyflags":b.polyflags,
+		"location":list(b.location),
+		"rotation":list(b.rotation),
+		"mainscale":list(b.mainscale),
+		"postscale":list(b.postscale),
+		"prepivot":list(b.prepivot),
+		"matrix":b.get_matrix(),
+		} for b in brushes])
+	m["t3d_textures"]=json.dumps(list(texture_table))
+
+	o:bpy.types.Object=bpy.data.objects.new(name,m)
+	csg_types:set[str]={b.csg for b in brushes}
+	o.color=(1,0.5,0,1) if csg_types=={"csg_subtract"} else (0,0,1,1)
+	collection.objects.link(o)
+	return o,missing_materials
+
+def build_csg_preview(
+	context:bpy.types.Context,
+	brushes:list[t3d.Brush]
+	)->tuple[bpy.types.Object,int]:
+	"""
+	Create or refresh the CSG preview object of the scene.
+	Only brushes whose T3D text changed since the last call, and the
+	brushes they touch, are evaluated again.
+	Return the object and the number of brushes evaluated.
+	"""
 	time_start:float=time.time()
-	# Create a collection bearing the T3D file's name.
-	coll:bpy.types.Collection=bpy.data.collections.new(Path(filepath).name)
-	# Add it to the scene.
-	context.scene.collection.children.link(coll)
-	# Turn every t3d.Brush into a Blender object.
-	for b in brushes:
+	texts:list[str]=[str(b) for b in brushes]
+	old_texts,model=_csg_models.get(context.scene.name,([],None))
+	evaluated:int=0
+	if model and len(old_texts)==len(texts):
+		for i,text in enumerate(texts):
+			if text!=old_texts[i]:
+				evaluated+=model.update(i,brushes[i])
+	else:
+		model=csg.CsgModel(brushes)
+		evaluated=len(brushes)
+	_csg_models[context.scene.name]=(texts,model)
+
+	fragments:list[csg.Fragment]=model.polygons()
+	coords:numpy.ndarray=numpy.array([p for f in fragments for p in f.points],dtype=numpy.float64).reshape(-1,3)
+	counts:numpy.ndarray=numpy.array([len(f.points) for f in fragments],dtype=numpy.int64)
+	m:Mesh=mesh_from_arrays(CSG_PREVIEW_NAME,coords,numpy.cumsum(counts)-counts)
+	# Materials.
+	materials_by_name:dict[str,Material]={}
+	for mat in reversed(bpy.data.materials):
+		materials_by_name[mat.name.lower()]=mat
+	slots:dict[str,int]={}
+	face_slots:list[int]=[]
+	for f in fragments:
+		texture:str=brushes[f.brush].polygons[f.polygon].texture.lower()
+		if texture not in slots:
+			mat:Material|None=materials_by_name.get(texture)
+			slots[texture]=len(m.materials) if mat else 0
+			if mat:
+				m.materials.append(mat)
+		face_slots.append(slots[texture])
+	m.polygons.foreach_set("material_index",numpy.array(face_slots,dtype=numpy.int32))
+	set_face_attribute(m,"brush_index",numpy.array([f.brush for f in fragments]))
+
+	# Found by property, the user may have renamed it.
+	o:bpy.types.Object|None=next((x for x in context.scene.objects if x.get("t3d_csg_preview")),None)
+	if o:
+		old:Mesh=o.data
+		o.data=m
+		bpy.data.meshes.remove(old)
+	else:
+		o=bpy.data.objects.new(CSG_PREVIEW_NAME,m)
+		o["t3d_csg_preview"]=True
+		context.scene.collection.objects.link(o)
+	print(f"blender_t3d: Evaluated {evaluated} of {len(brushes)} brushes for CSG preview in {time.time()-time_start} seconds.")
+	return o,evaluated
+
+class ImportJob:
+	"""
+	Import of a T3D file into the scene, done in steps so it can be driven
+	by a modal operator. Call step() until it returns True.
+	The file is parsed on a worker thread while objects are being created.
+	"""
+	# pylint:disable=too-many-instance-attributes
+	def __init__(
+		self,
+		context:bpy.types.Context,
+		filepath:str,
+		snap_vertices:bool,
+		snap_distance:float,
+		flip:bool,
+		mode:str="OBJECTS",
+		queue_size:int=256,
+		weld_distance:float=0.0,
+		texture_folder:str=""
+		)->None:
+		self.snap_vertices:bool=snap_vertices
+		self.snap_distance:float=snap_distance
+		self.flip:bool=flip
+		self.mode:str=mode
+		self.filepath:str=filepath
+		self.weld_distance:float=weld_distance
+		# Images found in texture_folder.
+		self.texture_index:dict[str,str]={}
+		if texture_folder:
+			time_start:float=time.time()
+			self.texture_index=textures.index_textures(texture_folder)
+			print(f"blender_t3d: Indexed {len(self.texture_index)} texture names in {time.time()-time_start} seconds.")
+		# Missing materials that will be reported.
+		self.missing_materials:set[str]=set()
+		# Objects created so far.
+		self.objects:list[bpy.types.Object]=[]
+		# Parse T3D file in the background.
+		self.parser:t3d_parser.BackgroundParser=t3d_parser.BackgroundParser(filepath,queue_size)
+		# Number of brushes processed.
+		self.done:int=0
+		# Brushes waiting for the merged mesh to be built.
+		self.pending:list[t3d.Brush]=[]
+		self.finished:bool=False
+		self.time_start:float=time.time()
+		# Create a collection bearing the T3D file's name.
+		self.collection:bpy.types.Collection=bpy.data.collections.new(Path(filepath).name)
+		# Add it to the scene.
+		context.scene.collection.children.link(self.collection)
+
+	@property
+	def parsing(self)->bool:
+		""" True while the file is still being parsed. """
+		return not self.parser.finished
+
+	@property
+	def total(self)->int:
+		""" Number of brushes parsed so far. """
+		return self.parser.count
+
+	def progress(self)->float:
+		""" Approximate progress from 0 to 1. """
+		return self.parser.fraction*self.done/max(self.total,1)
+
+	def step(self,budget:float=math.inf)->bool:
+		"""
+		Create objects for about budget seconds.
+		Merged modes gather brushes until the file is parsed, then build
+		their meshes in one go.
+		Return True once every brush was processed.
+		"""
+		if self.finished:
+			return True
+		merged:bool=self.mode in ('MERGED','MERGED_CSG')
+		deadline:float=time.perf_counter()+budget
+		while time.perf_counter()<deadline:
+			b:t3d.Brush|None
+			try:
+				b=self.parser.get(None if budget==math.inf else max(deadline-time.perf_counter(),0))
+			except queue.Empty:
+				return False
+			if b is None:
+				self.finished=True
+				if merged:
+					# Single bulk write once the whole file is parsed, can't be split.
+					self._import_merged(self.pending)
+					self.pending.clear()
+					return True
+				# Output time to console.
+				print(f"blender_t3d: Created {len(self.objects)} meshes in {time.time()-self.time_start} seconds.")
+				return True
+			if merged:
+				self.pending.append(b)
+			else:
+				self._import_brush(b)
+			self.done+=1
+		return False
+
+	def cancel(self,keep:bool=False)->None:
+		"""
+		Stop parsing.
+		keep: Keep the objects created so far instead of deleting them.
+		"""
+		self.parser.cancel()
+		if keep:
+			return
+		for o in self.objects:
+			mesh:Mesh=typing.cast(Mesh,o.data)
+			bpy.data.objects.remove(o)
+			if mesh.users==0:
+				bpy.data.meshes.remove(mesh)
+		self.objects.clear()
+		bpy.data.collections.remove(self.collection)
+
+	def results(self)->dict[str,list[str]]:
+		""" Warnings to report. """
+		results:dict={"WARNING":[]}
+		if self.missing_materials:
+			results["WARNING"]=[f"{len(self.missing_materials)} materials missing: {', '.join(sorted(self.missing_materials))}"]
+		return results
+
+	def _import_brush(self,b:t3d.Brush)->None:
+		""" Turn a t3d.Brush into a Blender object. """
 		obj:bpy.types.Object
 		if b.group=='cube':
 			# Ignore red brush.
 			print(f"blender_t3d: {b.actor_name} is the red brush, so it won't be imported.")
-			continue
+			return
 		# Snap to grid.
-		if snap_vertices:
-			b.snap(snap_distance)
+		if self.snap_vertices:
+			b.snap(self.snap_distance)
+		if self.mode in PROXY_MODES:
+			self.objects.append(create_proxy_object(self.collection,b,self.filepath,self.mode=='PROXY_BOUNDS'))
+			return
 		obj_missing_mats:set[str]
-		obj,obj_missing_mats=create_object(coll,b)
-		missing_materials.update(obj_missing_mats)
+		obj,obj_missing_mats=create_object(self.collection,b,self.weld_distance,self.texture_index)
+		self.missing_materials.update(obj_missing_mats)
+		self.objects.append(obj)
 		# Flip.
-		if b.csg.lower()=="csg_subtract" and flip:
+		if b.csg.lower()=="csg_subtract" and self.flip:
 			obj.data.flip_normals()
-	# Output time to console.
-	print(f"blender_t3d: Created {len(brushes)} meshes in {time.time()-time_start} seconds.")
-	results:dict={"WARNING":[]}
-	if missing_materials:
-		results["WARNING"]=[f"{len(missing_materials)} materials missing: {', '.join(sorted(missing_materials))}"]
-	return results
+
+	def _import_merged(self,brushes:list[t3d.Brush])->None:
+		""" Import brushes as one mesh, or one mesh per CSG type. """
+		groups:dict[str,list[t3d.Brush]]={}
+		for b in brushes:
+			if b.group=='cube':
+				# Ignore red brush.
+				print(f"blender_t3d: {b.actor_name} is the red brush, so it won't be imported.")
+				continue
+			if self.snap_vertices:
+				b.snap(self.snap_distance)
+			groups.setdefault(b.csg if self.mode=='MERGED_CSG' else "",[]).append(b)
+		for csg,group in groups.items():
+			name:str=f"{self.collection.name}_{csg}" if csg else self.collection.name
+			obj:bpy.types.Object
+			obj_missing_mats:set[str]
+			obj,obj_missing_mats=create_merged_object(self.collection,name,group,self.flip,self.texture_index)
+			self.missing_materials.update(obj_missing_mats)
+			self.objects.append(obj)
+		print(f"blender_t3d: Created {len(groups)} merged meshes in {time.time()-self.time_start} seconds.")
+
+def import_t3d_file(
+	context:bpy.types.Context,
+	filepath:str,
+	snap_vertices:bool,
+	snap_distance:float,
+	flip:bool,
+	mode:str="OBJECTS",
+	weld_distance:float=0.0,
+	texture_folder:str=""
+	)->dict[str,list[str]]:
+	"""
+	Import T3D file into scene.
+	mode: 'OBJECTS' for one object per brush, 'MERGED' for a single mesh,
+	'MERGED_CSG' for one mesh per CSG type, 'PROXY_MESH' or 'PROXY_BOUNDS'
+	for untextured proxies or bounding boxes that realize_proxies upgrades.
+	weld_distance: Share vertices closer than that in each brush.
+	texture_folder: Folder of images for textures without a material.
+	"""
+	job:ImportJob=ImportJob(context,filepath,snap_vertices,snap_distance,flip,mode,
+		weld_distance=weld_distance,texture_folder=texture_folder)
+	try:
+		job.step()
+	except Exception:
+		# Remove the collection and what was created in it.
+		job.cancel()
+		raise
+	return job.results()
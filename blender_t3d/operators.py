@@ -0,0 +1,482 @@
+# type: ignore ; tell Pylance to ignore props.
+"""
+Operators and menus of the add-on, registered by the package.
+"""
+import json
+
+import bpy
+
+INVALID_FILENAME="Invalid file name."
+# File browser filter, t3d_parser.T3D_EXTENSIONS without importing it.
+T3D_FILTER:str="*.t3d;*.t3d.gz;*.t3d.xz;*.t3d.bz2"
+# Seconds of work per modal import step, about one frame at 60 Hz.
+IMPORT_TIME_BUDGET=0.016
+# Seconds between modal import steps.
+IMPORT_TIMER_STEP=0.001
+
+# Choices for polygons that aren't flat on export.
+NONPLANAR_ITEMS:tuple[tuple[str,str,str],...]=(
+	('NONE',"Keep","Export them as they are"),
+	('SPLIT',"Split","Cut them along their shortest diagonal until flat"),
+	('FLATTEN',"Flatten","Move their vertices onto their best fit plane"),
+	)
+
+def format_stats(stats:dict[str,int])->str:
+	""" Export statistics for reports. """
+	return ", ".join(f"{v} {k}" for k,v in stats.items())+"."
+
+class OBJECT_OT_export_t3d_clipboard(bpy.types.Operator):
+	"""Export selected meshes to T3D into the clipboard."""
+	bl_idname:str="object.export_t3d_clipboard"
+	bl_label:str="Export T3D to clipboard"
+
+	scale:bpy.props.FloatProperty(name="Scale Multiplier",default=1.0)
+	merge_coplanar:bpy.props.BoolProperty(
+		name="Merge coplanar faces",
+		description="Merge adjacent faces sharing plane, material and texture mapping into convex polygons",
+		default=False)
+	nonplanar:bpy.props.EnumProperty(
+		name="Non-planar faces",
+		description="Repair faces whose vertices are farther than 0.1 units from their plane",
+		items=NONPLANAR_ITEMS,
+		default='NONE')
+	snap_vertices:bpy.props.BoolProperty(
+		name="Snap vertices",
+		description="Snap vertices and locations to a grid, dropping the faces and edges it collapses",
+		default=False)
+	snap_distance:bpy.props.FloatProperty(
+		name="Snap distance",
+		default=1.0,
+		min=0.0)
+
+	@classmethod
+	def poll(cls,context):
+		return context.selected_objects
+
+	def execute(self,context):
+		from . import exporter
+		sel_objs=[obj for obj in context.selected_objects if obj.type=='MESH' or obj.is_instancer]
+		stats:dict[str,int]={}
+		txt=exporter.export(sel_objs,self.scale,merge_coplanar=self.merge_coplanar,stats=stats,nonplanar=self.nonplanar,
+			snap_distance=self.snap_distance if self.snap_vertices else 0.0)
+		context.window_manager.clipboard=txt
+		self.report({'INFO'},f"{stats.pop('brushes',0)} brushes exported to clipboard. {format_stats(stats)}")
+		return {'FINISHED'}
+
+	def invoke(self, context, event):
+		wm=context.window_manager
+		return wm.invoke_props_dialog(self)
+
+class OBJECT_OT_t3d_csg_preview(bpy.types.Operator):
+	"""Build level geometry from the brushes in scene, applying CSG operations in order."""
+	bl_idname:str="object.t3d_csg_preview"
+	bl_label:str="Build T3D CSG preview"
+
+	def execute(self,context):
+		from . import exporter, importer
+		objs=[obj for obj in context.scene.objects if obj.type=='MESH' and not obj.get("t3d_csg_preview")]
+		cache:dict={}
+		brushes=[b for obj in objs for b in exporter.brushes_from_any_object(obj,cache=cache)]
+		obj,evaluated=importer.build_csg_preview(context,brushes)
+		self.report({'INFO'},f"{len(obj.data.polygons)} faces built, {evaluated} of {len(brushes)} brushes evaluated.")
+		return {'FINISHED'}
+
+class OBJECT_OT_t3d_select_brushes(bpy.types.Operator):
+	"""Select brushes in scene by their bounding boxes."""
+	bl_idname:str="object.t3d_select_brushes"
+	bl_label:str="Select T3D brushes"
+	bl_options={'REGISTER','UNDO'}
+
+	query:bpy.props.EnumProperty(
+		name="Query",
+		items=(
+			('OVERLAP',"Overlapping","Brushes overlapping the selected brushes"),
+			('INSIDE',"Inside active","Brushes inside the bounding box of the active object"),
+			('NEAREST',"Nearest to cursor","Brush closest to the 3D cursor"),
+			('RAY',"Ray from cursor","First brush in the view direction from the 3D cursor"),
+			),
+		default='OVERLAP')
+
+	def execute(self,context):
+		from mathutils import Vector
+		from . import bvh, exporter
+		objs=[obj for obj in context.scene.objects if obj.type=='MESH' and obj.visible_get() and not obj.get("t3d_csg_preview")]
+		boxes=[exporter.object_bounds(obj) for obj in objs]
+		tree=bvh.BVH(boxes)
+		found:list[int]=[]
+		if self.query=='OVERLAP':
+			for i,obj in enumerate(objs):
+				if obj.select_get():
+					found+=tree.query_box(*boxes[i])
+		elif self.query=='INSIDE':
+			if context.active_object not in objs:
+				self.report({'WARNING'},"Active object is not a visible mesh.")
+				return {'CANCELLED'}
+			lo,hi=boxes[objs.index(context.active_object)]
+			found=[i for i in tree.query_box(lo,hi) if objs[i]!=context.active_object
+				and all(lo[a]<=boxes[i][0][a] and boxes[i][1][a]<=hi[a] for a in range(3))]
+		elif self.query=='NEAREST':
+			nearest=tree.nearest(context.scene.cursor.location)
+			found=[nearest[0]] if nearest else []
+		else:
+			direction=Vector((0,0,-1))
+			if context.region_data:
+				direction=context.region_data.view_rotation@direction
+			hits=tree.query_ray(context.scene.cursor.location,direction)
+			found=[hits[0][1]] if hits else []
+		for obj in context.selected_objects:
+			obj.select_set(False)
+		for i in found:
+			objs[i].select_set(True)
+		if found and self.query in ('NEAREST','RAY'):
+			context.view_layer.objects.active=objs[found[0]]
+		self.report({'INFO'},f"{len(set(found))} brushes selected.")
+		return {'FINISHED'}
+
+class OBJECT_OT_t3d_select_invalid_brushes(bpy.types.Operator):
+	"""Select brushes in scene that aren't closed convex volumes, which break UnrealEd's CSG."""
+	bl_idname:str="object.t3d_select_invalid_brushes"
+	bl_label:str="Select invalid T3D brushes"
+	bl_options={'REGISTER','UNDO'}
+
+	tolerance:bpy.props.FloatProperty(
+		name="Tolerance",
+		description="Distance vertices may stick out of the faces of their brush",
+		default=0.1,
+		min=0.0)
+
+	def execute(self,context):
+		from . import exporter, importer
+		objs=[obj for obj in context.scene.objects if obj.type=='MESH' and not obj.get("t3d_csg_preview")
+			and obj.get("t3d_proxy")!='BOUNDS']
+		report=exporter.validate_objects(objs,self.tolerance)
+		invalid:set[str]={c.name for c in report.invalid()}
+		for obj in context.selected_objects:
+			obj.select_set(False)
+		count:int=0
+		for obj in objs:
+			# Merged objects hold many brushes named after their actors.
+			names:list[str]=[e["name"] for e in json.loads(obj.data["t3d_brushes"])] if "t3d_brushes" in obj.data else [obj.name]
+			if invalid.intersection(names):
+				obj.select_set(True)
+				count+=1
+		for c in report.invalid()[:10]:
+			self.report({'WARNING'},str(c))
+		self.report({'INFO'},f"{report.summary()} {count} objects selected.")
+		return {'FINISHED'}
+
+class OBJECT_OT_t3d_realize_proxies(bpy.types.Operator):
+	"""Replace selected T3D import proxies with full brushes read again from their file."""
+	bl_idname:str="object.t3d_realize_proxies"
+	bl_label:str="Realize T3D proxies"
+	bl_options={'REGISTER','UNDO'}
+
+	flip:bpy.props.BoolProperty(
+		name="Flip normals",
+		description="Flip normals of CSG_Subtract brushes",
+		default=False
+	)
+	snap_vertices:bpy.props.BoolProperty(
+		name="Snap vertices",
+		description="Snap to grid",
+		default=False
+	)
+	snap_distance:bpy.props.FloatProperty(
+		name="Snap distance",
+		default=1.0
+		)
+	weld:bpy.props.BoolProperty(
+		name="Weld vertices",
+		description="Share vertices between the faces of each brush",
+		default=False
+	)
+	weld_distance:bpy.props.FloatProperty(
+		name="Weld distance",
+		default=0.01,
+		min=0.0
+		)
+	texture_folder:bpy.props.StringProperty(
+		name="Texture folder",
+		description="Folder of exported textures. Materials are created for textures that have none",
+		subtype='DIR_PATH',
+		default=""
+	)
+
+	@classmethod
+	def poll(cls,context):
+		return any(obj.get("t3d_proxy") for obj in context.selected_objects)
+
+	def execute(self,context):
+		from . import importer, t3d_parser
+		try:
+			objs,missing_materials,not_found=importer.realize_proxies(
+				context.selected_objects,
+				self.flip,
+				self.snap_distance if self.snap_vertices else 0.0,
+				self.weld_distance if self.weld else 0.0,
+				bpy.path.abspath(self.texture_folder))
+		except (OSError,t3d_parser.ParseError) as e:
+			self.report({'ERROR'},f"Can't read proxy source: {e}")
+			return {'CANCELLED'}
+		if missing_materials:
+			self.report({'WARNING'},f"{len(missing_materials)} materials missing: {', '.join(sorted(missing_materials))}")
+		if not_found:
+			self.report({'WARNING'},f"{len(not_found)} actors not found in their file: {', '.join(sorted(not_found))}")
+		self.report({'INFO'},f"{len(objs)} proxies realized.")
+		return {'FINISHED'}
+
+class BT3D_MT_file_export(bpy.types.Operator):
+	"""Export T3D file."""
+	bl_idname="bt3d.file_export"
+	bl_label="Export Unreal T3D (.t3d)"
+	filename:bpy.props.StringProperty(subtype='FILE_NAME')
+	filepath:bpy.props.StringProperty(subtype='FILE_PATH')
+	scale:bpy.props.FloatProperty(
+		name="Scale Multiplier",
+		default=1.0,
+		subtype='FACTOR')
+	jobs:bpy.props.IntProperty(
+		name="Worker processes",
+		description="Format the T3D text in parallel processes, 0 to disable. Useful for tens of thousands of brushes",
+		default=0,
+		min=0,
+		max=64)
+	merge_coplanar:bpy.props.BoolProperty(
+		name="Merge coplanar faces",
+		description="Merge adjacent faces sharing plane, material and texture mapping into convex polygons",
+		default=False)
+	nonplanar:bpy.props.EnumProperty(
+		name="Non-planar faces",
+		description="Repair faces whose vertices are farther than 0.1 units from their plane",
+		items=NONPLANAR_ITEMS,
+		default='NONE')
+	snap_vertices:bpy.props.BoolProperty(
+		name="Snap vertices",
+		description="Snap vertices and locations to a grid, dropping the faces and edges it collapses",
+		default=False)
+	snap_distance:bpy.props.FloatProperty(
+		name="Snap distance",
+		default=1.0,
+		min=0.0)
+	def execute(self,context):
+		if not self.filename.split(".")[0]:
+			self.report({'ERROR'},INVALID_FILENAME)
+			return {'CANCELLED'}
+		# Get meshes and instancers in scene.
+		objs=[obj for obj in context.scene.objects if (obj.type=='MESH' or obj.is_instancer) and not obj.get("t3d_csg_preview")]
+		if not objs:
+			self.report({'WARNING'},"There are no meshes in scene to export.")
+			return {'CANCELLED'}
+		from . import exporter
+		stats:dict[str,int]={}
+		txt=exporter.export(objs,self.scale,self.jobs,merge_coplanar=self.merge_coplanar,stats=stats,nonplanar=self.nonplanar,
+			snap_distance=self.snap_distance if self.snap_vertices else 0.0)
+		self.filepath=bpy.path.ensure_ext(self.filepath,".t3d")
+		if not txt:
+			self.report({'WARNING'},"Nothing was converted.")
+			return {'CANCELLED'}
+		with open(self.filepath,"w",encoding="utf-8") as f:
+			f.write(txt)
+		self.report({'INFO'},f"{stats.pop('brushes',0)} brushes saved to {self.filepath}. {format_stats(stats)}")
+		return {'FINISHED'}
+	def invoke(self, context, event):
+		if not self.filepath:
+			self.filepath=bpy.path.ensure_ext(bpy.data.filepath,".t3d")
+		context.window_manager.fileselect_add(self)
+		return {'RUNNING_MODAL'}
+
+class BT3D_MT_file_import(bpy.types.Operator):
+	"""Import T3D file."""
+	bl_idname="bt3d.file_import"
+	bl_label="Import Unreal T3D (.t3d)"
+
+	filename:bpy.props.StringProperty(
+		name="input filename",
+		subtype='FILE_NAME'
+		)
+	filepath:bpy.props.StringProperty(
+		name="input file",
+		subtype='FILE_PATH'
+		)
+	filter_glob:bpy.props.StringProperty(
+		default=T3D_FILTER,
+		options={'HIDDEN'},
+		)
+	# Options.
+	flip:bpy.props.BoolProperty(
+		name="Flip normals",
+		description="Flip normals of CSG_Subtract brushes",
+		default=False
+	)
+	snap_vertices:bpy.props.BoolProperty(
+		name="Snap vertices",
+		description="Snap to grid",
+		default=False
+	)
+	snap_distance:bpy.props.FloatProperty(
+		name="Snap distance",
+		default=1.0
+		)
+	weld:bpy.props.BoolProperty(
+		name="Weld vertices",
+		description="Share vertices between the faces of each brush. Objects mode only",
+		default=False
+	)
+	weld_distance:bpy.props.FloatProperty(
+		name="Weld distance",
+		default=0.01,
+		min=0.0
+		)
+	mode:bpy.props.EnumProperty(
+		name="Mode",
+		description="How brushes are turned into objects",
+		items=(
+			('OBJECTS',"Objects","One object per brush"),
+			('MERGED',"Single mesh","All brushes in one mesh, for huge maps"),
+			('MERGED_CSG',"Mesh per CSG","One mesh per CSG operation"),
+			('PROXY_MESH',"Proxy meshes","Untextured brushes for a quick look, realize them later"),
+			('PROXY_BOUNDS',"Proxy boxes","Bounding box of each brush for a quick look, realize them later"),
+			),
+		default='OBJECTS'
+	)
+	progress:bpy.props.BoolProperty(
+		name="Show progress",
+		description="Import in small batches so the UI stays responsive. Esc cancels. Imports from scripts always block",
+		default=True
+	)
+	# Set by invoke(), scripts calling the operator get a blocking import.
+	interactive:bpy.props.BoolProperty(
+		default=False,
+		options={'HIDDEN','SKIP_SAVE'},
+	)
+	texture_folder:bpy.props.StringProperty(
+		name="Texture folder",
+		description="Folder of exported textures (Package.Group.Name or Package/Group/Name images). Materials are created for textures that have none",
+		subtype='DIR_PATH',
+		default=""
+	)
+	keep_on_cancel:bpy.props.BoolProperty(
+		name="Keep on cancel",
+		description="Keep the objects already created when the import is cancelled",
+		default=False
+	)
+
+	def execute(self,context):
+		if not self.filename.split(".")[0]:
+			self.report({'ERROR'},INVALID_FILENAME)
+			return {'CANCELLED'}
+
+		from . import importer
+		if self.progress and self.interactive:
+			self._job=importer.ImportJob(
+				context,
+				self.filepath,
+				self.snap_vertices,
+				self.snap_distance,
+				self.flip,
+				self.mode,
+				weld_distance=self.weld_distance if self.weld else 0.0,
+				texture_folder=bpy.path.abspath(self.texture_folder))
+			wm=context.window_manager
+			wm.progress_begin(0,100)
+			self._timer=wm.event_timer_add(IMPORT_TIMER_STEP,window=context.window)
+			wm.modal_handler_add(self)
+			return {'RUNNING_MODAL'}
+
+		results:dict[str,list[str]]=importer.import_t3d_file(
+			context,
+			self.filepath,
+			#self.filename,
+			self.snap_vertices,
+			self.snap_distance,
+			self.flip,
+			self.mode,
+			weld_distance=self.weld_distance if self.weld else 0.0,
+			texture_folder=bpy.path.abspath(self.texture_folder))
+		for w in results['WARNING']:
+			self.report({'WARNING'},w)
+		return {'FINISHED'}
+
+	def modal(self,context,event):
+		if event.type=='ESC':
+			self._job.cancel(self.keep_on_cancel)
+			self._end(context)
+			self.report({'WARNING'},f"Import cancelled after {self._job.done} of {self._job.total} brushes.")
+			return {'CANCELLED'}
+		if event.type!='TIMER':
+			return {'PASS_THROUGH'}
+		try:
+			finished:bool=self._job.step(IMPORT_TIME_BUDGET)
+		except Exception:
+			# Don't leave a half imported file behind.
+			self._job.cancel()
+			self._end(context)
+			raise
+		context.window_manager.progress_update(int(self._job.progress()*100))
+		context.workspace.status_text_set(
+			f"Importing T3D: {self._job.done}/{self._job.total}{'+' if self._job.parsing else ''} brushes."
+			" Press Esc to cancel.")
+		if not finished:
+			return {'RUNNING_MODAL'}
+		self._end(context)
+		for w in self._job.results()['WARNING']:
+			self.report({'WARNING'},w)
+		return {'FINISHED'}
+
+	def _end(self,context)->None:
+		""" Remove timer and progress indicators. """
+		wm=context.window_manager
+		wm.event_timer_remove(self._timer)
+		wm.progress_end()
+		context.workspace.status_text_set(None)
+
+	def invoke(self, context, event):
+		self.interactive=True
+		wm=context.window_manager
+		wm.fileselect_add(self)
+		return {'RUNNING_MODAL'}
+
+classes = (
+	BT3D_MT_file_export,
+	BT3D_MT_file_import,
+	OBJECT_OT_export_t3d_clipboard,
+	OBJECT_OT_t3d_csg_preview,
+	OBJECT_OT_t3d_realize_proxies,
+	OBJECT_OT_t3d_select_brushes,
+	OBJECT_OT_t3d_select_invalid_brushes,
+)
+register_classes, unregister_classes = bpy.utils.register_classes_factory(classes)
+
+menus=(
+	lambda x,_:x.layout.operator(OBJECT_OT_export_t3d_clipboard.bl_idname),
+	lambda x,_:x.layout.operator(BT3D_MT_file_export.bl_idname),
+	lambda x,_:x.layout.operator(BT3D_MT_file_import.bl_idname),
+	lambda x,_:x.layout.operator(OBJECT_OT_t3d_csg_preview.bl_idname),
+	lambda x,_:x.layout.operator_menu_enum(OBJECT_OT_t3d_select_brushes.bl_idname,"query"),
+	lambda x,_:x.layout.operator(OBJECT_OT_t3d_realize_proxies.bl_idname),
+	lambda x,_:x.layout.operator(OBJECT_OT_t3d_select_invalid_brushes.bl_idname),
+)
+
+def register()->None:
+	#print("Registering.")
+	register_classes()
+	# Add to menu.
+	bpy.types.VIEW3D_MT_object.append(menus[0])
+	bpy.types.TOPBAR_MT_file_export.append(menus[1])
+	bpy.types.TOPBAR_MT_file_import.append(menus[2])
+	bpy.types.VIEW3D_MT_object.append(menus[3])
+	bpy.types.VIEW3D_MT_select_object.append(menus[4])
+	bpy.types.VIEW3D_MT_object.append(menus[5])
+	bpy.types.VIEW3D_MT_select_object.append(menus[6])
+
+def unregister()->None:
+	#print("Unregistering.")
+	# Remove from menu.
+	bpy.types.VIEW3D_MT_object.remove(menus[0])
+	bpy.types.TOPBAR_MT_file_export.remove(menus[1])
+	bpy.types.TOPBAR_MT_file_import.remove(menus[2])
+	bpy.types.VIEW3D_MT_object.remove(menus[3])
+	bpy.types.VIEW3D_MT_select_object.remove(menus[4])
+	bpy.types.VIEW3D_MT_object.remove(menus[5])
+	bpy.types.VIEW3D_MT_select_object.remove(menus[6])
+	unregister_classes()
@@ -2,9 +2,13 @@
 Intermediate representations of T3D types.
 """
 import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import Sequence, Type
 from enum import Enum
 
+import numpy
+
 def format_float(value:float)->str:
 	""" Convert value to T3D signed floating point string. """
 	return f"{value:+#013.06f}"
@@ -17,6 +21,81 @@ def round_to_grid(value:float,grid_size:float)->float:
 	""" Round value to closest grid point on a grid of size grid_size. """
 	return round(value/grid_size)*grid_size
 
+def rotation_matrix(rotation:Sequence[float])->list[list[float]]:
+	"""
+	3x3 rotation matrix from T3D Roll, Pitch, Yaw.
+	Same as the Blender XYZ Euler made by the importer.
+	"""
+	x,y,z=(a*math.tau/65536 for a in rotation)
+	x,y=-x,-y
+	cx,sx,cy,sy,cz,sz=math.cos(x),math.sin(x),math.cos(y),math.sin(y),math.cos(z),math.sin(z)
+	return [
+		[cy*cz,sx*sy*cz-cx*sz,cx*sy*cz+sx*sz],
+		[cy*sz,sx*sy*sz+cx*cz,cx*sy*sz-sx*cz],
+		[-sy,sx*cy,cx*cy]
+		]
+
+def transform_point(matrix:list[list[float]],point:Sequence[float])->tuple[float,float,float]:
+	""" Apply 4x4 matrix to a 3D point. """
+	return (
+		matrix[0][0]*point[0]+matrix[0][1]*point[1]+matrix[0][2]*point[2]+matrix[0][3],
+		matrix[1][0]*point[0]+matrix[1][1]*point[1]+matrix[1][2]*point[2]+matrix[1][3],
+		matrix[2][0]*point[0]+matrix[2][1]*point[1]+matrix[2][2]*point[2]+matrix[2][3]
+		)
+
+# Spatial hash cell size, in multiples of the weld distance.
+WELD_CELL_FACTOR:float=8.0
+
+def weld_vertices(verts:Sequence[Sequence[float]],distance:float)->tuple[list[Sequence[float]],list[int]]:
+	"""
+	Merge vertices closer than distance using a spatial hash.
+	Cells are larger than distance, so neighbouring cells are only searched
+	for vertices lying close to a cell's side. The first vertex of a
+	cluster is kept.
+	Return the kept vertices and the new index of every input vertex.
+	"""
+	cell_size:float=distance*WELD_CELL_FACTOR
+	grid:dict[tuple[int,int,int],list[int]]={}
+	unique:list[Sequence[float]]=[]
+	remap:list[int]=[]
+	distance_squared:float=distance*distance
+	# Exact copies are the common case in T3D files.
+	exact:dict[tuple[float,...],int]={}
+	for v in verts:
+		position:tuple[float,...]=tuple(v)
+		if position in exact:
+			remap.append(exact[position])
+			continue
+		cell:list[float]=[c/cell_size for c in v[:3]]
+		key:tuple[int,int,int]=(math.floor(cell[0]),math.floor(cell[1]),math.floor(cell[2]))
+		# Cell offsets to search on each axis.
+		axes:list[tuple[int,...]]=[]
+		for c,k in zip(cell,key):
+			f:float=(c-k)*WELD_CELL_FACTOR
+			axes.append((0,-1) if f<=1 else (0,1) if f>=WELD_CELL_FACTOR-1 else (0,))
+		index:int=-1
+		for dx in axes[0]:
+			for dy in axes[1]:
+				for dz in axes[2]:
+					for i in grid.get((key[0]+dx,key[1]+dy,key[2]+dz),()):
+						u:Sequence[float]=unique[i]
+						if (u[0]-v[0])**2+(u[1]-v[1])**2+(u[2]-v[2])**2<=distance_squared:
+							index=i
+							break
+					if index>=0:
+						break
+				if index>=0:
+					break
+			if index>=0:
+				break
+		if index<0:
+			index=len(unique)
+			unique.append(v)
+			grid.setdefault(key,[]).append(index)
+		exact[position]=index
+		remap.append(index)
+	return unique,remap
+
 class Vec3(Sequence):
 	""" 3D vector/point. """
 	def __init__(self,*coords)->None:
@@ -93,6 +172,38 @@ class Polygon:
 	def add_vertices(self,vert_list:Sequence[Sequence[float]])->None:
 		""" Append more vertices. """
 		self.vertices+=[Vertex(v) for v in vert_list]
+	@classmethod
+	def from_data(cls:Type["Polygon"],data:dict)->"Polygon":
+		""" Constructor from to_data() output. """
+		p:Polygon=cls([Vertex(v) for v in data["vertices"]])
+		p.origin=data["origin"]
+		p.pan=data["pan"]
+		p.u=data["u"]
+		p.v=data["v"]
+		p.texture=data["texture"]
+		p.flags=data["flags"]
+		return p
+	def to_data(self)->dict:
+		""" Copy as plain Python values that pickle without this module. """
+		return {
+			"vertices":[tuple(v.coords) for v in self.vertices],
+			"origin":tuple(self.origin),
+			"pan":tuple(self.pan),
+			"u":tuple(self.u),
+			"v":tuple(self.v),
+			"texture":str(self.texture),
+			"flags":int(self.flags),
+		}
+	def get_uvs(self)->list[tuple[float,float]]:
+		""" Texture coordinates in texels for each vertex. """
+		origin:Sequence[float]=self.origin or (0,0,0)
+		ret:list[tuple[float,float]]=[]
+		for vertex in self.vertices:
+			d:list[float]=[vertex.coords[i]-origin[i] for i in range(3)]
+			ret.append((
+				d[0]*self.u[0]+d[1]*self.u[1]+d[2]*self.u[2]+self.pan[0],
+				d[0]*self.v[0]+d[1]*self.v[1]+d[2]*self.v[2]+self.pan[1]))
+		return ret
 
 class MyEnum(Enum):
 	""" Takes int or a string equal to member name. """
@@ -124,6 +235,11 @@ class SheerAxis(MyEnum):
 	SHEER_ZX=5
 	SHEER_ZY=6
 
+# Brush PolyFlags of semisolid brushes.
+PF_SEMISOLID:int=0x20
+# Brush PolyFlags of sheets and other brushes that don't cut the world.
+PF_NOT_SOLID:int=0x08
+
 class Brush:
 	""" T3D Brush. """
 	# pylint:disable=too-many-instance-attributes
@@ -179,6 +295,22 @@ class Brush:
 
 		return b
 
+	@classmethod
+	def from_data(cls:Type["Brush"],data:dict)->"Brush":
+		""" Constructor from to_data() output. """
+		b:Brush=cls()
+		b.__dict__.update(data)
+		b.polygons=[Polygon.from_data(p) for p in data["polygons"]]
+		return b
+
+	def to_data(self)->dict:
+		""" Copy as plain Python values that pickle without this module. """
+		data:dict=dict(vars(self))
+		for key in ("location","rotation","mainscale","postscale","prepivot"):
+			data[key]=tuple(data[key])
+		data["polygons"]=[p.to_data() for p in self.polygons]
+		return data
+
 	def __str__(self)->str:
 		def coords_string(coords:tuple)->str:
 			location_prefixes:tuple[str,str,str]=("X","Y","Z")
@@ -197,7 +329,7 @@ class Brush:
 		if self.postscale:
 			postscale_txt=(f"PostScale=(Scale=({coords_string(self.postscale)}"
 			f"),SheerRate={self.postscale_sheer}"
-			f"),SheerAxis={self.postscale_sheer_axis})\n")
+			f",SheerAxis={self.postscale_sheer_axis})\n")
 
 		location_txt:str=""
 		if self.location and self.location!=(0.0,0.0,0.0):
@@ -234,10 +366,29 @@ End Actor
 """
 		return brush
 
-	def get_pydata(self)->tuple:
+	def get_matrix(self)->list[list[float]]:
+		"""
+		4x4 matrix taking this Brush's vertices to world space.
+		Applies MainScale, Rotation, PostScale, PrePivot and Location the
+		same way as the importer.
+		"""
+		mainscale:Sequence[float]=self.mainscale or (1,1,1)
+		postscale:Sequence[float]=self.postscale or (1,1,1)
+		location:Sequence[float]=self.location or (0,0,0)
+		r:list[list[float]]=rotation_matrix(self.rotation or (0,0,0))
+		pivot:list[float]=list(transform_point([row+[0] for row in r],self.prepivot or (0,0,0)))
+		return [
+			[postscale[i]*r[i][j]*mainscale[j] for j in range(3)]
+			+[location[i]-pivot[i]*postscale[i]*mainscale[i]] for i in range(3)
+			]+[[0.,0.,0.,1.]]
+
+	def get_pydata(self,weld_distance:float=0.0)->tuple:
 		"""
 		Return data that can be passed to bpy.types.Mesh.from_pydata().
 		https://docs.blender.org/api/current/bpy.types.Mesh.html#bpy.types.Mesh.from_pydata
+		By default every polygon has its own copy of its vertices.
+		weld_distance: If above zero, vertices closer than that are shared
+		between faces. Faces keep the order of polygons.
 		"""
 		verts:list[list[float]]=[v.coords for p in self.polygons for v in p.vertices]
 		edges:list=[]
@@ -246,11 +397,80 @@ End Actor
 		for p in self.polygons:
 			faces.append(list(range(i,i+len(p.vertices))))
 			i+=len(p.vertices)
-		return verts,edges,faces
+		if weld_distance<=0:
+			return verts,edges,faces
+		welded:list
+		remap:list[int]
+		welded,remap=weld_vertices(verts,weld_distance)
+		welded_faces:list[list[int]]=[]
+		for face in faces:
+			# Drop vertices merged with the previous one.
+			indices:list[int]=[remap[j] for j in face]
+			indices=[x for k,x in enumerate(indices) if x!=indices[k-1]]
+			if len(indices)<3 or len(set(indices))<len(indices):
+				# Collapsed polygon, or one touching itself, which Blender
+				# faces can't, keeps its own vertices.
+				indices=list(range(len(welded),len(welded)+len(face)))
+				welded+=[verts[j] for j in face]
+			welded_faces.append(indices)
+		return welded,edges,welded_faces
 
 	def snap(self,grid_distance:float=1.0)->None:
 		""" Snap all this Brush's vertices to a grid. """
-		for p in self.polygons:
-			for v in p.vertices:
-				v.snap(grid_distance)
-		self.location=tuple(round_to_grid(v,grid_distance) for v in self.location)
+		snap_brushes([self],grid_distance,False)
+
+def snap_brushes(brushes:list[Brush],grid_distance:float=1.0,clean:bool=True)->dict[str,int]:
+	"""
+	Snap the vertices and locations of brushes to a grid, the coordinates of
+	all brushes in one numpy array.
+	clean: Then drop vertices that landed on the previous one and polygons
+	left without area.
+	Return the number of edges collapsed and polygons dropped.
+	"""
+	# Polygons can be shared by brushes made from the same mesh.
+	polygons:list[Polygon]=list({id(p):p for b in brushes for p in b.polygons}.values())
+	vertices:list[Vertex]=[v for p in polygons for v in p.vertices]
+	coords:numpy.ndarray=numpy.array([v.coords for v in vertices],dtype=numpy.float64).reshape(-1,3)
+	for v,c in zip(vertices,(numpy.round(coords/grid_distance)*grid_distance).tolist()):
+		v.coords=c
+	for b in brushes:
+		b.location=tuple(round_to_grid(c,grid_distance) for c in b.location)
+	if not clean:
+		return {}
+	collapsed:int=0
+	degenerate:set[int]=set()
+	# Twice the area under which a polygon is a line, in grid cells.
+	epsilon:float=grid_distance*grid_distance*1e-6
+	for p in polygons:
+		kept:list[Vertex]=[v for k,v in enumerate(p.vertices) if v.coords!=p.vertices[k-1].coords]
+		collapsed+=len(p.vertices)-len(kept)
+		p.vertices=kept
+		# Newell's normal, its length is twice the area.
+		n:list[float]=[0.0,0.0,0.0]
+		for a,b in zip(kept,kept[1:]+kept[:1]):
+			n[0]+=(a[1]-b[1])*(a[2]+b[2])
+			n[1]+=(a[2]-b[2])*(a[0]+b[0])
+			n[2]+=(a[0]-b[0])*(a[1]+b[1])
+		if len(kept)<3 or math.hypot(*n)<=epsilon:
+			degenerate.add(id(p))
+	if degenerate:
+		for b in brushes:
+			b.polygons=[p for p in b.polygons if id(p) not in degenerate]
+	return {"edges collapsed":collapsed,"polygons degenerate":len(degenerate)}
+
+def serialize_brushes(data:list[dict])->str:
+	""" T3D text of brushes given as Brush.to_data() dictionaries. """
+	return "".join(str(Brush.from_data(d)) for d in data)
+
+def serialize_brushes_parallel(data:list[dict],jobs:int,chunks_per_job:int=4)->str:
+	"""
+	Same as serialize_brushes, using a pool of jobs worker processes.
+	Brushes are split in contiguous batches and joined back in order.
+	Workers are spawned, not forked, so Blender's process isn't copied.
+	They import this module by its full name, the add-on package skips its
+	operators there since bpy is missing.
+	"""
+	batch_size:int=max(len(data)//(jobs*chunks_per_job),1)
+	batches:list[list[dict]]=[data[i:i+batch_size] for i in range(0,len(data),batch_size)]
+	with ProcessPoolExecutor(max_workers=jobs,mp_context=multiprocessing.get_context("spawn")) as executor:
+		return "".join(executor.map(serialize_brushes,batches))
@@ -0,0 +1,186 @@
+"""
+Compare the brushes of two T3D files.
+Each brush is reduced to hashes of its normalized geometry, surfaces,
+transform and CSG properties, so reformatted numbers and reordered actors
+or polygons don't show up as changes. Coordinates are compared by rounding
+them to a grid, not by distance: values on either side of a grid cell
+boundary differ however close they are.
+Usage:
+ python blender_t3d/t3d_diff.py old.t3d new.t3d
+"""
+import argparse
+import collections
+import sys
+from typing import NamedTuple
+
+try:
+	from . import t3d, t3d_parser
+except ImportError:
+	import t3d
+	import t3d_parser
+
+# Default grid size coordinates are rounded to before comparing.
+TOLERANCE:float=0.01
+
+class BrushDigest(NamedTuple):
+	""" Hashes of the parts of a brush actor that a diff reports on. """
+	name:str
+	geometry:int
+	surfaces:int
+	transform:int
+	properties:int
+
+# Names of the changes, in the order of BrushDigest fields.
+CHANGES:tuple[str,...]=("geometry","retextured","moved","csg")
+
+def _quantize(values,tolerance:float)->tuple[int,...]:
+	return tuple(round(v/tolerance) for v in values)
+
+def digest_brush(b:t3d.Brush,tolerance:float=TOLERANCE)->BrushDigest:
+	"""
+	Hash a brush. Coordinates are rounded to multiples of tolerance,
+	polygons are sorted and start at their smallest vertex, keeping their
+	winding.
+	"""
+	polygons:list[tuple[tuple,tuple]]=[]
+	for p in b.polygons:
+		verts:list[tuple[int,...]]=[_quantize(v.coords,tolerance) for v in p.vertices]
+		first:int=verts.index(min(verts)) if verts else 0
+		surface:tuple=(p.texture,p.flags,tuple(p.pan),
+			_quantize(p.origin or (0,0,0),tolerance),_quantize(p.u,tolerance*1e-3),_quantize(p.v,tolerance*1e-3))
+		polygons.append((tuple(verts[first:]+verts[:first]),surface))
+	polygons.sort()
+	transform:tuple=(
+		_quantize(b.location or (0,0,0),tolerance),
+		tuple(int(round(r))%65536 for r in b.rotation or (0,0,0)),
+		_quantize(b.mainscale or (1,1,1),tolerance*1e-3),
+		_quantize(b.postscale or (1,1,1),tolerance*1e-3),
+		_quantize(b.prepivot or (0,0,0),tolerance),
+		)
+	return BrushDigest(
+		b.actor_name,
+		hash(tuple(g for g,_ in polygons)),
+		hash(tuple(s for _,s in polygons)),
+		hash(transform),
+		hash((b.csg,b.polyflags,b.group)),
+		)
+
+def digest_file(path:str,tolerance:float=TOLERANCE)->dict[str,BrushDigest]:
+	"""
+	Digests of the brushes of a T3D file by actor name, in file order.
+	Brushes are streamed, only the digests are kept.
+	Repeated names get #2, #3... appended.
+	"""
+	digests:dict[str,BrushDigest]={}
+	with open(path,"rb") as raw, t3d_parser.open_t3d(raw) as file:
+		for b in t3d_parser.iter_brushes(file,path=path):
+			d:BrushDigest=digest_brush(b,tolerance)
+			key:str=d.name
+			number:int=1
+			while key in digests:
+				number+=1
+				key=f"{d.name}#{number}"
+			digests[key]=d._replace(name=key)
+	return digests
+
+class DiffReport:
+	""" Brushes added, removed, renamed and changed between two files. """
+	def __init__(self,old_path:str="",new_path:str="")->None:
+		self.old_path:str=old_path
+		self.new_path:str=new_path
+		self.added:list[str]=[]
+		self.removed:list[str]=[]
+		# Old and new name of brushes matched by geometry.
+		self.renamed:list[tuple[str,str]]=[]
+		# New name to the names of its CHANGES.
+		self.changed:dict[str,list[str]]={}
+		self.unchanged:int=0
+
+	def __bool__(self)->bool:
+		return bool(self.added or self.removed or self.renamed or self.changed)
+
+	def counts(self)->dict[str,int]:
+		""" Number of brushes of each kind of difference. """
+		counts:dict[str,int]={"added":len(self.added),"removed":len(self.removed),"renamed":len(self.renamed)}
+		for change in CHANGES:
+			counts[change]=sum(change in c for c in self.changed.values())
+		counts["unchanged"]=self.unchanged
+		return counts
+
+	def summary(self)->str:
+		""" One line of counts. """
+		counts:str=", ".join(f"{v} {k}" for k,v in self.counts().items())
+		return f"{self.old_path} -> {self.new_path}: {counts}."
+
+	def __str__(self)->str:
+		lines:list[str]=[self.summary()]
+		lines+=[f"+ {name}" for name in self.added]
+		lines+=[f"- {name}" for name in self.removed]
+		renamed:dict[str,str]={new:old for old,new in self.renamed}
+		for name,changes in self.changed.items():
+			lines.append(f"~ {name}: {', '.join(changes)}"+(f" (was {renamed.pop(name)})" if name in renamed else ""))
+		lines+=[f"> {old} -> {new}" for new,old in renamed.items()]
+		return "\n".join(lines)
+
+def _changes(old:BrushDigest,new:BrushDigest)->list[str]:
+	return [change for change,a,b in zip(CHANGES,old[1:],new[1:]) if a!=b]
+
+def diff(old:dict[str,BrushDigest],new:dict[str,BrushDigest],report:DiffReport|None=None)->DiffReport:
+	"""
+	Match brushes by name, then the rest by geometry hash, and report
+	what differs. Linear in the number of brushes.
+	"""
+	report=report if report is not None else DiffReport()
+	added:list[str]=[name for name in new if name not in old]
+	removed:list[str]=[name for name in old if name not in new]
+	for name,d in new.items():
+		if name in old:
+			changes:list[str]=_changes(old[name],d)
+			if changes:
+				report.changed[name]=changes
+			else:
+				report.unchanged+=1
+	# Renamed brushes keep their geometry. Identical brushes are paired
+	# first, then those that also kept their place.
+	matches:dict[str,str]={}
+	matched:set[str]=set()
+	for fields in (slice(1,None),slice(1,4,2),slice(1,2)):
+		by_key:dict[tuple,collections.deque[str]]={}
+		for name in removed:
+			if name not in matched:
+				by_key.setdefault(old[name][fields],collections.deque()).append(name)
+		for name in added:
+			candidates:collections.deque[str]|None=by_key.get(new[name][fields])
+			if name not in matches and candidates:
+				matches[name]=candidates.popleft()
+				matched.add(matches[name])
+	for name in added:
+		if name not in matches:
+			report.added.append(name)
+			continue
+		report.renamed.append((matches[name],name))
+		changes=_changes(old[matches[name]],new[name])
+		if changes:
+			report.changed[name]=changes
+	report.removed=[name for name in removed if name not in matched]
+	return report
+
+def diff_files(old_path:str,new_path:str,tolerance:float=TOLERANCE)->DiffReport:
+	""" Compare two T3D files. """
+	return diff(digest_file(old_path,tolerance),digest_file(new_path,tolerance),DiffReport(old_path,new_path))
+
+def main(argv:list[str]|None=None)->None:
+	""" Command line entry point. Exit code is 1 if the files differ. """
+	parser=argparse.ArgumentParser(description="Report brushes added, removed, moved or changed between two T3D files.")
+	parser.add_argument("old",help="Original T3D file")
+	parser.add_argument("new",help="Changed T3D file")
+	parser.add_argument("-t","--tolerance",type=float,default=TOLERANCE,help="Grid size coordinates are rounded to before comparing."
+		" Values rounding to different grid points differ, even when closer than this")
+	parser.add_argument("-s","--summary",action="store_true",help="Only print the counts")
+	args=parser.parse_args(argv)
+	report:DiffReport=diff_files(args.old,args.new,args.tolerance)
+	print(report.summary() if args.summary else report,flush=True)
+	sys.exit(1 if report else 0)
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,136 @@
+"""
+Generate synthetic T3D maps of any size for load testing.
+Usage:
+ python blender_t3d/t3d_generate.py 100000 -o big.t3d --seed 1
+"""
+import argparse
+import math
+import random
+import time
+from typing import IO, Iterator
+
+try:
+	from . import t3d
+except ImportError:
+	import t3d
+
+# Unreal units between grid points that sizes and locations snap to.
+GRID:float=16.0
+# Average space per brush, so maps grow in size instead of density.
+CELL_SIZE:float=1024.0
+
+def prism(sides:int,radius:float,height:float)->list[list[tuple[float,float,float]]]:
+	"""
+	Vertices of the faces of an upright prism around the origin, facing out.
+	Four sides make a box.
+	"""
+	ring:list[tuple[float,float]]=[
+		(radius*math.cos(math.tau*(i+0.5)/sides),radius*math.sin(math.tau*(i+0.5)/sides)) for i in range(sides)]
+	h:float=height/2
+	faces:list[list[tuple[float,float,float]]]=[
+		[(*ring[i],-h),(*ring[(i+1)%sides],-h),(*ring[(i+1)%sides],h),(*ring[i],h)] for i in range(sides)]
+	faces.append([(x,y,h) for x,y in ring])
+	faces.append([(x,y,-h) for x,y in reversed(ring)])
+	return faces
+
+def texture_axes(points:list[tuple[float,float,float]])->tuple[tuple,tuple]:
+	""" TextureU and TextureV of a face, with V pointing down on walls like UnrealEd. """
+	a,b,c=points[0],points[1],points[2]
+	normal_z:float=(b[0]-a[0])*(c[1]-a[1])-(b[1]-a[1])*(c[0]-a[0])
+	if abs(normal_z)>1e-6:
+		return (1.,0.,0.),(0.,1.,0.)
+	dx:float=b[0]-a[0]
+	dy:float=b[1]-a[1]
+	length:float=math.hypot(dx,dy) or 1.0
+	return (dx/length,dy/length,0.),(0.,0.,-1.)
+
+def generate_brushes(
+	count:int,
+	seed:int=0,
+	sides:tuple[int,int]=(4,4),
+	textures:int=16,
+	transform:float=0.0,
+	subtract:float=0.5,
+	nonsolid:float=0.0
+	)->Iterator[t3d.Brush]:
+	"""
+	Yield count brushes, the first one being the red builder brush.
+	seed: Same settings and seed give the same brushes.
+	sides: Range of the number of sides of the prisms, 4 for boxes.
+	textures: Number of different texture names.
+	transform: Chance for each of Rotation, MainScale, PostScale and PrePivot
+	to be set on a brush.
+	subtract: Fraction of subtractive brushes, the rest are additive.
+	nonsolid: Fraction of additive brushes that are semisolid or non solid.
+	"""
+	# pylint:disable=too-many-arguments,too-many-locals
+	rng:random.Random=random.Random(seed)
+	extent:float=CELL_SIZE*max(count,1)**(1/3)/2
+	for i in range(count):
+		red:bool=i==0
+		n:int=4 if red else rng.randint(*sides)
+		radius:float=128.0 if red else GRID*rng.randint(4,32)
+		height:float=256.0 if red else GRID*rng.randint(4,32)
+		polygons:list[t3d.Polygon]=[]
+		for points in prism(n,radius,height):
+			p:t3d.Polygon=t3d.Polygon()
+			p.add_vertices(points)
+			p.origin=points[0]
+			p.u,p.v=texture_axes(points)
+			p.texture=f"Generated.Texture{rng.randrange(max(textures,1))}"
+			polygons.append(p)
+		b:t3d.Brush=t3d.Brush(polygons,[t3d.round_to_grid(rng.uniform(-extent,extent),GRID) for _ in range(3)])
+		b.actor_name=f"Brush{i}"
+		b.brush_name=f"Model{i}"
+		if red:
+			b.csg="none"
+			b.group="Cube"
+			yield b
+			continue
+		b.csg="csg_subtract" if rng.random()<subtract else "csg_add"
+		if b.csg=="csg_add" and rng.random()<nonsolid:
+			b.polyflags=rng.choice((t3d.PF_SEMISOLID,t3d.PF_NOT_SOLID))
+		if rng.random()<transform:
+			b.rotation=(rng.randrange(0,65536,1024),rng.randrange(0,65536,1024),rng.randrange(0,65536,1024))
+		if rng.random()<transform:
+			b.mainscale=tuple(rng.choice((0.5,1.0,1.5,2.0)) for _ in range(3))
+		if rng.random()<transform:
+			b.postscale=tuple(rng.choice((0.5,1.0,2.0)) for _ in range(3))
+		if rng.random()<transform:
+			b.prepivot=tuple(GRID*rng.randint(-8,8) for _ in range(3))
+		yield b
+
+def write_map(file:IO[str],brushes:Iterator[t3d.Brush])->int:
+	""" Write brushes as a T3D map one at a time. Return the number written. """
+	written:int=0
+	file.write("Begin Map\n")
+	for b in brushes:
+		file.write(str(b))
+		written+=1
+	file.write("End Map\n")
+	return written
+
+def generate_map(path:str,count:int,**settings)->int:
+	""" Write a map of count brushes to path. settings go to generate_brushes(). """
+	with open(path,"wt",encoding="utf-8") as f:
+		return write_map(f,generate_brushes(count,**settings))
+
+def main(argv:list[str]|None=None)->None:
+	""" Command line entry point. """
+	parser=argparse.ArgumentParser(description="Generate a synthetic T3D map.")
+	parser.add_argument("count",type=int,help="Number of brushes")
+	parser.add_argument("-o","--output",default="generated.t3d",help="Output T3D file")
+	parser.add_argument("--seed",type=int,default=0,help="Random seed")
+	parser.add_argument("--sides",type=int,nargs=2,default=(4,4),metavar=("MIN","MAX"),help="Range of prism sides")
+	parser.add_argument("--textures",type=int,default=16,help="Number of different textures")
+	parser.add_argument("--transform",type=float,default=0.0,help="Chance of each brush transform being set")
+	parser.add_argument("--subtract",type=float,default=0.5,help="Fraction of subtractive brushes")
+	parser.add_argument("--nonsolid",type=float,default=0.0,help="Fraction of semisolid or non solid additive brushes")
+	args=parser.parse_args(argv)
+	time_start:float=time.perf_counter()
+	written:int=generate_map(args.output,args.count,seed=args.seed,sides=tuple(args.sides),textures=args.textures,
+		transform=args.transform,subtract=args.subtract,nonsolid=args.nonsolid)
+	print(f"{args.output}: {written} brushes in {time.perf_counter()-time_start:.2f} seconds.")
+
+if __name__=="__main__":
+	main()
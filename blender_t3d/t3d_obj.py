@@ -0,0 +1,176 @@
+"""
+Convert T3D files to Wavefront OBJ/MTL without Blender.
+Usage:
+ python blender_t3d/t3d_obj.py maps/ -o out/ -j 8
+Inputs can be T3D files or folders searched recursively. Files may be
+compressed with gzip, xz or bz2.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import IO, Iterator
+
+try:
+	from . import t3d, t3d_parser, textures
+except ImportError:
+	import t3d
+	import t3d_parser
+	import textures
+
+def write_brush(
+	obj:IO[str],
+	b:t3d.Brush,
+	first_index:int,
+	scale:float=1.0,
+	y_up:bool=False,
+	texture_size:float|None=None,
+	texture_index:dict[str,str]|None=None
+	)->int:
+	"""
+	Write one Brush as an OBJ object in world space.
+	first_index: OBJ index of the Brush's first vertex.
+	texture_size: Size of every texture. By default it comes from the image
+	of each texture in texture_index, see textures.texture_size.
+	Return the number of vertices written.
+	"""
+	matrix:list[list[float]]=b.get_matrix()
+	verts:list[list[float]]
+	faces:list[list[int]]
+	verts,_,faces=b.get_pydata()
+	lines:list[str]=[f"o {b.actor_name}\n"]
+	for v in verts:
+		x,y,z=(c*scale for c in t3d.transform_point(matrix,v))
+		lines.append(f"v {x:.6f} {z:.6f} {-y:.6f}\n" if y_up else f"v {x:.6f} {y:.6f} {z:.6f}\n")
+	for p in b.polygons:
+		width,height=(texture_size,texture_size) if texture_size else textures.texture_size(p.texture,texture_index)
+		for u,v in p.get_uvs():
+			lines.append(f"vt {u/width:.6f} {-v/height:.6f}\n")
+	texture:str|None=None
+	for p,face in zip(b.polygons,faces):
+		if p.texture!=texture:
+			texture=p.texture
+			lines.append(f"usemtl {texture or 'None'}\n")
+		lines.append("f "+" ".join(f"{i+first_index}/{i+first_index}" for i in face)+"\n")
+	obj.writelines(lines)
+	return len(verts)
+
+def write_mtl(mtl:IO[str],texture_names:list[str],texture_ext:str="")->None:
+	""" Write one material per texture name. """
+	for texture in texture_names:
+		mtl.write(f"newmtl {texture or 'None'}\nKd 0.8 0.8 0.8\n")
+		if texture and texture_ext:
+			mtl.write(f"map_Kd {texture}.{texture_ext}\n")
+		mtl.write("\n")
+
+def convert(
+	t3d_path:str,
+	obj_path:str,
+	scale:float=1.0,
+	y_up:bool=False,
+	texture_size:float|None=None,
+	texture_ext:str="",
+	texture_index:dict[str,str]|None=None
+	)->dict:
+	"""
+	Convert a T3D file to OBJ and MTL files.
+	Brushes are streamed from the parser to the OBJ file one at a time.
+	texture_index: Images to read texture sizes from, from
+	textures.index_textures.
+	Return statistics about the conversion.
+	"""
+	time_start:float=time.perf_counter()
+	mtl_path:Path=Path(obj_path).with_suffix(".mtl")
+	texture_names:dict[str,None]={}
+	brush_count:int=0
+	polygon_count:int=0
+	index:int=1
+	with open(t3d_path,"rb") as raw, t3d_parser.open_t3d(raw) as src, open(obj_path,"wt",encoding="utf-8") as obj:
+		obj.write(f"# Converted from {Path(t3d_path).name}\nmtllib {mtl_path.name}\n")
+		for b in t3d_parser.iter_brushes(src,path=t3d_path):
+			if b.group=='cube':
+				# Ignore red brush.
+				continue
+			index+=write_brush(obj,b,index,scale,y_up,texture_size,texture_index)
+			texture_names.update((p.texture,None) for p in b.polygons)
+			brush_count+=1
+			polygon_count+=len(b.polygons)
+	with open(mtl_path,"wt",encoding="utf-8") as mtl:
+		write_mtl(mtl,list(texture_names),texture_ext)
+	return {
+		"path":t3d_path,
+		"brushes":brush_count,
+		"polygons":polygon_count,
+		"vertices":index-1,
+		"bytes":os.path.getsize(t3d_path),
+		"seconds":time.perf_counter()-time_start,
+	}
+
+def find_t3d_files(paths:list[str])->Iterator[Path]:
+	""" Expand folders to the T3D files they contain. """
+	for p in map(Path,paths):
+		if p.is_dir():
+			yield from sorted(x for x in p.rglob("*") if x.name.lower().endswith(t3d_parser.T3D_EXTENSIONS))
+		else:
+			yield p
+
+def output_path(t3d_path:Path,roots:list[str],out_dir:str|None)->Path:
+	""" OBJ path for a T3D file, mirroring folder layout in out_dir. """
+	if t3d_path.suffix.lower() in (".gz",".xz",".bz2"):
+		# Compressed map.t3d.gz becomes map.obj.
+		t3d_path=t3d_path.with_suffix("")
+	if not out_dir:
+		return t3d_path.with_suffix(".obj")
+	for root in map(Path,roots):
+		if root.is_dir() and t3d_path.is_relative_to(root):
+			return (Path(out_dir)/t3d_path.relative_to(root)).with_suffix(".obj")
+	return (Path(out_dir)/t3d_path.name).with_suffix(".obj")
+
+def format_stats(stats:dict)->str:
+	""" One line summary with throughput. """
+	seconds:float=max(stats["seconds"],1e-9)
+	return (f"{stats['path']}: {stats['brushes']} brushes, {stats['polygons']} polygons"
+		f" in {seconds:.3f} s ({stats['bytes']/seconds/1e6:.2f} MB/s, {stats['brushes']/seconds:.0f} brushes/s)")
+
+def main(argv:list[str]|None=None)->None:
+	""" Command line entry point. """
+	parser=argparse.ArgumentParser(description="Convert T3D files to Wavefront OBJ/MTL.")
+	parser.add_argument("inputs",nargs="+",help="T3D files or folders")
+	parser.add_argument("-o","--output",help="Output folder (default: next to input)")
+	parser.add_argument("-j","--jobs",type=int,default=os.cpu_count(),help="Number of worker processes")
+	parser.add_argument("--scale",type=float,default=1.0,help="Scale multiplier")
+	parser.add_argument("--y-up",action="store_true",help="Convert Unreal Z up to Y up")
+	parser.add_argument("--texture-size",type=float,help="Texture size for UVs, instead of the image sizes or 256")
+	parser.add_argument("--texture-ext",default="",help="Add map_Kd <texture>.<ext> to materials")
+	parser.add_argument("--textures",default="",help="Folder of texture images to read sizes from")
+	args=parser.parse_args(argv)
+
+	files:list[Path]=list(find_t3d_files(args.inputs))
+	time_start:float=time.perf_counter()
+	# Indexed once rather than by every worker for every file.
+	texture_index:dict[str,str]=textures.index_textures(args.textures) if args.textures else {}
+	total_bytes:int=0
+	converted:int=0
+	with ProcessPoolExecutor(max_workers=max(args.jobs,1)) as executor:
+		futures:dict={}
+		for f in files:
+			out:Path=output_path(f,args.inputs,args.output)
+			out.parent.mkdir(parents=True,exist_ok=True)
+			futures[executor.submit(convert,str(f),str(out),args.scale,args.y_up,
+				args.texture_size,args.texture_ext,texture_index)]=f
+		for future in as_completed(futures):
+			try:
+				stats:dict=future.result()
+			except Exception as e:
+				# One bad map shouldn't stop the batch.
+				print(f"{futures[future]}: failed: {e!r}",flush=True)
+				continue
+			converted+=1
+			total_bytes+=stats["bytes"]
+			print(format_stats(stats),flush=True)
+	seconds:float=max(time.perf_counter()-time_start,1e-9)
+	print(f"Converted {converted} of {len(files)} files in {seconds:.3f} s ({total_bytes/seconds/1e6:.2f} MB/s).")
+
+if __name__=="__main__":
+	main()
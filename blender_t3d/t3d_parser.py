@@ -2,8 +2,18 @@
 T3D parser.
 """
 import ast
+import bz2
+import gzip
+import importlib
+import importlib.util
+import io
+import lzma
+import os
+import queue
 import re
+import threading
 from enum import IntEnum, auto
+from typing import IO, Callable, Container, Iterable, Iterator
 
 try:
 	from . import t3d
@@ -13,6 +23,27 @@ except ImportError:
 import time
 
 
+# File name endings of T3D files, plain or compressed.
+T3D_EXTENSIONS:tuple[str,...]=(".t3d",".t3d.gz",".t3d.xz",".t3d.bz2")
+# Magic bytes of compressed files and the functions decompressing them.
+COMPRESSIONS:tuple[tuple[bytes,Callable[[IO[bytes]],IO[bytes]]],...]=(
+	(b"\x1f\x8b",gzip.open),
+	(b"\xfd7zXZ\x00",lzma.open),
+	(b"BZh",bz2.open),
+	)
+
+def open_t3d(file:io.BufferedReader)->io.TextIOWrapper:
+	"""
+	Text stream of a T3D file opened in binary mode.
+	gzip, xz and bz2 files are recognized by their first bytes, whatever
+	their name, and decompressed as they are read.
+	"""
+	magic:bytes=file.peek(6)[:6]
+	for prefix,decompressor in COMPRESSIONS:
+		if magic.startswith(prefix):
+			return io.TextIOWrapper(decompressor(file),encoding="utf-8")
+	return io.TextIOWrapper(file,encoding="utf-8")
+
 class ParseError(SyntaxError):
 	""" Parse error exception. """
 	def __init__(self,filename:str,line:int,text:str,message:str)->None:
@@ -32,6 +63,24 @@ def filter_brushes(text:str)->str:
 	ret:str="\n".join(matches)
 	return ret
 
+BRUSH_ACTOR_RX:re.Pattern=re.compile(r"\s*Begin Actor Class=(?:Engine.)?Brush ",re.I)
+
+def filter_brush_lines(lines:Iterable[str],names:Container[str]|None=None)->Iterator[str]:
+	"""
+	Streaming version of filter_brushes.
+	Yield only the lines belonging to Brush actors.
+	names: Lowercase actor names to keep, all if None.
+	"""
+	inside:bool=False
+	for line in lines:
+		if inside:
+			yield line
+			if "end actor" in line.lower():
+				inside=False
+		elif BRUSH_ACTOR_RX.match(line) and (names is None or name_values(line.lower().split()).get("name") in names):
+			inside=True
+			yield line
+
 class Level(IntEnum):
 	""" Current nesting level. """
 	ROOT=0
@@ -49,6 +98,16 @@ def name_values(words:list[str])->dict[str,str]:
 			d[nv[0].strip()]=nv[1].strip()
 	return d
 
+# Quoted strings, names and punctuation of Actor properties.
+PROPERTY_TOKEN_RX:re.Pattern=re.compile(r'"[^"]*"|[a-zA-Z_]+|[()=]')
+
+def _python_token(m:re.Match)->str:
+	""" Python literal text for a property token. Quoted strings stay whole. """
+	token:str=m.group()
+	if token[0]=='"':
+		return repr(token[1:-1])
+	return {"(":"{",")":"}","=":":"}.get(token,f'"{token}"')
+
 def dict_from_t3d_property(line:str)->dict:
 	"""
 	Interpret a T3D Actor property as a Python nested dictionary.
@@ -57,9 +116,7 @@ def dict_from_t3d_property(line:str)->dict:
 	 gives:
 	 {'TempScale': {'Scale': {'X': 2.5, 'Y': 4}, 'SheerAxis': 'SHEER_ZX'}}
 	"""
-	x:str="{"+line+"}"
-	x=x.replace("(","{").replace(")","}").replace("=",":").replace("\"","")
-	x=re.sub(r'([a-zA-Z_]+)',r'"\1"',x)
+	x:str=PROPERTY_TOKEN_RX.sub(_python_token,"{"+line+"}")
 	d:dict={}
 	try:
 		d=ast.literal_eval(x)
@@ -121,15 +178,21 @@ def parse(text:str)->list[dict]:
 	Parse T3D text containing only Brush actors.
 	Return a list of brushes as nested dictionaries.
 	"""
-	text=text.lower()
+	return list(parse_iter(text.splitlines()))
+
+def parse_iter(lines:Iterable[str],path:str="")->Iterator[dict]:
+	"""
+	Parse lines of T3D text containing only Brush actors.
+	Yield brushes as nested dictionaries as soon as they are complete.
+	path: File name for errors.
+	"""
 	context:Level=Level.ROOT
-	brushes:list[dict]=[]
 	brush:dict={}
 	line_number:int
 	line:str
-	for line_number,line in enumerate(text.splitlines()):
+	for line_number,line in enumerate(lines):
 		# Remove whitespaces.
-		line=line.strip()
+		line=line.strip().lower()
 		# Skip empty line.
 		if not line:
 			continue
@@ -160,7 +223,7 @@ def parse(text:str)->list[dict]:
 			block_name=words[1]
 			if context==Level.ROOT:
 				# Brush completed.
-				brushes.append(brush)
+				yield brush
 		else:
 			if context==Level.ACTOR:
 				d:dict=dict_from_t3d_property(line)
@@ -168,43 +231,162 @@ def parse(text:str)->list[dict]:
 			if context==Level.POLYGON:
 				polyparam:dict=parse_polygon_property(line)
 				if not polyparam:
-					raise ParseError("filename",line_number,line,"Invalid Polygon property")
+					raise ParseError(path,line_number,line,"Invalid Polygon property")
 				# If it's a vertex, append to the list.
 				if polyparam.get("vertex",None):
 					polyparam["vertex"]=brush["polylist"][-1].get("vertex",[])+[polyparam["vertex"]]
 				brush["polylist"][-1].update(polyparam)
 	assert context==Level.ROOT,"Parser didn't end in root context."
-	return brushes
+
+def brush_from_dict(b:dict)->t3d.Brush:
+	""" Convert a dictionary from parse() to t3d.Brush. """
+	# Convert values to tuples.
+	if b.get("mainscale") and b.get("mainscale",{}).get("scale"):
+		b["mainscale"]["scale"]=coords_from_xyz_dict(b["mainscale"]["scale"],1.0)
+	if b.get("postscale") and b.get("postscale",{}).get("scale"):
+		b["postscale"]["scale"]=coords_from_xyz_dict(b["postscale"]["scale"],1.0)
+	if b.get("location"):
+		b["location"]=coords_from_xyz_dict(b["location"])
+	if b.get("prepivot"):
+		b["prepivot"]=coords_from_xyz_dict(b["prepivot"])
+	if b.get("rotation"):
+		b["rotation"]=rotation_from_dict(b["rotation"])
+	return t3d.Brush.from_dictionary(b)
+
+def iter_brushes(lines:Iterable[str],names:Container[str]|None=None,path:str="")->Iterator[t3d.Brush]:
+	"""
+	Yield t3d.Brush objects from lines of a T3D file, one at a time.
+	names: Lowercase actor names to parse, all if None. Other actors are
+	skipped without being parsed.
+	path: File name for errors.
+	"""
+	for b in parse_iter(filter_brush_lines(lines,names),path):
+		yield brush_from_dict(b)
 
 def t3d_open(path:str)->list[t3d.Brush]:
 	"""
 	Open and interpret T3D file.
-	path: Path to the T3D file.
+	path: Path to the T3D file, which may be compressed.
 	Return a list of t3d.Brush objects.
 	"""
-	with open(path,"rt",encoding="utf-8") as file:
+	with open(path,"rb") as raw, open_t3d(raw) as file:
 		time_start:float=time.time()
-		brushes_text:str=filter_brushes(file.read())
-		brushes:list[dict]=parse(brushes_text)
-		# Convert dictionaries to t3d.Brush.
-		tbs:list[t3d.Brush]=[]
-		for b in brushes:
-			# Convert values to tuples.
-			if b.get("mainscale") and b.get("mainscale",{}).get("scale"):
-				b["mainscale"]["scale"]=coords_from_xyz_dict(b["mainscale"]["scale"],1.0)
-			if b.get("postscale") and b.get("postscale",{}).get("scale"):
-				b["postscale"]["scale"]=coords_from_xyz_dict(b["postscale"]["scale"],1.0)
-			if b.get("location"):
-				b["location"]=coords_from_xyz_dict(b["location"])
-			if b.get("prepivot"):
-				b["prepivot"]=coords_from_xyz_dict(b["prepivot"])
-			if b.get("rotation"):
-				b["rotation"]=rotation_from_dict(b["rotation"])
-			tb:t3d.Brush=t3d.Brush.from_dictionary(b)
-			tbs.append(tb)
+		tbs:list[t3d.Brush]=list(iter_brushes(file,path=path))
 		print(f"blender_t3d: Loaded {len(tbs)} brushes from {path} in {time.time()-time_start} seconds.")
 		return tbs
 
+def _open_lark(path:str)->list[t3d.Brush]:
+	""" Open with the Lark LALR backend, which needs the lark package. """
+	module=importlib.import_module(f"{__package__}.t3d_parser_lark" if __package__ else "t3d_parser_lark")
+	return module.t3d_open(path)
+
+# Parser backends by name: function opening a T3D file and returning its
+# brushes, and the package it needs if any. All give the same brushes.
+BACKENDS:dict[str,tuple[Callable[[str],list[t3d.Brush]],str]]={
+	"line":(t3d_open,""),
+	"lark":(_open_lark,"lark"),
+	}
+
+def register_backend(name:str,open_function:Callable[[str],list[t3d.Brush]],requires:str="")->None:
+	""" Add or replace a parser backend. requires: Package it imports. """
+	BACKENDS[name]=(open_function,requires)
+
+def available_backends()->list[str]:
+	""" Names of backends whose required package is installed. """
+	return [name for name,(_,requires) in BACKENDS.items() if not requires or importlib.util.find_spec(requires)]
+
+def open_brushes(path:str,backend:str="line")->list[t3d.Brush]:
+	""" Open a T3D file with one of the BACKENDS. """
+	return BACKENDS[backend][0](path)
+
+class BackgroundParser:
+	"""
+	Parse a T3D file on a worker thread.
+	Brushes are passed through a bounded queue, so the consumer can use
+	them while the rest of the file is parsed and memory stays limited.
+	"""
+	# Marks the end of the queue.
+	_END:object=object()
+
+	def __init__(self,path:str,queue_size:int=256)->None:
+		self.path:str=path
+		# Brushes parsed so far.
+		self.count:int=0
+		# Bytes read so far and file size, for progress. Compressed files
+		# count their compressed bytes.
+		self.read:int=0
+		self.size:int=max(os.path.getsize(path),1)
+		self.finished:bool=False
+		self._error:BaseException|None=None
+		self._queue:queue.Queue=queue.Queue(maxsize=queue_size)
+		self._stop:threading.Event=threading.Event()
+		self._thread:threading.Thread=threading.Thread(target=self._run,daemon=True)
+		self._thread.start()
+
+	def __iter__(self)->Iterator[t3d.Brush]:
+		while True:
+			b:t3d.Brush|None=self.get()
+			if b is None:
+				return
+			yield b
+
+	@property
+	def fraction(self)->float:
+		""" Approximate fraction of the file parsed. """
+		return 1.0 if self.finished else min(self.read/self.size,1.0)
+
+	def cancel(self)->None:
+		""" Stop the worker and drop queued brushes. """
+		self._stop.set()
+		while self._thread.is_alive():
+			try:
+				self._queue.get(timeout=0.05)
+			except queue.Empty:
+				pass
+
+	def get(self,timeout:float|None=None)->t3d.Brush|None:
+		"""
+		Next brush, or None at the end of the file.
+		Raise queue.Empty if nothing arrived before timeout.
+		Errors from the worker are raised here.
+		"""
+		item=self._queue.get(timeout=timeout)
+		if item is self._END:
+			# Keep the end marker for later calls.
+			self._queue.put(item)
+			if self._error:
+				raise self._error
+			return None
+		return item
+
+	def _lines(self,raw:io.BufferedReader,file:IO[str])->Iterator[str]:
+		for line in file:
+			self.read=raw.tell()
+			yield line
+
+	def _put(self,item:object)->bool:
+		while not self._stop.is_set():
+			try:
+				self._queue.put(item,timeout=0.05)
+				return True
+			except queue.Full:
+				pass
+		return False
+
+	def _run(self)->None:
+		try:
+			with open(self.path,"rb") as raw, open_t3d(raw) as file:
+				for b in iter_brushes(self._lines(raw,file),path=self.path):
+					self.count+=1
+					if not self._put(b):
+						return
+		except Exception as e:
+			# Anything the parser raises, passed on by get().
+			self._error=e
+		finally:
+			self.finished=True
+			self._put(self._END)
+
 def test()->None:
 	""" Test. """
 	samples_list:tuple[str,...]=(
@@ -0,0 +1,135 @@
+"""
+T3D parser backend using a Lark LALR grammar.
+Needs the lark package. Gives the same brushes as the line parser.
+"""
+import time
+
+try:
+	import lark
+except ModuleNotFoundError:
+	raise ModuleNotFoundError("Dependency Lark is missing.") from None
+
+try:
+	from . import t3d, t3d_parser
+except ImportError:
+	import t3d
+	import t3d_parser
+
+# Works on lowercase text with only Brush actors, like the line parser.
+GRAMMAR:str=r"""
+start: _NL? actor*
+actor: "begin" "actor" pair* _NL (property _NL)* brush (property _NL)* "end" "actor" _NL?
+brush: "begin" "brush" pair* _NL "begin" "polylist" _NL polygon* "end" "polylist" _NL "end" "brush" _NL
+polygon: "begin" "polygon" pair* _NL (_polygon_line _NL)* "end" "polygon" _NL
+_polygon_line: vector_line | pan
+vector_line: VECTOR_NAME vector
+vector: NUMBER "," NUMBER "," NUMBER
+pan: "pan" "u" "=" NUMBER "v" "=" NUMBER
+pair: NAME "=" WORD
+property: key "=" value?
+key: NAME ("(" NUMBER ")")?
+?value: NUMBER -> number
+	| STRING -> string
+	| REFERENCE -> reference
+	| NAME -> name
+	| "(" [item ("," item)*] ")" -> struct
+item: key "=" value?
+VECTOR_NAME: "vertex" | "origin" | "normal" | "textureu" | "texturev"
+NAME: /[a-z_][a-z0-9_.]*/
+NUMBER: /[-+]?(\d+\.?\d*|\.\d+)(e[-+]?\d+)?/
+STRING: /"[^"\n]*"/
+REFERENCE.2: /[a-z_][a-z0-9_.]*'[^'\n]*'/
+WORD: /[^\s=]\S*/
+_NL: /(\r?\n[\t ]*)+/
+%ignore /[\t ]+/
+"""
+
+class BrushTransformer(lark.Transformer):
+	"""
+	Build the dictionaries of t3d_parser.parse() bottom up.
+	Properties that the line parser can't read become None and are skipped.
+	"""
+	# pylint:disable=missing-function-docstring
+	def actor(self,children:list)->t3d.Brush:
+		brush:dict={}
+		for child in children:
+			if isinstance(child,tuple):
+				if child[0]=="name":
+					brush["name"]=child[1]
+			elif child:
+				brush.update(child)
+		return t3d_parser.brush_from_dict(brush)
+	def brush(self,children:list)->dict:
+		pairs:dict[str,str]=dict(c for c in children if isinstance(c,tuple))
+		return {"brush_name":pairs.get("name",""),"polylist":[c for c in children if isinstance(c,dict)]}
+	def polygon(self,children:list)->dict:
+		p:dict={}
+		vertices:list[tuple]=[]
+		for name,value in children:
+			if name=="vertex":
+				vertices.append(value)
+			else:
+				p[name]=value
+		if p.get("flags",False):
+			p["flags"]=int(p["flags"])
+		if vertices:
+			p["vertex"]=vertices
+		return p
+	def vector_line(self,children:list)->tuple[str,tuple]:
+		return str(children[0]),children[1]
+	def vector(self,children:list)->tuple[float,...]:
+		return tuple(float(c) for c in children)
+	def pan(self,children:list)->tuple[str,tuple[int,int]]:
+		return "pan",(int(children[0]),int(children[1]))
+	def pair(self,children:list)->tuple[str,str]:
+		return str(children[0]),str(children[1])
+	def property(self,children:list)->dict|None:
+		key,value=self.item(children)
+		if key is None or value is None:
+			return None
+		return {key:value}
+	def key(self,children:list)->str|None:
+		# Array elements like Touching(0) aren't read.
+		return None if len(children)>1 else str(children[0])
+	def item(self,children:list)->tuple[str|None,object]:
+		# Empty values like Tag= aren't read.
+		return children[0],children[1] if len(children)>1 else None
+	def number(self,children:list)->int|float:
+		text:str=children[0]
+		return float(text) if any(c in text for c in ".e") else int(text)
+	def string(self,children:list)->str:
+		return children[0][1:-1]
+	def reference(self,_)->None:
+		return None
+	def name(self,children:list)->str:
+		return str(children[0])
+	def struct(self,children:list)->dict|None:
+		items:list=[c for c in children if c is not None]
+		if any(k is None or v is None for k,v in items):
+			return None
+		return dict(items)
+
+# Built on first use, making the tables takes a while.
+_parser:lark.Lark|None=None
+
+def parse_brushes(text:str)->list[t3d.Brush]:
+	""" Brushes in T3D text. """
+	global _parser # pylint:disable=global-statement
+	if _parser is None:
+		_parser=lark.Lark(GRAMMAR,parser="lalr",transformer=BrushTransformer(),maybe_placeholders=False)
+	text="".join(t3d_parser.filter_brush_lines(text.lower().splitlines(True)))
+	if not text.strip():
+		return []
+	return _parser.parse(text).children
+
+def t3d_open(path:str)->list[t3d.Brush]:
+	"""
+	Open and interpret T3D file.
+	path: Path to the T3D file, which may be compressed.
+	Return a list of t3d.Brush objects.
+	"""
+	with open(path,"rb") as raw, t3d_parser.open_t3d(raw) as file:
+		time_start:float=time.time()
+		tbs:list[t3d.Brush]=parse_brushes(file.read())
+		print(f"blender_t3d: Loaded {len(tbs)} brushes from {path} in {time.time()-time_start} seconds.")
+		return tbs
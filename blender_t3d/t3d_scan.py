@@ -0,0 +1,196 @@
+"""
+Scan T3D files for statistics and structural errors without building brushes.
+Usage:
+ python blender_t3d/t3d_scan.py maps/DM-Deck17.t3d
+"""
+import argparse
+import math
+import re
+import sys
+
+try:
+	from . import t3d, t3d_parser
+	from .t3d_parser import ParseError
+except ImportError:
+	import t3d
+	import t3d_parser
+	from t3d_parser import ParseError
+
+# Patterns work on lowercase text and start with a newline, which lets
+# the regex engine jump from line to line.
+# Begin and End lines: keyword, block name, rest of line.
+BLOCK_RX:re.Pattern=re.compile(r"\n[ \t]*(begin|end)[ \t]+(\w*)([^\n]*)")
+# Actor properties needed for counts and bounds.
+PROPERTY_RX:re.Pattern=re.compile(
+	r"\n[ \t]*((?:csgoper|group|location|rotation|mainscale|postscale|prepivot)=[^\n]*)")
+# Named numbers inside a property, like X=1 or Yaw=16384.
+FIELD_RX:re.Pattern=re.compile(r"\b(x|y|z|roll|pitch|yaw)=([-+]?[\d.e+-]+)")
+TEXTURE_RX:re.Pattern=re.compile(r"texture=(\S+)")
+VERTEX_RX:re.Pattern=re.compile(r"vertex[ \t]+([^,\n]+),([^,\n]+),([^,\n]+)")
+# Polygon property lines that parse_polygon_property accepts.
+_NUMBER:str=r"[ \t]*[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?[ \t]*"
+_LINE:str=rf"[ \t]*(?:pan[ \t]+u=[-+]?\d+[ \t]+v=[-+]?\d+|\S+[ \t]+{_NUMBER}(?:,{_NUMBER})*)?[ \t]*\r?"
+LINE_RX:re.Pattern=re.compile(_LINE)
+BODY_RX:re.Pattern=re.compile(rf"(?:{_LINE}\n)*")
+
+class ScanReport:
+	""" Statistics and errors found by scan(). """
+	# pylint:disable=too-many-instance-attributes
+	def __init__(self,path:str)->None:
+		self.path:str=path
+		self.brushes:int=0
+		self.polygons:int=0
+		self.vertices:int=0
+		# Name to number of faces.
+		self.textures:dict[str,int]={}
+		# Name to number of brushes.
+		self.groups:dict[str,int]={}
+		self.csg:dict[str,int]={}
+		# Map bounding box.
+		self.bounds_min:list[float]=[math.inf]*3
+		self.bounds_max:list[float]=[-math.inf]*3
+		self.errors:list[ParseError]=[]
+
+	def __str__(self)->str:
+		def counts(d:dict[str,int])->str:
+			return ", ".join(f"{k or '(none)'}: {v}" for k,v in sorted(d.items(),key=lambda x:-x[1]))
+		bounds:str="(empty)"
+		if self.brushes and self.vertices:
+			bounds=f"{t3d.format_vector(self.bounds_min)} to {t3d.format_vector(self.bounds_max)}"
+		lines:list[str]=[
+			f"{self.path}:",
+			f" {self.brushes} brushes, {self.polygons} polygons, {self.vertices} vertices",
+			f" CSG: {counts(self.csg)}",
+			f" Groups: {counts(self.groups)}",
+			f" Textures ({len(self.textures)}): {counts(self.textures)}",
+			f" Bounds: {bounds}",
+			f" {len(self.errors)} errors",
+			]
+		lines+=[f"  {e.filename}:{e.lineno}: {e.msg}: {e.text}" for e in self.errors]
+		return "\n".join(lines)
+
+	def add_bounds(self,b:t3d.Brush,local_min:list[float],local_max:list[float])->None:
+		"""
+		Grow map bounds with the corners of a Brush's local bounding box.
+		Rotated brushes make the result slightly larger than the geometry.
+		"""
+		matrix:list[list[float]]=b.get_matrix()
+		for corner in ((x,y,z) for x in (local_min[0],local_max[0])
+				for y in (local_min[1],local_max[1]) for z in (local_min[2],local_max[2])):
+			for i,c in enumerate(t3d.transform_point(matrix,corner)):
+				self.bounds_min[i]=min(self.bounds_min[i],c)
+				self.bounds_max[i]=max(self.bounds_max[i],c)
+
+def brush_from_properties(lines:list[str])->t3d.Brush:
+	"""
+	Brush without polygons from lowercase actor property lines.
+	A lighter dict_from_t3d_property for the few properties scan() needs.
+	"""
+	b:t3d.Brush=t3d.Brush()
+	for line in lines:
+		key,_,value=line.partition("=")
+		if key=="csgoper":
+			b.csg=str(t3d.CsgOper(value.strip()))
+		elif key=="group":
+			b.group=value.strip().strip('"')
+		else:
+			fields:dict[str,float]={k:float(v) for k,v in FIELD_RX.findall(value)}
+			if key=="rotation":
+				b.rotation=t3d_parser.rotation_from_dict(fields)
+			elif key in ("mainscale","postscale"):
+				setattr(b,key,t3d_parser.coords_from_xyz_dict(fields,1.0))
+			else:
+				setattr(b,key,t3d_parser.coords_from_xyz_dict(fields))
+	return b
+
+def scan(path:str)->ScanReport:
+	"""
+	Read a T3D file once and report counts, bounds and every structural
+	error with its line number, instead of stopping at the first one.
+	Only Begin/End lines are visited one by one, block contents are
+	checked with regular expressions.
+	"""
+	# pylint:disable=too-many-locals,too-many-statements
+	report:ScanReport=ScanReport(path)
+	with open(path,"rb") as raw, t3d_parser.open_t3d(raw) as file:
+		text:str="\n"+file.read().lower()
+	# Open blocks as (name,line number,end of line position).
+	stack:list[tuple[str,int,int]]=[]
+	# Start of the current Brush actor, or -1.
+	brush_start:int=-1
+	# Vertex coordinates of the current Brush, per axis.
+	coords:list[list[str]]=[[],[],[]]
+	line_number:int=0
+	position:int=0
+	for m in BLOCK_RX.finditer(text):
+		line_number+=text.count("\n",position,m.start()+1)
+		position=m.start()+1
+		name:str=m.group(2)
+		if m.group(1)=="begin":
+			stack.append((name,line_number,m.end()))
+			if name=="actor" and t3d_parser.BRUSH_ACTOR_RX.match(m.group(0),1):
+				brush_start=m.end()
+				coords=[[],[],[]]
+			continue
+		if not stack:
+			report.errors.append(ParseError(path,line_number,m.group(0).strip(),"End without Begin"))
+			continue
+		if stack[-1][0]!=name:
+			report.errors.append(ParseError(path,line_number,m.group(0).strip(),
+				f"Expected End {stack[-1][0]} for line {stack[-1][1]}"))
+			if name not in (n for n,_,_ in stack):
+				continue
+			while stack[-1][0]!=name:
+				stack.pop()
+		begin_line:int
+		begin_end:int
+		_,begin_line,begin_end=stack.pop()
+		if brush_start<0:
+			continue
+		if name=="polygon":
+			header:str=text[text.rfind("\n",0,begin_end)+1:begin_end]
+			texture_match:re.Match|None=TEXTURE_RX.search(header)
+			texture:str=texture_match.group(1) if texture_match else ""
+			report.textures[texture]=report.textures.get(texture,0)+1
+			report.polygons+=1
+			body:str=text[begin_end+1:m.start()+1]
+			valid:bool=bool(BODY_RX.fullmatch(body))
+			if not valid:
+				for i,line in enumerate(body.split("\n")):
+					if not LINE_RX.fullmatch(line):
+						report.errors.append(ParseError(path,begin_line+1+i,line.strip(),"Invalid Polygon property"))
+			vertices:list[tuple[str,str,str]]=VERTEX_RX.findall(body)
+			report.vertices+=len(vertices)
+			if len(vertices)<3:
+				report.errors.append(ParseError(path,begin_line,header.strip(),
+					f"Polygon has {len(vertices)} vertices"))
+			if vertices and valid:
+				for axis,values in zip(coords,zip(*vertices)):
+					axis.extend(values)
+		elif name=="actor":
+			b:t3d.Brush=brush_from_properties(PROPERTY_RX.findall(text,brush_start,m.start()+1))
+			report.brushes+=1
+			report.groups[b.group]=report.groups.get(b.group,0)+1
+			report.csg[b.csg]=report.csg.get(b.csg,0)+1
+			if coords[0]:
+				floats:list[list[float]]=[list(map(float,axis)) for axis in coords]
+				report.add_bounds(b,[min(x) for x in floats],[max(x) for x in floats])
+			brush_start=-1
+	for name,line,_ in stack:
+		report.errors.append(ParseError(path,line,"",f"Begin {name} is never closed"))
+	return report
+
+def main(argv:list[str]|None=None)->None:
+	""" Command line entry point. Exit code is 1 if any file has errors. """
+	parser=argparse.ArgumentParser(description="Report T3D statistics and structural errors.")
+	parser.add_argument("inputs",nargs="+",help="T3D files")
+	args=parser.parse_args(argv)
+	failed:bool=False
+	for path in args.inputs:
+		report:ScanReport=scan(path)
+		failed|=bool(report.errors)
+		print(report,flush=True)
+	sys.exit(1 if failed else 0)
+
+if __name__=="__main__":
+	main()
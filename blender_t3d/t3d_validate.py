@@ -0,0 +1,308 @@
+"""
+Check that brushes are closed convex volumes, as UnrealEd's CSG expects.
+The planes of all polygons are fitted at once and every vertex of a brush
+is tested against every plane of that brush in batched numpy operations.
+Usage:
+ python blender_t3d/t3d_validate.py map.t3d
+"""
+import argparse
+import sys
+from typing import Iterator, NamedTuple
+
+import numpy
+
+try:
+	from . import t3d, t3d_parser
+except ImportError:
+	import t3d
+	import t3d_parser
+
+# Distance vertices may stick out of the planes of their brush, UnrealEd's
+# THRESH_POINT_ON_PLANE.
+TOLERANCE:float=0.1
+# Vertex and plane pairs tested per batch, bounds memory use.
+BATCH_SIZE:int=1<<20
+# Grid vertices are rounded to before pairing edges.
+EDGE_GRID:float=0.1
+
+class BrushCheck(NamedTuple):
+	""" Validation result of one brush. """
+	name:str
+	closed:bool
+	# Largest distance by which vertices lie on both sides of a face plane.
+	# Non-planar faces count too.
+	concavity:float
+	convex:bool
+	# Sheets and other non-solid brushes may be open or concave.
+	solid:bool=True
+
+	@property
+	def valid(self)->bool:
+		""" Whether the brush is a closed convex volume, or needn't be one. """
+		return not self.solid or (self.closed and self.convex)
+
+	def __str__(self)->str:
+		if not self.solid:
+			return f"{self.name}: non-solid"
+		problems:list[str]=([] if self.closed else ["open"])+([] if self.convex else [f"concave by {self.concavity:g}"])
+		return f"{self.name}: {', '.join(problems) or 'valid'}"
+
+class ValidationReport:
+	""" Checks of every brush, in order. """
+	def __init__(self,checks:list[BrushCheck],path:str="")->None:
+		self.checks:list[BrushCheck]=checks
+		self.path:str=path
+
+	def has_errors(self)->bool:
+		""" Whether any solid brush is open or concave. """
+		return any(not c.valid for c in self.checks)
+
+	def invalid(self)->list[BrushCheck]:
+		""" Solid brushes that are open or concave. """
+		return [c for c in self.checks if not c.valid]
+
+	def summary(self)->str:
+		""" One line of counts. Non-solid brushes are only counted. """
+		open_count:int=sum(c.solid and not c.closed for c in self.checks)
+		concave:int=sum(c.solid and not c.convex for c in self.checks)
+		non_solid:int=sum(not c.solid for c in self.checks)
+		return (f"{self.path or 'Brushes'}: {len(self.checks)} brushes, {open_count} open, {concave} concave,"
+			f" {non_solid} non-solid.")
+
+	def __str__(self)->str:
+		lines:list[str]=[self.summary()]
+		lines+=[f" {c}" for c in self.invalid()]
+		return "\n".join(lines)
+
+def polygon_planes(coords:numpy.ndarray,counts:numpy.ndarray)->tuple[numpy.ndarray,numpy.ndarray,numpy.ndarray]:
+	"""
+	Best fit planes of many polygons in one pass.
+	coords: (N,3) vertices of all polygons one after another.
+	counts: Number of vertices of each polygon, at least one.
+	Return (P,3) centroids, (P,3) unit normals facing the same side as the
+	winding, and the largest distance of each polygon's vertices to its plane.
+	"""
+	starts:numpy.ndarray=numpy.cumsum(counts)-counts
+	owner:numpy.ndarray=numpy.repeat(numpy.arange(len(counts)),counts)
+	centroids:numpy.ndarray=numpy.add.reduceat(coords,starts)/counts[:,None]
+	offsets:numpy.ndarray=coords-centroids[owner]
+	# The normal is the direction of least spread.
+	covariance:numpy.ndarray=numpy.add.reduceat(offsets[:,:,None]*offsets[:,None,:],starts)
+	normals:numpy.ndarray=numpy.linalg.eigh(covariance)[1][:,:,0]
+	# Orient like Newell's normal.
+	following:numpy.ndarray=numpy.arange(1,len(coords)+1)
+	following[starts+counts-1]=starts
+	area:numpy.ndarray=numpy.add.reduceat(numpy.cross(offsets,offsets[following]),starts)
+	normals[numpy.einsum("ni,ni->n",normals,area)<0]*=-1
+	distances:numpy.ndarray=numpy.abs(numpy.einsum("ni,ni->n",offsets,normals[owner]))
+	return centroids,normals,numpy.maximum.reduceat(distances,starts)
+
+def _brush_pairs(
+	a_starts:numpy.ndarray,
+	a_counts:numpy.ndarray,
+	b_starts:numpy.ndarray,
+	b_counts:numpy.ndarray
+	)->Iterator[tuple[slice,numpy.ndarray,numpy.ndarray]]:
+	"""
+	Every a with every b of the same brush, a batch of brushes at a time.
+	Arguments are the first index and count of a and b in each brush.
+	Yield the slice of brushes in the batch and the a and b index of each
+	pair, grouped by a.
+	"""
+	work:numpy.ndarray=a_counts*b_counts
+	ends:numpy.ndarray=numpy.cumsum(work)
+	first:int=0
+	while first<len(work):
+		last:int=max(int(numpy.searchsorted(ends,ends[first]-work[first]+BATCH_SIZE,side="right")),first+1)
+		batch:slice=slice(first,last)
+		batch_work:numpy.ndarray=work[batch]
+		brush:numpy.ndarray=numpy.repeat(numpy.arange(last-first),batch_work)
+		k:numpy.ndarray=numpy.arange(len(brush))-numpy.repeat(numpy.cumsum(batch_work)-batch_work,batch_work)
+		b_count:numpy.ndarray=b_counts[batch][brush]
+		yield batch,a_starts[batch][brush]+k//b_count,b_starts[batch][brush]+k%b_count
+		first=last
+
+def _paired(brush:numpy.ndarray,starts:numpy.ndarray,ends:numpy.ndarray,brush_count:int)->numpy.ndarray:
+	"""
+	Whether every directed edge of each brush is matched by its reverse.
+	Brushes without edges are False.
+	"""
+	forward:numpy.ndarray=numpy.column_stack((brush,starts,ends))
+	backward:numpy.ndarray=numpy.column_stack((brush,ends,starts))
+	# Sorted by brush first, both hold the same number of edges per brush,
+	# so edges of a closed brush line up with their reverse.
+	forward=forward[numpy.lexsort(forward.T[::-1])]
+	backward=backward[numpy.lexsort(backward.T[::-1])]
+	paired:numpy.ndarray=numpy.zeros(brush_count,dtype=bool)
+	paired[forward[:,0]]=True
+	paired[forward[(forward!=backward).any(axis=1),0]]=False
+	return paired
+
+def closed_brushes(
+	coords:numpy.ndarray,
+	polygon_counts:numpy.ndarray,
+	brush_polygon_counts:numpy.ndarray,
+	grid:float=EDGE_GRID
+	)->numpy.ndarray:
+	"""
+	Whether each brush is closed: every edge of its polygons is matched by
+	the reverse edge of another, vertices being rounded to grid. Where that
+	fails, vertices a grid step apart are welded and edges split at the
+	vertices lying on them, so T-junctions still pair up.
+	Edges collapsed by rounding are left out, brushes without edges are
+	open. Arguments as check_arrays.
+	"""
+	brush_count:int=len(brush_polygon_counts)
+	if not len(polygon_counts):
+		return numpy.zeros(brush_count,dtype=bool)
+	polygon_starts:numpy.ndarray=numpy.cumsum(polygon_counts)-polygon_counts
+	following:numpy.ndarray=numpy.arange(1,len(coords)+1)
+	following[polygon_starts+polygon_counts-1]=polygon_starts
+	vertex_brush:numpy.ndarray=numpy.repeat(numpy.repeat(numpy.arange(brush_count),brush_polygon_counts),polygon_counts)
+	points:numpy.ndarray=numpy.round(coords/grid).astype(numpy.int64)
+	keep:numpy.ndarray=(points!=points[following]).any(axis=1)
+	brush:numpy.ndarray=vertex_brush[keep]
+	starts:numpy.ndarray=points[keep]
+	ends:numpy.ndarray=points[following][keep]
+	closed:numpy.ndarray=_paired(brush,starts,ends,brush_count)
+
+	# Weld the vertices of the other brushes, rounding may have parted them,
+	# split their edges at the vertices lying on them, then pair again.
+	retry:numpy.ndarray=numpy.zeros(brush_count,dtype=bool)
+	retry[brush]=True
+	retry&=~closed
+	if not retry.any():
+		return closed
+	retry_coords:numpy.ndarray=numpy.flatnonzero(retry[vertex_brush])
+	vertices,inverse=numpy.unique(numpy.column_stack((vertex_brush,points))[retry_coords],axis=0,return_inverse=True)
+	vertex_counts:numpy.ndarray=numpy.bincount(vertices[:,0],minlength=brush_count)
+	vertex_starts:numpy.ndarray=numpy.cumsum(vertex_counts)-vertex_counts
+	welded:numpy.ndarray=numpy.arange(len(vertices))
+	for _,a,b in _brush_pairs(vertex_starts,vertex_counts,vertex_starts,vertex_counts):
+		near:numpy.ndarray=(numpy.abs(vertices[a,1:]-vertices[b,1:])<=1).all(axis=1)
+		numpy.minimum.at(welded,a[near],b[near])
+	index:numpy.ndarray=numpy.zeros(len(coords),dtype=numpy.int64)
+	index[retry_coords]=welded[inverse.ravel()]
+	starts=index[retry_coords]
+	ends=index[following[retry_coords]]
+	keep=starts!=ends
+	starts,ends=starts[keep],ends[keep]
+	brush=vertex_brush[retry_coords][keep]
+	kept:numpy.ndarray=numpy.flatnonzero(welded==numpy.arange(len(vertices)))
+	edge_counts:numpy.ndarray=numpy.bincount(brush,minlength=brush_count)
+	kept_counts:numpy.ndarray=numpy.bincount(vertices[kept,0],minlength=brush_count)
+	edges:numpy.ndarray=numpy.arange(len(brush))
+	split_edges:list[numpy.ndarray]=[edges,edges]
+	split_t:list[numpy.ndarray]=[numpy.zeros(len(edges)),numpy.ones(len(edges))]
+	split_vertices:list[numpy.ndarray]=[starts,ends]
+	for _,edge,v in _brush_pairs(numpy.cumsum(edge_counts)-edge_counts,edge_counts,
+		numpy.cumsum(kept_counts)-kept_counts,kept_counts):
+		vertex:numpy.ndarray=kept[v]
+		direction:numpy.ndarray=(vertices[ends[edge],1:]-vertices[starts[edge],1:]).astype(numpy.float64)
+		offset:numpy.ndarray=(vertices[vertex,1:]-vertices[starts[edge],1:]).astype(numpy.float64)
+		along:numpy.ndarray=numpy.einsum("ni,ni->n",offset,direction)
+		length:numpy.ndarray=numpy.einsum("ni,ni->n",direction,direction)
+		# Strictly between the ends and within a grid step of the edge.
+		side:numpy.ndarray=numpy.cross(offset,direction)
+		inside:numpy.ndarray=(along>0)&(along<length)&(numpy.einsum("ni,ni->n",side,side)<=length)
+		inside&=(vertex!=starts[edge])&(vertex!=ends[edge])
+		split_edges.append(edge[inside])
+		split_t.append(along[inside]/length[inside])
+		split_vertices.append(vertex[inside])
+	edge=numpy.concatenate(split_edges)
+	order:numpy.ndarray=numpy.lexsort((numpy.concatenate(split_t),edge))
+	edge=edge[order]
+	chain:numpy.ndarray=numpy.concatenate(split_vertices)[order]
+	# Consecutive vertices along the same edge make its pieces.
+	piece:numpy.ndarray=numpy.flatnonzero((edge[1:]==edge[:-1])&(chain[1:]!=chain[:-1]))
+	closed[retry]=_paired(brush[edge[piece]],chain[piece],chain[piece+1],brush_count)[retry]
+	return closed
+
+def check_arrays(
+	coords:numpy.ndarray,
+	polygon_counts:numpy.ndarray,
+	brush_polygon_counts:numpy.ndarray,
+	)->tuple[numpy.ndarray,numpy.ndarray]:
+	"""
+	Check brushes given as flat arrays.
+	coords: (N,3) vertices of all polygons of all brushes one after another.
+	polygon_counts: Number of vertices of each polygon, at least one.
+	brush_polygon_counts: Number of polygons of each brush.
+	Return whether each brush is closed, see closed_brushes, and its
+	concavity.
+	"""
+	closed:numpy.ndarray=closed_brushes(coords,polygon_counts,brush_polygon_counts)
+	concavity:numpy.ndarray=numpy.zeros(len(brush_polygon_counts))
+	if not len(polygon_counts):
+		return closed,concavity
+	centroids,normals,_=polygon_planes(coords,polygon_counts)
+	polygon_starts:numpy.ndarray=numpy.cumsum(polygon_counts)-polygon_counts
+
+	used:numpy.ndarray=numpy.flatnonzero(brush_polygon_counts>0)
+	plane_counts:numpy.ndarray=brush_polygon_counts[used]
+	plane_starts:numpy.ndarray=(numpy.cumsum(brush_polygon_counts)-brush_polygon_counts)[used]
+	vertex_counts:numpy.ndarray=numpy.add.reduceat(polygon_counts,plane_starts)
+	vertex_starts:numpy.ndarray=polygon_starts[plane_starts]
+
+	# Every vertex against every plane of its brush, a batch of brushes at a time.
+	for batch,plane,vertex in _brush_pairs(plane_starts,plane_counts,vertex_starts,vertex_counts):
+		distances:numpy.ndarray=numpy.einsum("ni,ni->n",coords[vertex]-centroids[plane],normals[plane])
+		# Pairs are grouped by plane, planes by brush.
+		groups:numpy.ndarray=numpy.flatnonzero(numpy.diff(plane,prepend=-1))
+		depth:numpy.ndarray=numpy.minimum(numpy.maximum.reduceat(distances,groups),-numpy.minimum.reduceat(distances,groups))
+		brush_groups:numpy.ndarray=numpy.cumsum(plane_counts[batch])-plane_counts[batch]
+		concavity[used[batch]]=numpy.maximum(numpy.maximum.reduceat(depth,brush_groups),0)
+	return closed,concavity
+
+def validate_brushes(brushes:list[t3d.Brush],tolerance:float=TOLERANCE,names:list[str]|None=None)->ValidationReport:
+	"""
+	Check brushes in their own space, which keeps convexity.
+	Brushes with PF_NOT_SOLID, like sheets, are reported as non-solid.
+	names: Names for the report, actor names by default.
+	"""
+	polygons:list[list[t3d.Polygon]]=[[p for p in b.polygons if p.vertices] for b in brushes]
+	coords:numpy.ndarray=numpy.array([v.coords for ps in polygons for p in ps for v in p.vertices],dtype=numpy.float64).reshape(-1,3)
+	polygon_counts:numpy.ndarray=numpy.array([len(p.vertices) for ps in polygons for p in ps],dtype=numpy.int64)
+	brush_polygon_counts:numpy.ndarray=numpy.array([len(ps) for ps in polygons],dtype=numpy.int64)
+	return report_arrays(coords,polygon_counts,brush_polygon_counts,names or [b.actor_name for b in brushes],tolerance,
+		solid=[not b.polyflags&t3d.PF_NOT_SOLID for b in brushes])
+
+def report_arrays(
+	coords:numpy.ndarray,
+	polygon_counts:numpy.ndarray,
+	brush_polygon_counts:numpy.ndarray,
+	names:list[str],
+	tolerance:float=TOLERANCE,
+	path:str="",
+	solid:list[bool]|None=None
+	)->ValidationReport:
+	"""
+	check_arrays as a report.
+	solid: Whether each brush must be a closed convex volume, all by default.
+	"""
+	closed,concavity=check_arrays(coords,polygon_counts,brush_polygon_counts)
+	solid=solid if solid is not None else [True]*len(names)
+	return ValidationReport([BrushCheck(n,c,d,d<=tolerance,s)
+		for n,c,d,s in zip(names,closed.tolist(),concavity.tolist(),solid)],path)
+
+def validate_file(path:str,tolerance:float=TOLERANCE)->ValidationReport:
+	""" Check the brushes of a T3D file. """
+	report:ValidationReport=validate_brushes(t3d_parser.t3d_open(path),tolerance)
+	report.path=path
+	return report
+
+def main(argv:list[str]|None=None)->None:
+	""" Command line entry point. Exit code is 1 if any brush is invalid. """
+	parser=argparse.ArgumentParser(description="Report brushes that aren't closed convex volumes.")
+	parser.add_argument("inputs",nargs="+",help="T3D files")
+	parser.add_argument("-t","--tolerance",type=float,default=TOLERANCE,help="Distance vertices may stick out of face planes")
+	args=parser.parse_args(argv)
+	failed:bool=False
+	for path in args.inputs:
+		report:ValidationReport=validate_file(path,args.tolerance)
+		failed|=report.has_errors()
+		print(report,flush=True)
+	sys.exit(1 if failed else 0)
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,99 @@
+"""
+Texture files on disk.
+"""
+import os
+import struct
+from pathlib import Path
+
+IMAGE_EXTENSIONS:tuple[str,...]=(".png",".bmp",".tga",".pcx",".jpg",".jpeg",".dds")
+# Size of textures whose image isn't known.
+DEFAULT_SIZE:tuple[int,int]=(256,256)
+# Image path to size read from its header.
+_sizes:dict[str,tuple[int,int]|None]={}
+# Folder names left out of texture names, like UnrealEd's batch export
+# Package/Textures/Name.png.
+_SKIPPED_FOLDERS:tuple[str,...]=("textures","texture")
+
+def index_textures(folder:str)->dict[str,str]:
+	"""
+	Map lowercase texture names to image paths in folder and subfolders.
+	An image is listed under its file name, the last part of a dotted
+	file name and its path as Package.Group.Name, so Package/Group/Name.png,
+	Package.Group.Name.png and Name.png are all found.
+	The first image found keeps a name.
+	"""
+	index:dict[str,str]={}
+	root:Path=Path(folder)
+	for directory,subdirs,files in os.walk(root):
+		subdirs.sort()
+		parts:list[str]=[p for p in Path(directory).relative_to(root).parts if p.lower() not in _SKIPPED_FOLDERS]
+		for name in sorted(files):
+			stem,ext=os.path.splitext(name)
+			if ext.lower() not in IMAGE_EXTENSIONS:
+				continue
+			path:str=os.path.join(directory,name)
+			for key in (".".join(parts+[stem]),stem,stem.rpartition(".")[2]):
+				index.setdefault(key.lower(),path)
+	return index
+
+def find_texture(index:dict[str,str],name:str)->str|None:
+	""" Image path for a texture name, trying the full name then its last part. """
+	name=name.lower()
+	return index.get(name) or index.get(name.rpartition(".")[2])
+
+def read_image_size(path:str)->tuple[int,int]|None:
+	"""
+	Width and height of a PNG, BMP, TGA or PCX image from its header,
+	without decoding pixels. None for other or unreadable files.
+	Results are cached per path.
+	"""
+	if path in _sizes:
+		return _sizes[path]
+	size:tuple[int,int]|None=None
+	try:
+		with open(path,"rb") as f:
+			header:bytes=f.read(32)
+	except OSError:
+		header=b""
+	if header[:8]==b"\x89PNG\r\n\x1a\n" and header[12:16]==b"IHDR":
+		size=struct.unpack(">II",header[16:24])
+	elif header[:2]==b"BM" and len(header)>=26:
+		if struct.unpack("<I",header[14:18])[0]==12:
+			size=struct.unpack("<HH",header[18:22])
+		else:
+			width,height=struct.unpack("<ii",header[18:26])
+			size=(width,abs(height))
+	elif header[:1]==b"\x0a" and len(header)>=12 and header[1] in (0,2,3,4,5):
+		xmin,ymin,xmax,ymax=struct.unpack("<4H",header[4:12])
+		size=(xmax-xmin+1,ymax-ymin+1)
+	elif path.lower().endswith(".tga") and len(header)>=18 and header[2] in (1,2,3,9,10,11):
+		size=struct.unpack("<HH",header[12:16])
+	if size and (size[0]<=0 or size[1]<=0):
+		size=None
+	_sizes[path]=size
+	return size
+
+def material_image_path(material)->str|None:
+	""" Absolute path of the first image in a Blender material's nodes. """
+	if material is None or not material.node_tree:
+		return None
+	for node in material.node_tree.nodes:
+		image=getattr(node,"image",None)
+		if image and image.filepath:
+			return image.filepath_from_user()
+	return None
+
+def texture_size(
+	name:str,
+	index:dict[str,str]|None=None,
+	image_path:str|None=None
+	)->tuple[int,int]:
+	"""
+	Width and height of a texture, from image_path or the image of name in
+	index. DEFAULT_SIZE if neither can be read.
+	"""
+	for path in (image_path,find_texture(index,name) if index and name else None):
+		size:tuple[int,int]|None=read_image_size(path) if path else None
+		if size:
+			return size
+	return DEFAULT_SIZE
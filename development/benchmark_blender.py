@@ -0,0 +1,48 @@
+"""
+Time the importer and exporter on generated maps.
+Outside Blender the stand-ins in development/fake_blender are used, so the
+numbers compare versions of the add-on rather than predict Blender's.
+Run from the repository root:
+ python development/benchmark_blender.py [brush count]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd()+"/blender_t3d")
+try:
+	import bpy
+except ImportError:
+	sys.path.append(os.getcwd()+"/development/fake_blender")
+	import bpy
+import exporter
+import importer
+import t3d
+import t3d_generate
+
+def timed(label:str,count:int,function,*args):
+	""" Call function, print the time per item and return the result. """
+	time_start:float=time.perf_counter()
+	result=function(*args)
+	seconds:float=time.perf_counter()-time_start
+	print(f"{label:26} {seconds:7.3f} s, {seconds/count*1e6:8.1f} µs per brush")
+	return result
+
+def main()->None:
+	""" main() """
+	count:int=int(sys.argv[1]) if len(sys.argv)>1 else 2000
+	brushes:list[t3d.Brush]=list(t3d_generate.generate_brushes(count,sides=(4,8),transform=0.25))[1:]
+	print(f"{len(brushes)} brushes, {sum(len(b.polygons) for b in brushes)} polygons, bpy from {os.path.dirname(bpy.__file__)}")
+	collection=bpy.data.collections.new("benchmark")
+	bpy.context.scene.collection.children.link(collection)
+	objects:list=timed("create_object",len(brushes),lambda:[importer.create_object(collection,b)[0] for b in brushes])
+	merged=timed("create_merged_object",len(brushes),lambda:importer.create_merged_object(collection,"merged",brushes,True)[0])
+	timed("brush_from_object",len(brushes),lambda:[exporter.brush_from_object(o) for o in objects])
+	timed("brushes_from_merged_object",len(brushes),exporter.brushes_from_merged_object,merged)
+	timed("export",len(brushes),exporter.export,objects)
+	# Planarity check against the serialization it precedes.
+	timed("repair_nonplanar",len(brushes),exporter.repair_nonplanar,brushes,'NONE')
+	timed("serialize_brushes",len(brushes),lambda:t3d.serialize_brushes([b.to_data() for b in brushes]))
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,60 @@
+"""
+Compare reading and parsing gzip, xz and bz2 compressed T3D files with
+the same files uncompressed on local disk.
+Run from the repository root:
+ python development/benchmark_compressed.py [T3D files]
+Without arguments a sample map and a generated map are used.
+"""
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd()+"/blender_t3d")
+import t3d_generate
+import t3d_parser
+
+COMPRESSORS:dict[str,object]={"t3d":None,"t3d.gz":gzip.compress,"t3d.xz":lzma.compress,"t3d.bz2":bz2.compress}
+
+def read_lines(path:str)->int:
+	""" Stream a file through open_t3d, return the number of characters. """
+	characters:int=0
+	with open(path,"rb") as raw, t3d_parser.open_t3d(raw) as file:
+		for line in file:
+			characters+=len(line)
+	return characters
+
+def main()->None:
+	""" main() """
+	with tempfile.TemporaryDirectory() as folder:
+		paths:list[str]=sys.argv[1:]
+		if not paths:
+			generated:str=os.path.join(folder,"generated.t3d")
+			t3d_generate.generate_map(generated,20000,sides=(4,8),transform=0.25)
+			paths=["development/samples/ut2004/DM-Deck17.t3d",generated]
+		for path in paths:
+			with open(path,"rb") as f:
+				data:bytes=f.read()
+			print(f"{path}: {len(data)/1e6:.1f} MB")
+			for extension,compress in COMPRESSORS.items():
+				copy:str=os.path.join(folder,f"copy.{extension}")
+				with open(copy,"wb") as f:
+					f.write(compress(data) if compress else data)
+				size:int=os.path.getsize(copy)
+				time_start:float=time.perf_counter()
+				read_lines(copy)
+				read:float=time.perf_counter()-time_start
+				time_start=time.perf_counter()
+				with contextlib.redirect_stdout(io.StringIO()):
+					brushes:int=len(t3d_parser.t3d_open(copy))
+				parse:float=time.perf_counter()-time_start
+				print(f" {extension:8} ratio {len(data)/size:5.1f}x,"
+					f" read {len(data)/read/1e6:7.1f} MB/s, parse {len(data)/parse/1e6:5.1f} MB/s ({brushes} brushes)")
+
+if __name__=="__main__":
+	main()
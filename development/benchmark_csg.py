@@ -0,0 +1,36 @@
+"""
+Benchmark the CSG evaluator on the test and sample maps.
+Run from the repository root:
+ python development/benchmark_csg.py [T3D files]
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd()+"/blender_t3d")
+import csg
+import t3d_parser
+
+# Number of single brush updates timed per map.
+UPDATES:int=20
+
+def main()->None:
+	""" main() """
+	paths:list[str]=sys.argv[1:] or ["development/checkers/test_map.t3d",*sorted(glob.glob("development/samples/*/*.t3d"))]
+	for path in paths:
+		brushes=t3d_parser.t3d_open(path)
+		time_start:float=time.perf_counter()
+		model:csg.CsgModel=csg.CsgModel(brushes)
+		build:float=time.perf_counter()-time_start
+		faces:int=len(model.polygons())
+		# Rebuild after changing some brushes in turn.
+		changed:list[int]=list(range(0,len(brushes),max(len(brushes)//UPDATES,1)))
+		time_start=time.perf_counter()
+		evaluated:int=sum(model.update(i,brushes[i]) for i in changed)
+		update:float=(time.perf_counter()-time_start)/max(len(changed),1)
+		print(f"{path}: {len(brushes)} brushes, {faces} faces, build {build:.3f} s,"
+			f" update {update*1000:.1f} ms average ({evaluated/max(len(changed),1):.1f} brushes evaluated)")
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,33 @@
+"""
+Benchmark parallel T3D serialization against worker count.
+Run from the repository root:
+ python development/benchmark_export.py [brush count]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd()+"/blender_t3d")
+import t3d
+import t3d_generate
+
+def main()->None:
+	""" main() """
+	count:int=int(sys.argv[1]) if len(sys.argv)>1 else 20000
+	data:list[dict]=[b.to_data() for b in t3d_generate.generate_brushes(count,sides=(4,8),transform=0.25)]
+
+	time_start:float=time.perf_counter()
+	expected:str=t3d.serialize_brushes(data)
+	serial:float=time.perf_counter()-time_start
+	print(f"{count} brushes, {len(expected)/1e6:.1f} MB of text.")
+	print(f"serial: {serial:.3f} s")
+	jobs:int=1
+	while jobs<=(os.cpu_count() or 1)*2:
+		time_start=time.perf_counter()
+		text:str=t3d.serialize_brushes_parallel(data,jobs)
+		seconds:float=time.perf_counter()-time_start
+		print(f"{jobs} workers: {seconds:.3f} s, speedup {serial/seconds:.2f}x, identical={text==expected}")
+		jobs*=2
+
+if __name__=="__main__":
+	main()
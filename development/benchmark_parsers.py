@@ -0,0 +1,48 @@
+"""
+Check that every available parser backend gives the same brushes on the
+test and sample maps and compare their speed.
+Run from the repository root:
+ python development/benchmark_parsers.py [T3D files]
+"""
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd()+"/blender_t3d")
+import t3d_parser
+
+def main()->None:
+	""" main() """
+	paths:list[str]=sys.argv[1:] or ["development/checkers/test_map.t3d",*sorted(glob.glob("development/samples/*/*.t3d"))]
+	backends:list[str]=t3d_parser.available_backends()
+	missing:list[str]=[name for name in t3d_parser.BACKENDS if name not in backends]
+	if missing:
+		print(f"Skipping backends with missing packages: {', '.join(missing)}")
+	totals:dict[str,float]=dict.fromkeys(backends,0.0)
+	mismatches:int=0
+	for path in paths:
+		expected:list[dict]|None=None
+		times:list[str]=[]
+		for name in backends:
+			time_start:float=time.perf_counter()
+			with contextlib.redirect_stdout(io.StringIO()):
+				data:list[dict]=[b.to_data() for b in t3d_parser.open_brushes(path,name)]
+			seconds:float=time.perf_counter()-time_start
+			totals[name]+=seconds
+			times.append(f"{name} {seconds:.3f} s")
+			if expected is None:
+				expected=data
+			elif data!=expected:
+				mismatches+=1
+				times[-1]+=" MISMATCH"
+		print(f"{path}: {len(expected or [])} brushes, {', '.join(times)}")
+	reference:float=totals[backends[0]] or 1e-9
+	print("Total: "+", ".join(f"{name} {t:.3f} s ({t/reference:.2f}x)" for name,t in totals.items()))
+	print(f"{mismatches} mismatches.")
+	sys.exit(1 if mismatches else 0)
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,76 @@
+"""
+Time parsing, scanning, serialization, BVH and CSG on generated maps of
+growing size and plot the scaling curves if matplotlib is installed.
+Run from the repository root:
+ python development/benchmark_scaling.py [brush counts] [--plot scaling.png]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+sys.path.append(os.getcwd()+"/blender_t3d")
+import bvh
+import csg
+import t3d
+import t3d_generate
+import t3d_parser
+import t3d_scan
+
+# CSG is evaluated on maps up to this size only.
+CSG_LIMIT:int=10000
+
+def timed(function:Callable)->float:
+	""" Seconds taken by function(). """
+	time_start:float=time.perf_counter()
+	function()
+	return time.perf_counter()-time_start
+
+def main()->None:
+	""" main() """
+	parser=argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("counts",type=int,nargs="*",default=[1000,3000,10000,30000,100000])
+	parser.add_argument("--plot",help="Save a log-log plot to this image")
+	parser.add_argument("--transform",type=float,default=0.25)
+	parser.add_argument("--sides",type=int,nargs=2,default=(4,8))
+	args=parser.parse_args()
+	results:dict[str,list[tuple[int,float]]]={}
+	with tempfile.TemporaryDirectory() as folder:
+		for count in args.counts:
+			path:str=os.path.join(folder,f"generated{count}.t3d")
+			times:dict[str,float]={
+				"generate":timed(lambda:t3d_generate.generate_map(path,count,sides=tuple(args.sides),
+					transform=args.transform)),
+				"scan":timed(lambda:t3d_scan.scan(path)),
+				}
+			brushes:list[t3d.Brush]=[]
+			times["parse"]=timed(lambda:brushes.extend(t3d_parser.t3d_open(path)))
+			data:list[dict]=[b.to_data() for b in brushes]
+			times["serialize"]=timed(lambda:t3d.serialize_brushes(data))
+			times["bvh"]=timed(lambda:bvh.BVH.from_brushes(brushes))
+			if count<=CSG_LIMIT:
+				times["csg"]=timed(lambda:csg.CsgModel(brushes))
+			print(f"{count} brushes, {os.path.getsize(path)/1e6:.1f} MB: "
+				+", ".join(f"{k} {v:.3f} s" for k,v in times.items()))
+			for k,v in times.items():
+				results.setdefault(k,[]).append((count,v))
+	if not args.plot:
+		return
+	try:
+		from matplotlib import pyplot
+	except ImportError:
+		print("matplotlib is not installed, no plot.")
+		return
+	for name,points in results.items():
+		pyplot.loglog(*zip(*points),marker="o",label=name)
+	pyplot.xlabel("brushes")
+	pyplot.ylabel("seconds")
+	pyplot.legend()
+	pyplot.grid(True,which="both",alpha=0.3)
+	pyplot.savefig(args.plot)
+	print(f"Saved {args.plot}")
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,8 @@
+"""
+Stand-in for Blender's bmesh, with the parts the add-on uses.
+"""
+from . import types
+
+def new()->types.BMesh:
+	""" Empty BMesh. """
+	return types.BMesh()
@@ -0,0 +1,201 @@
+"""
+Stand-in for bmesh.types. Faces, vertices and loops are Python objects
+built from a mesh's arrays by BMesh.from_mesh.
+"""
+# pylint:disable=too-few-public-methods
+from typing import Iterator
+
+import numpy
+from bpy.types import Mesh
+from mathutils import Vector, geometry
+
+class BMLayerItem:
+	""" Layer of custom data. """
+	def __init__(self,name:str,kind:str)->None:
+		self.name:str=name
+		self.kind:str=kind
+	def __repr__(self)->str:
+		return f"<BMLayerItem {self.name!r}>"
+
+class BMLayerCollection:
+	""" Layers of one kind, like bm.faces.layers.int. """
+	DEFAULTS:dict[str,object]={"int":0,"float":0.0,"string":b"","uv":None}
+	def __init__(self,kind:str)->None:
+		self.kind:str=kind
+		self._layers:dict[str,BMLayerItem]={}
+		self.active_index:int=0
+	def __len__(self)->int:
+		return len(self._layers)
+	def __iter__(self)->Iterator[BMLayerItem]:
+		return iter(list(self._layers.values()))
+	def __getitem__(self,key:int|str)->BMLayerItem:
+		return self._layers[key] if isinstance(key,str) else list(self._layers.values())[key]
+	def __contains__(self,name:str)->bool:
+		return name in self._layers
+	def keys(self)->list[str]:
+		""" Layer names. """
+		return list(self._layers)
+	def get(self,name:str,default=None)->BMLayerItem|None:
+		""" Layer by name. """
+		return self._layers.get(name,default)
+	def new(self,name:str="")->BMLayerItem:
+		""" Add a layer. """
+		layer:BMLayerItem=BMLayerItem(name or f"{self.kind}_{len(self._layers)}",self.kind)
+		self._layers[layer.name]=layer
+		return layer
+	def verify(self)->BMLayerItem:
+		""" Active layer, created if there is none. """
+		return self.active or self.new("UVMap" if self.kind=="uv" else "")
+	@property
+	def active(self)->BMLayerItem|None:
+		""" Active layer. """
+		return self[self.active_index] if self._layers else None
+
+class BMLayerAccess:
+	""" Layer collections of an element type. """
+	def __init__(self,kinds:tuple[str,...])->None:
+		for kind in kinds:
+			setattr(self,kind,BMLayerCollection(kind))
+
+class BMElement:
+	""" Element holding layer values. """
+	def __init__(self)->None:
+		self._layers:dict[BMLayerItem,object]={}
+		self.index:int=-1
+		self.select:bool=False
+		self.tag:bool=False
+	def __getitem__(self,layer:BMLayerItem):
+		return self._layers.get(layer,BMLayerCollection.DEFAULTS[layer.kind])
+	def __setitem__(self,layer:BMLayerItem,value)->None:
+		self._layers[layer]=value
+
+class BMVert(BMElement):
+	""" Vertex. """
+	def __init__(self,co:Vector)->None:
+		super().__init__()
+		self.co:Vector=co
+		self.link_faces:list[BMFace]=[]
+		self.link_loops:list[BMLoop]=[]
+
+class BMLoopUV:
+	""" UV of a loop. """
+	def __init__(self,uv:Vector)->None:
+		self.uv:Vector=uv
+
+class BMLoop(BMElement):
+	""" Corner of a face. """
+	def __init__(self,vert:BMVert,face:"BMFace")->None:
+		super().__init__()
+		self.vert:BMVert=vert
+		self.face:BMFace=face
+	def __getitem__(self,layer:BMLayerItem):
+		if layer.kind=="uv" and layer not in self._layers:
+			self._layers[layer]=BMLoopUV(Vector((0,0)))
+		return super().__getitem__(layer)
+
+class BMFace(BMElement):
+	""" Face with its loops. """
+	def __init__(self,verts:list[BMVert])->None:
+		super().__init__()
+		self.verts:list[BMVert]=verts
+		self.loops:list[BMLoop]=[BMLoop(v,self) for v in verts]
+		self.material_index:int=0
+		for v,l in zip(verts,self.loops):
+			v.link_faces.append(self)
+			v.link_loops.append(l)
+	@property
+	def normal(self)->Vector:
+		""" Unit normal from the vertex positions. """
+		return geometry.normal([v.co for v in self.verts])
+	def calc_center_median(self)->Vector:
+		""" Mean of the vertex positions. """
+		return Vector(numpy.mean([list(v.co) for v in self.verts],axis=0))
+
+class BMElemSeq(list):
+	""" Vertices, faces or loops of a BMesh. """
+	def __init__(self,kinds:tuple[str,...])->None:
+		super().__init__()
+		self.layers:BMLayerAccess=BMLayerAccess(kinds)
+	def ensure_lookup_table(self)->None:
+		""" Lists always allow indexing. """
+	def index_update(self)->None:
+		""" Number elements in order. """
+		for i,e in enumerate(self):
+			e.index=i
+
+class BMesh:
+	""" Editable mesh. Only knows faces, no edges. """
+	def __init__(self)->None:
+		self.verts:BMElemSeq=BMElemSeq(("int","float","string"))
+		self.faces:BMElemSeq=BMElemSeq(("int","float","string"))
+		# Loops live in faces, this only holds their layers.
+		self.loops:BMElemSeq=BMElemSeq(("uv","int","float","string"))
+		self.is_valid:bool=True
+
+	def free(self)->None:
+		""" Release the data. """
+		self.verts.clear()
+		self.faces.clear()
+		self.is_valid=False
+
+	def from_mesh(self,mesh:Mesh)->None:
+		""" Add the geometry, attributes and UV maps of a mesh. """
+		offset:int=len(self.verts)
+		for co in mesh.vertices.array("co").tolist():
+			self.verts.append(BMVert(Vector(co)))
+		loop_vertex:list[int]=mesh.loops.array("vertex_index").ravel().tolist()
+		starts:list[int]=mesh.polygons.array("loop_start").ravel().tolist()
+		totals:list[int]=mesh.polygons.array("loop_total").ravel().tolist()
+		materials:list[int]=mesh.polygons.array("material_index").ravel().tolist()
+		faces:list[BMFace]=[]
+		for start,total,material in zip(starts,totals,materials):
+			f:BMFace=BMFace([self.verts[offset+i] for i in loop_vertex[start:start+total]])
+			f.material_index=material
+			faces.append(f)
+		self.faces.extend(faces)
+		loops:list[BMLoop]=[l for f in faces for l in f.loops]
+		# Attributes become layers.
+		kinds:dict[str,str]={"INT":"int","FLOAT":"float","STRING":"string"}
+		for attribute in mesh.attributes:
+			if attribute.data_type not in kinds:
+				continue
+			seq:BMElemSeq={"POINT":self.verts,"FACE":self.faces,"CORNER":self.loops}[attribute.domain]
+			elements:list={"POINT":self.verts[offset:],"FACE":faces,"CORNER":loops}[attribute.domain]
+			collection:BMLayerCollection=getattr(seq.layers,kinds[attribute.data_type])
+			layer:BMLayerItem=collection.get(attribute.name) or collection.new(attribute.name)
+			for e,value in zip(elements,attribute.values().tolist()):
+				e[layer]=value
+		for i,uv_layer in enumerate(mesh.uv_layers):
+			layer=self.loops.layers.uv.get(uv_layer.name) or self.loops.layers.uv.new(uv_layer.name)
+			if i==mesh.uv_layers.active_index:
+				self.loops.layers.uv.active_index=i
+			for l,uv in zip(loops,uv_layer.data.array("uv").tolist()):
+				l[layer]=BMLoopUV(Vector(uv))
+		self.verts.index_update()
+		self.faces.index_update()
+
+	def to_mesh(self,mesh:Mesh)->None:
+		""" Replace the geometry, attributes and UV maps of a mesh. """
+		mesh.clear_geometry()
+		self.verts.index_update()
+		self.faces.index_update()
+		mesh.vertices.add(len(self.verts))
+		mesh.vertices.foreach_set("co",numpy.array([list(v.co) for v in self.verts],dtype=numpy.float32))
+		loops:list[BMLoop]=[l for f in self.faces for l in f.loops]
+		mesh.loops.add(len(loops))
+		mesh.loops.foreach_set("vertex_index",numpy.array([l.vert.index for l in loops],dtype=numpy.int32))
+		counts:numpy.ndarray=numpy.array([len(f.loops) for f in self.faces],dtype=numpy.int32)
+		mesh.polygons.add(len(self.faces))
+		mesh.polygons.foreach_set("loop_start",numpy.cumsum(counts)-counts)
+		mesh.polygons.foreach_set("material_index",numpy.array([f.material_index for f in self.faces],dtype=numpy.int32))
+		data_types:dict[str,str]={"int":"INT","float":"FLOAT","string":"STRING"}
+		for domain,elements,seq in (("POINT",self.verts,self.verts),("FACE",self.faces,self.faces),("CORNER",loops,self.loops)):
+			for kind,data_type in data_types.items():
+				for layer in getattr(seq.layers,kind):
+					values:numpy.ndarray=mesh.attributes.new(layer.name,data_type,domain).values()
+					for i,e in enumerate(elements):
+						values[i]=e[layer]
+		for layer in self.loops.layers.uv:
+			uv_layer=mesh.uv_layers.new(layer.name)
+			uv_layer.data.foreach_set("uv",numpy.array([list(l[layer].uv) for l in loops],dtype=numpy.float32).reshape(-1,2))
+		mesh.uv_layers.active_index=self.loops.layers.uv.active_index
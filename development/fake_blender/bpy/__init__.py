@@ -0,0 +1,85 @@
+"""
+Stand-in for Blender's bpy, with the parts the add-on's importer and
+exporter use. Meshes keep their data in numpy arrays so bulk reads and
+writes cost about what they do in Blender, the rest is slow pure Python.
+"""
+from typing import Iterator
+
+from . import app, ops, path, props, types, utils
+
+class BlendDataCollection:
+	""" Data blocks of one type, with unique names. """
+	def __init__(self,cls:type)->None:
+		self._cls:type=cls
+		self._items:list=[]
+	def __len__(self)->int:
+		return len(self._items)
+	def __iter__(self)->Iterator:
+		return iter(list(self._items))
+	def __reversed__(self)->Iterator:
+		return reversed(list(self._items))
+	def __getitem__(self,key:int|str):
+		if isinstance(key,str):
+			item=self.get(key)
+			if item is None:
+				raise KeyError(f"bpy_prop_collection[key]: key \"{key}\" not found")
+			return item
+		return self._items[key]
+	def __contains__(self,name:str)->bool:
+		return self.get(name) is not None
+	def get(self,name:str,default=None):
+		""" Data block by name. """
+		return next((i for i in self._items if i.name==name),default)
+	def new(self,name:str,*args):
+		""" Add a data block, renamed if the name is taken. """
+		item=self._cls(types.unique_name(name,(i.name for i in self._items)),*args)
+		self._items.append(item)
+		return item
+	def remove(self,item)->None:
+		""" Delete a data block. """
+		self._items.remove(item)
+		if isinstance(item,types.Object):
+			for c in [context.scene.collection,*collections]:
+				if item in c.objects:
+					c.objects.unlink(item)
+		elif isinstance(item,types.Collection):
+			for c in [context.scene.collection,*collections]:
+				if item in c.children:
+					c.children.unlink(item)
+		elif isinstance(item,types.Mesh):
+			for o in objects:
+				if o.data is item:
+					o.data=None
+
+class BlendDataImages(BlendDataCollection):
+	""" Images, loaded by path. """
+	def load(self,filepath:str,check_existing:bool=False)->types.Image:
+		""" Image of a file. """
+		if check_existing:
+			found:types.Image|None=next((i for i in self._items if i.filepath==filepath),None)
+			if found:
+				return found
+		return self.new(filepath.replace("\\","/").rsplit("/",1)[-1],filepath)
+
+class BlendData:
+	""" Data blocks of the file. """
+	def __init__(self)->None:
+		self.collections:BlendDataCollection=BlendDataCollection(types.Collection)
+		self.images:BlendDataImages=BlendDataImages(types.Image)
+		self.materials:BlendDataCollection=BlendDataCollection(types.Material)
+		self.meshes:BlendDataCollection=BlendDataCollection(types.Mesh)
+		self.objects:BlendDataCollection=BlendDataCollection(types.Object)
+
+data:BlendData=BlendData()
+context:types.Context=types.Context()
+collections:BlendDataCollection=data.collections
+objects:BlendDataCollection=data.objects
+
+def reset()->None:
+	""" Start from an empty file, like File > New. """
+	# pylint:disable=global-statement
+	global data,context,collections,objects
+	data=BlendData()
+	context=types.Context()
+	collections=data.collections
+	objects=data.objects
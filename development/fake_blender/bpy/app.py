@@ -0,0 +1,4 @@
+"""
+Stand-in for bpy.app.
+"""
+version:tuple[int,int,int]=(4,2,0)
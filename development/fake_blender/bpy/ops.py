@@ -0,0 +1,31 @@
+"""
+Stand-in for bpy.ops, only object.transform_apply.
+"""
+from types import SimpleNamespace
+
+from mathutils import Euler, Matrix, Vector
+
+def transform_apply(location:bool=True,rotation:bool=True,scale:bool=True)->set[str]:
+	""" Bake transforms of the selected objects into their meshes. """
+	# pylint:disable=import-outside-toplevel
+	import bpy
+	for o in bpy.context.selected_objects:
+		if o.type!="MESH":
+			continue
+		matrix:Matrix=Matrix.Identity(4)
+		if location:
+			matrix=Matrix.Translation(o.location)@matrix
+			o.location=(0,0,0)
+		if rotation:
+			matrix=matrix@o.rotation_euler.to_matrix().to_4x4()
+			o.rotation_euler=Euler((0,0,0))
+		if scale:
+			matrix=matrix@Matrix.Diagonal(o.scale.to_4d())
+			o.scale=Vector((1,1,1))
+		o.data.transform(matrix)
+		# Negative scale turns faces inside out.
+		if matrix.determinant()<0:
+			o.data.flip_normals()
+	return {'FINISHED'}
+
+object=SimpleNamespace(transform_apply=transform_apply) # pylint:disable=redefined-builtin
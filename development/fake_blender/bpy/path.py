@@ -0,0 +1,10 @@
+"""
+Stand-in for bpy.path.
+"""
+import os
+
+def abspath(path:str)->str:
+	""" Absolute path, // is relative to the working directory here. """
+	if path.startswith("//"):
+		path=path[2:]
+	return os.path.abspath(path)
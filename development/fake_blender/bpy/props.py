@@ -0,0 +1,25 @@
+"""
+Stand-in for bpy.props. Properties are kept as their function and keyword
+arguments, like Blender's deferred properties.
+"""
+from typing import Callable
+
+class _PropertyDeferred:
+	""" Property definition in an annotation. """
+	def __init__(self,function:Callable,keywords:dict)->None:
+		self.function:Callable=function
+		self.keywords:dict=keywords
+	def __repr__(self)->str:
+		return f"<_PropertyDeferred {self.function.__name__} {self.keywords}>"
+
+def _property(name:str)->Callable[...,_PropertyDeferred]:
+	def function(**keywords)->_PropertyDeferred:
+		return _PropertyDeferred(function,keywords)
+	function.__name__=name
+	return function
+
+BoolProperty=_property("BoolProperty")
+EnumProperty=_property("EnumProperty")
+FloatProperty=_property("FloatProperty")
+IntProperty=_property("IntProperty")
+StringProperty=_property("StringProperty")
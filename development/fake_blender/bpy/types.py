@@ -0,0 +1,604 @@
+"""
+Stand-in for bpy.types: ID data blocks, meshes stored as numpy arrays,
+objects, collections, the context and bases of operators and menus.
+"""
+# pylint:disable=too-few-public-methods
+import os
+from typing import Iterable, Iterator
+
+import numpy
+from mathutils import Euler, Matrix, Vector
+
+class ID:
+	""" Named data block with custom properties. """
+	def __init__(self,name:str)->None:
+		self.name:str=name
+		self._properties:dict[str,object]={}
+	def __repr__(self)->str:
+		return f"<{type(self).__name__} {self.name!r}>"
+	def __getitem__(self,key:str):
+		return self._properties[key]
+	def __setitem__(self,key:str,value)->None:
+		self._properties[key]=value
+	def __delitem__(self,key:str)->None:
+		del self._properties[key]
+	def __contains__(self,key:str)->bool:
+		return key in self._properties
+	def as_pointer(self)->int:
+		""" Number identifying the data block. """
+		return id(self)
+	def get(self,key:str,default=None):
+		""" Custom property or default. """
+		return self._properties.get(key,default)
+	def keys(self)->list[str]:
+		""" Custom property names. """
+		return list(self._properties)
+	@property
+	def users(self)->int:
+		""" Number of objects using this data block. """
+		# pylint:disable=import-outside-toplevel
+		from bpy import data
+		return sum(o.data is self for o in data.objects)
+
+class PropertyArray:
+	"""
+	Mesh element collection with bulk access like bpy_prop_collection.
+	fields: Name to (dtype, values per element).
+	"""
+	def __init__(self,fields:dict[str,tuple[type,int]])->None:
+		self._fields:dict[str,tuple[type,int]]=fields
+		self._arrays:dict[str,numpy.ndarray]={name:numpy.zeros((0,width),dtype=dtype) for name,(dtype,width) in fields.items()}
+	def __len__(self)->int:
+		return len(next(iter(self._arrays.values())))
+	def add(self,count:int)->None:
+		""" Append count zeroed elements. """
+		for name,(dtype,width) in self._fields.items():
+			self._arrays[name]=numpy.concatenate((self._arrays[name],numpy.zeros((count,width),dtype=dtype)))
+	def clear(self)->None:
+		""" Remove all elements. """
+		for name,(dtype,width) in self._fields.items():
+			self._arrays[name]=numpy.zeros((0,width),dtype=dtype)
+	def array(self,name:str)->numpy.ndarray:
+		""" Values of a field as an (N,width) array. """
+		return self._arrays[name]
+	def foreach_get(self,name:str,seq)->None:
+		""" Copy a field into a flat buffer of the exact size. """
+		values:numpy.ndarray=self.array(name)
+		if len(seq)!=values.size:
+			raise RuntimeError(f"internal error setting the array: expected {values.size} items, got {len(seq)}")
+		if isinstance(seq,numpy.ndarray):
+			seq[...]=values.reshape(seq.shape)
+		else:
+			seq[:]=values.ravel().tolist()
+	def foreach_set(self,name:str,seq)->None:
+		""" Set a field from a flat sequence of the exact size. """
+		if name not in self._arrays:
+			raise AttributeError(f"foreach_set('{name}') not found")
+		values:numpy.ndarray=numpy.asarray(seq).ravel()
+		target:numpy.ndarray=self._arrays[name]
+		if values.size!=target.size:
+			raise RuntimeError(f"internal error setting the array: expected {target.size} items, got {values.size}")
+		target[...]=values.reshape(target.shape)
+
+class MeshPolygons(PropertyArray):
+	""" Polygons, loop_total is read only and derived from loop_start like Blender 4. """
+	def __init__(self,mesh:"Mesh")->None:
+		super().__init__({"loop_start":(numpy.int32,1),"material_index":(numpy.int32,1)})
+		self._mesh:Mesh=mesh
+	def array(self,name:str)->numpy.ndarray:
+		if name=="loop_total":
+			starts:numpy.ndarray=self._arrays["loop_start"].ravel()
+			return numpy.diff(numpy.append(starts,len(self._mesh.loops))).astype(numpy.int32).reshape(-1,1)
+		return super().array(name)
+
+class AttributeData:
+	""" Values of an attribute. """
+	def __init__(self,attribute:"Attribute")->None:
+		self._attribute:Attribute=attribute
+	def __len__(self)->int:
+		return len(self._attribute.values())
+	def __getitem__(self,index:int)->"AttributeValue":
+		return AttributeValue(self._attribute,index)
+	def foreach_get(self,name:str,seq)->None:
+		""" Copy values into a flat buffer. """
+		values:numpy.ndarray=self._attribute.values()
+		if name!="value" or len(seq)!=len(values):
+			raise RuntimeError(f"foreach_get('{name}') failed")
+		if isinstance(seq,numpy.ndarray):
+			seq[...]=values
+		else:
+			seq[:]=values.tolist()
+	def foreach_set(self,name:str,seq)->None:
+		""" Set values from a flat sequence. """
+		values:numpy.ndarray=self._attribute.values()
+		seq=numpy.asarray(seq).ravel()
+		if name!="value" or len(seq)!=len(values):
+			raise RuntimeError(f"foreach_set('{name}') failed")
+		values[...]=seq
+
+class AttributeValue:
+	""" One element of an attribute. """
+	def __init__(self,attribute:"Attribute",index:int)->None:
+		self._attribute:Attribute=attribute
+		self._index:int=index
+	@property
+	def value(self):
+		""" The element's value. """
+		return self._attribute.values()[self._index]
+	@value.setter
+	def value(self,value)->None:
+		self._attribute.values()[self._index]=value
+
+class Attribute:
+	""" Generic attribute on the points, faces or corners of a mesh. """
+	DTYPES:dict[str,object]={"INT":numpy.int32,"FLOAT":numpy.float32,"BOOLEAN":numpy.bool_,"STRING":object}
+	def __init__(self,mesh:"Mesh",name:str,data_type:str,domain:str)->None:
+		if data_type not in Attribute.DTYPES or domain not in ("POINT","FACE","CORNER"):
+			raise TypeError(f"AttributeGroup.new(): unsupported type {data_type!r} or domain {domain!r}")
+		self.name:str=name
+		self.data_type:str=data_type
+		self.domain:str=domain
+		self._mesh:Mesh=mesh
+		self._values:numpy.ndarray=numpy.zeros(0,dtype=Attribute.DTYPES[data_type])
+		self.data:AttributeData=AttributeData(self)
+	def values(self)->numpy.ndarray:
+		""" Value array, resized to the domain. """
+		size:int=len(self._mesh.domain(self.domain))
+		if len(self._values)!=size:
+			values:numpy.ndarray=numpy.zeros(size,dtype=self._values.dtype)
+			if self.data_type=="STRING":
+				values[:]=b""
+			count:int=min(size,len(self._values))
+			values[:count]=self._values[:count]
+			self._values=values
+		return self._values
+
+class AttributeGroup:
+	""" Generic attributes of a mesh. """
+	def __init__(self,mesh:"Mesh")->None:
+		self._mesh:Mesh=mesh
+		self._attributes:dict[str,Attribute]={}
+	def __contains__(self,name:str)->bool:
+		return name in self._attributes
+	def __iter__(self)->Iterator[Attribute]:
+		return iter(list(self._attributes.values()))
+	def __len__(self)->int:
+		return len(self._attributes)
+	def get(self,name:str,default=None)->Attribute|None:
+		""" Attribute by name. """
+		return self._attributes.get(name,default)
+	def new(self,name:str,type:str,domain:str)->Attribute: # pylint:disable=redefined-builtin
+		""" Add an attribute, renamed if the name is taken. """
+		name=unique_name(name,self._attributes)
+		attribute:Attribute=Attribute(self._mesh,name,type,domain)
+		self._attributes[name]=attribute
+		return attribute
+	def remove(self,attribute:Attribute)->None:
+		""" Delete an attribute. """
+		del self._attributes[attribute.name]
+
+class MeshUVLoopLayer:
+	""" UV map, one (u,v) per loop. """
+	def __init__(self,mesh:"Mesh",name:str)->None:
+		self.name:str=name
+		self._mesh:Mesh=mesh
+		self.data:PropertyArray=PropertyArray({"uv":(numpy.float32,2)})
+	def sized(self)->"MeshUVLoopLayer":
+		""" Grow or shrink to the loop count. """
+		count:int=len(self._mesh.loops)-len(self.data)
+		if count>0:
+			self.data.add(count)
+		elif count<0:
+			uv:numpy.ndarray=self.data.array("uv")[:len(self._mesh.loops)].copy()
+			self.data.clear()
+			self.data.add(len(uv))
+			self.data.foreach_set("uv",uv)
+		return self
+
+class MeshUVLoopLayers:
+	""" UV maps of a mesh. """
+	def __init__(self,mesh:"Mesh")->None:
+		self._mesh:Mesh=mesh
+		self._layers:list[MeshUVLoopLayer]=[]
+		self.active_index:int=0
+	def __len__(self)->int:
+		return len(self._layers)
+	def __iter__(self)->Iterator[MeshUVLoopLayer]:
+		return (layer.sized() for layer in self._layers)
+	def __getitem__(self,index:int)->MeshUVLoopLayer:
+		return self._layers[index].sized()
+	@property
+	def active(self)->MeshUVLoopLayer|None:
+		""" Active UV map. """
+		return self[self.active_index] if self._layers else None
+	def new(self,name:str="UVMap")->MeshUVLoopLayer:
+		""" Add a UV map. """
+		layer:MeshUVLoopLayer=MeshUVLoopLayer(self._mesh,unique_name(name,[l.name for l in self._layers]))
+		self._layers.append(layer)
+		return layer.sized()
+	def clear(self)->None:
+		""" Remove all UV maps. """
+		self._layers.clear()
+
+class Mesh(ID):
+	""" Polygon mesh. Edges are not kept. """
+	def __init__(self,name:str)->None:
+		super().__init__(name)
+		self.vertices:PropertyArray=PropertyArray({"co":(numpy.float32,3)})
+		self.loops:PropertyArray=PropertyArray({"vertex_index":(numpy.int32,1)})
+		self.polygons:MeshPolygons=MeshPolygons(self)
+		self.attributes:AttributeGroup=AttributeGroup(self)
+		self.uv_layers:MeshUVLoopLayers=MeshUVLoopLayers(self)
+		self.materials:list[Material]=[]
+
+	def domain(self,name:str)->PropertyArray:
+		""" Elements of an attribute domain. """
+		return {"POINT":self.vertices,"FACE":self.polygons,"CORNER":self.loops}[name]
+
+	def clear_geometry(self)->None:
+		""" Remove all geometry, attributes and UV maps. """
+		self.vertices.clear()
+		self.loops.clear()
+		self.polygons.clear()
+		self.attributes=AttributeGroup(self)
+		self.uv_layers.clear()
+
+	def from_pydata(self,vertices:Iterable,edges:Iterable,faces:Iterable)->None:
+		""" Fill from vertex positions and faces of vertex indices. """
+		del edges
+		coords:numpy.ndarray=numpy.array(list(vertices),dtype=numpy.float32).reshape(-1,3)
+		faces=[list(f) for f in faces]
+		self.vertices.add(len(coords))
+		self.vertices.foreach_set("co",coords)
+		self.loops.add(sum(len(f) for f in faces))
+		self.loops.foreach_set("vertex_index",numpy.array([i for f in faces for i in f],dtype=numpy.int32))
+		counts:numpy.ndarray=numpy.array([len(f) for f in faces],dtype=numpy.int32)
+		self.polygons.add(len(faces))
+		self.polygons.foreach_set("loop_start",numpy.cumsum(counts)-counts)
+
+	def update(self,calc_edges:bool=False)->None:
+		""" Nothing to do without edges and caches. """
+
+	def flip_normals(self)->None:
+		""" Reverse the winding of all faces, keeping their first corner. """
+		starts:numpy.ndarray=self.polygons.array("loop_start").ravel()
+		totals:numpy.ndarray=self.polygons.array("loop_total").ravel()
+		order:numpy.ndarray=numpy.arange(len(self.loops))
+		for start,total in zip(starts.tolist(),totals.tolist()):
+			order[start+1:start+total]=order[start+1:start+total][::-1]
+		self.loops.foreach_set("vertex_index",self.loops.array("vertex_index")[order])
+		for layer in self.uv_layers:
+			layer.data.foreach_set("uv",layer.data.array("uv")[order])
+		for attribute in self.attributes:
+			if attribute.domain=="CORNER":
+				attribute.data.foreach_set("value",attribute.values()[order])
+
+	def transform(self,matrix:Matrix)->None:
+		""" Transform vertex positions. """
+		m:numpy.ndarray=numpy.array(matrix.to_4x4())
+		coords:numpy.ndarray=self.vertices.array("co").astype(numpy.float64)
+		self.vertices.foreach_set("co",coords@m[:3,:3].T+m[:3,3])
+
+class Image(ID):
+	""" Image file reference. """
+	def __init__(self,name:str,filepath:str="")->None:
+		super().__init__(name)
+		self.filepath:str=filepath
+	def filepath_from_user(self)->str:
+		""" Absolute file path. """
+		return os.path.abspath(self.filepath)
+
+class Node:
+	""" Shader node with named sockets. """
+	def __init__(self,type:str,name:str)->None: # pylint:disable=redefined-builtin
+		self.type:str=type
+		self.name:str=name
+		self.image:Image|None=None
+		self.extension:str="REPEAT"
+		self.inputs:dict[str,object]={}
+		self.outputs:dict[str,object]={}
+
+class Nodes(list):
+	""" Nodes of a node tree. """
+	def new(self,type:str)->Node: # pylint:disable=redefined-builtin
+		""" Add a node. """
+		node:Node=Node(type,unique_name(type,[n.name for n in self]))
+		self.append(node)
+		return node
+	def get(self,name:str,default=None)->Node|None:
+		""" Node by name. """
+		return next((n for n in self if n.name==name),default)
+
+class NodeLinks(list):
+	""" Links of a node tree. """
+	def new(self,output,input)->tuple: # pylint:disable=redefined-builtin
+		""" Connect two sockets. """
+		self.append((output,input))
+		return self[-1]
+
+class NodeTree:
+	""" Shader node tree. """
+	def __init__(self)->None:
+		self.nodes:Nodes=Nodes()
+		self.links:NodeLinks=NodeLinks()
+
+class Material(ID):
+	""" Material, use_nodes makes a Principled BSDF tree. """
+	def __init__(self,name:str)->None:
+		super().__init__(name)
+		self.node_tree:NodeTree|None=None
+		self.use_backface_culling:bool=False
+	@property
+	def use_nodes(self)->bool:
+		""" Whether the material has a node tree. """
+		return self.node_tree is not None
+	@use_nodes.setter
+	def use_nodes(self,value:bool)->None:
+		if value and self.node_tree is None:
+			self.node_tree=NodeTree()
+			bsdf:Node=self.node_tree.nodes.new("ShaderNodeBsdfPrincipled")
+			bsdf.name="Principled BSDF"
+			self.node_tree.nodes.new("ShaderNodeOutputMaterial").name="Material Output"
+
+class CollectionObjects(list):
+	""" Objects linked to a collection. """
+	def link(self,o:"Object")->None:
+		""" Link an object. """
+		if o in self:
+			raise RuntimeError(f"Object '{o.name}' already in collection")
+		self.append(o)
+	def unlink(self,o:"Object")->None:
+		""" Unlink an object. """
+		self.remove(o)
+	def get(self,name:str,default=None)->"Object|None":
+		""" Object by name. """
+		return next((o for o in self if o.name==name),default)
+
+class CollectionChildren(list):
+	""" Child collections. """
+	def link(self,c:"Collection")->None:
+		""" Link a collection. """
+		self.append(c)
+	def unlink(self,c:"Collection")->None:
+		""" Unlink a collection. """
+		self.remove(c)
+
+class Collection(ID):
+	""" Collection of objects and child collections. """
+	def __init__(self,name:str)->None:
+		super().__init__(name)
+		self.objects:CollectionObjects=CollectionObjects()
+		self.children:CollectionChildren=CollectionChildren()
+		# Subtracted from the locations of its instances.
+		self.instance_offset:Vector=Vector((0,0,0))
+	@property
+	def all_objects(self)->CollectionObjects:
+		""" Objects of this collection and its children. """
+		found:dict[int,Object]={id(o):o for o in self.objects}
+		for c in self.children:
+			found.update((id(o),o) for o in c.all_objects)
+		return CollectionObjects(found.values())
+
+class MaterialSlot:
+	""" Material slot of an object, its material is linked to the object or its mesh. """
+	# pylint:disable=protected-access
+	def __init__(self,owner:"Object",index:int)->None:
+		self._owner:Object=owner
+		self._index:int=index
+	@property
+	def link(self)->str:
+		""" DATA or OBJECT. """
+		return self._owner._slot_links.get(self._index,"DATA")
+	@link.setter
+	def link(self,value:str)->None:
+		self._owner._slot_links[self._index]=value
+	@property
+	def material(self)->"Material|None":
+		""" Material of the slot, from where it is linked. """
+		if self.link=="OBJECT":
+			return self._owner._slot_materials.get(self._index)
+		return self._owner.data.materials[self._index]
+	@material.setter
+	def material(self,value:"Material|None")->None:
+		if self.link=="OBJECT":
+			self._owner._slot_materials[self._index]=value
+		else:
+			self._owner.data.materials[self._index]=value
+
+class Object(ID):
+	""" Object with location, rotation and scale. """
+	def __init__(self,name:str,object_data:ID|None)->None:
+		super().__init__(name)
+		self.data:ID|None=object_data
+		self.color:tuple[float,...]=(1.0,1.0,1.0,1.0)
+		self.display_type:str="TEXTURED"
+		self._location:Vector=Vector((0,0,0))
+		self._rotation:Euler=Euler((0,0,0))
+		self._scale:Vector=Vector((1,1,1))
+		self._selected:bool=False
+		self.instance_type:str="NONE"
+		self.instance_collection:Collection|None=None
+		# Links and object linked materials of material slots by index.
+		self._slot_links:dict[int,str]={}
+		self._slot_materials:dict[int,Material|None]={}
+	@property
+	def is_instancer(self)->bool:
+		""" Whether the object makes instances. """
+		return self.instance_type!="NONE"
+	@property
+	def original(self)->"Object":
+		""" Objects aren't evaluated here, they are their own original. """
+		return self
+	def evaluated_get(self,_depsgraph:"Depsgraph")->"Object":
+		""" Evaluated version of the object, itself here. """
+		return self
+	@property
+	def material_slots(self)->list[MaterialSlot]:
+		""" One slot per material of the mesh. """
+		count:int=len(self.data.materials) if isinstance(self.data,Mesh) else 0
+		return [MaterialSlot(self,i) for i in range(count)]
+	@property
+	def type(self)->str:
+		""" MESH or EMPTY. """
+		return "MESH" if isinstance(self.data,Mesh) else "EMPTY"
+	@property
+	def location(self)->Vector:
+		""" Location. """
+		return self._location
+	@location.setter
+	def location(self,value:Iterable[float])->None:
+		self._location=Vector(value)
+	@property
+	def rotation_euler(self)->Euler:
+		""" Rotation. """
+		return self._rotation
+	@rotation_euler.setter
+	def rotation_euler(self,value:Iterable[float])->None:
+		self._rotation=Euler(value)
+	@property
+	def scale(self)->Vector:
+		""" Scale. """
+		return self._scale
+	@scale.setter
+	def scale(self,value:Iterable[float])->None:
+		self._scale=Vector(value)
+	@property
+	def matrix_world(self)->Matrix:
+		""" Object to world matrix, objects have no parents here. """
+		return (Matrix.Translation(self._location)
+			@self._rotation.to_matrix().to_4x4()
+			@Matrix.Diagonal(self._scale.to_4d()))
+	@property
+	def users_collection(self)->list[Collection]:
+		""" Collections linking this object. """
+		# pylint:disable=import-outside-toplevel
+		from bpy import context, data
+		return [c for c in (context.scene.collection,*data.collections) if self in c.objects]
+	def select_get(self)->bool:
+		""" Whether the object is selected. """
+		return self._selected
+	def select_set(self,state:bool)->None:
+		""" Select or deselect. """
+		self._selected=state
+
+class SceneObjects:
+	""" Objects of a scene. """
+	def __init__(self,scene:"Scene")->None:
+		self._scene:Scene=scene
+	def __iter__(self)->Iterator[Object]:
+		return iter(self._scene.collection.all_objects)
+	def __len__(self)->int:
+		return len(self._scene.collection.all_objects)
+	def get(self,name:str,default=None)->Object|None:
+		""" Object by name. """
+		return self._scene.collection.all_objects.get(name,default)
+
+class Scene(ID):
+	""" Scene with its master collection. """
+	def __init__(self,name:str)->None:
+		super().__init__(name)
+		self.collection:Collection=Collection("Scene Collection")
+		self.objects:SceneObjects=SceneObjects(self)
+
+class LayerObjects:
+	""" Objects of a view layer. """
+	def __init__(self,scene:Scene)->None:
+		self._scene:Scene=scene
+		self.active:Object|None=None
+	def __iter__(self)->Iterator[Object]:
+		return iter(self._scene.objects)
+	@property
+	def selected(self)->list[Object]:
+		""" Selected objects. """
+		return [o for o in self._scene.objects if o.select_get()]
+
+class ViewLayer:
+	""" View layer of a scene. """
+	def __init__(self,scene:Scene)->None:
+		self.objects:LayerObjects=LayerObjects(scene)
+
+class Operator:
+	""" Base of operators. report() prints. """
+	bl_idname:str=""
+	bl_label:str=""
+	def report(self,kind:set[str],message:str)->None:
+		""" Show a message. """
+		print(*kind,message)
+
+class Menu:
+	""" Base of menus, holding the functions added to them. """
+	draw_functions:list=[]
+	@classmethod
+	def append(cls,function)->None:
+		""" Add a draw function at the end. """
+		cls.draw_functions=[*cls.draw_functions,function]
+	@classmethod
+	def remove(cls,function)->None:
+		""" Remove a draw function. """
+		cls.draw_functions=[f for f in cls.draw_functions if f is not function]
+
+class TOPBAR_MT_file_export(Menu):
+	""" File > Export. """
+class TOPBAR_MT_file_import(Menu):
+	""" File > Import. """
+class VIEW3D_MT_object(Menu):
+	""" Object menu. """
+class VIEW3D_MT_select_object(Menu):
+	""" Select menu. """
+
+class DepsgraphObjectInstance:
+	""" Object or instance met while walking the evaluated scene. """
+	def __init__(self,o:Object,matrix_world:Matrix,parent:Object|None=None)->None:
+		self.object:Object=o
+		self.matrix_world:Matrix=matrix_world
+		self.parent:Object|None=parent
+		self.instance_object:Object|None=o if parent else None
+	@property
+	def is_instance(self)->bool:
+		""" Whether this comes from an instancer. """
+		return self.parent is not None
+
+class Depsgraph:
+	""" Evaluated scene. Only collection instances are expanded. """
+	def __init__(self,scene:Scene)->None:
+		self.scene:Scene=scene
+	@property
+	def object_instances(self)->Iterator[DepsgraphObjectInstance]:
+		""" Objects of the scene followed by their instances, nested ones too. """
+		def expand(o:Object,matrix:Matrix,parent:Object,depth:int)->Iterator[DepsgraphObjectInstance]:
+			if o.instance_type!="COLLECTION" or not o.instance_collection or depth>8:
+				return
+			collection:Collection=o.instance_collection
+			offset:Matrix=matrix@Matrix.Translation(-collection.instance_offset)
+			for child in collection.all_objects:
+				child_matrix:Matrix=offset@child.matrix_world
+				yield DepsgraphObjectInstance(child,child_matrix,parent)
+				yield from expand(child,child_matrix,parent,depth+1)
+		for o in self.scene.objects:
+			yield DepsgraphObjectInstance(o,o.matrix_world)
+			yield from expand(o,o.matrix_world,o,0)
+
+class Context:
+	""" Active scene and view layer. """
+	def __init__(self)->None:
+		self.scene:Scene=Scene("Scene")
+		self.view_layer:ViewLayer=ViewLayer(self.scene)
+	@property
+	def selected_objects(self)->list[Object]:
+		""" Selected objects. """
+		return self.view_layer.objects.selected
+	def evaluated_depsgraph_get(self)->Depsgraph:
+		""" Evaluated scene. """
+		return Depsgraph(self.scene)
+
+def unique_name(name:str,taken:Iterable[str])->str:
+	""" name, or name.001 and so on if it's taken, cut to 63 characters. """
+	taken=set(taken)
+	name=name[:63]
+	if name not in taken:
+		return name
+	for number in range(1,1000):
+		candidate:str=f"{name[:59]}.{number:03}"
+		if candidate not in taken:
+			return candidate
+	raise ValueError(f"No free name for {name}")
@@ -0,0 +1,27 @@
+"""
+Stand-in for bpy.utils, registration only.
+"""
+from typing import Callable
+
+# Registered classes by bl_idname.
+registered:dict[str,type]={}
+
+def register_class(cls:type)->None:
+	""" Register an operator class. """
+	if cls.bl_idname in registered:
+		raise ValueError(f"register_class(...): already registered as a subclass '{cls.__name__}'")
+	registered[cls.bl_idname]=cls
+
+def unregister_class(cls:type)->None:
+	""" Unregister an operator class. """
+	del registered[cls.bl_idname]
+
+def register_classes_factory(classes:tuple[type,...])->tuple[Callable[[],None],Callable[[],None]]:
+	""" Functions registering classes in order and unregistering them in reverse. """
+	def register()->None:
+		for cls in classes:
+			register_class(cls)
+	def unregister()->None:
+		for cls in reversed(classes):
+			unregister_class(cls)
+	return register,unregister
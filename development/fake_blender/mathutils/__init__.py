@@ -0,0 +1,316 @@
+"""
+Stand-in for Blender's mathutils, with the parts the add-on uses.
+Slow pure Python, meant for tests and benchmarks outside Blender.
+"""
+# pylint:disable=invalid-name
+import math
+from typing import Iterable, Iterator, Sequence
+
+import numpy
+
+class Vector:
+	""" Vector of 2 to 4 floats. """
+	__slots__=("_v",)
+	__hash__=None # type: ignore
+
+	def __init__(self,values:Iterable[float]=(0.0,0.0,0.0))->None:
+		self._v:list[float]=[float(x) for x in values]
+
+	def __len__(self)->int:
+		return len(self._v)
+	def __iter__(self)->Iterator[float]:
+		return iter(self._v)
+	def __getitem__(self,index:int|slice):
+		if isinstance(index,slice):
+			return tuple(self._v[index])
+		return self._v[index]
+	def __setitem__(self,index:int,value:float)->None:
+		self._v[index]=float(value)
+	def __repr__(self)->str:
+		return f"Vector(({', '.join(f'{x:.4f}' for x in self._v)}))"
+	def __eq__(self,other)->bool:
+		try:
+			return len(other)==len(self._v) and all(a==b for a,b in zip(self._v,other))
+		except TypeError:
+			return NotImplemented
+
+	def __add__(self,other:Sequence[float])->"Vector":
+		return Vector(a+b for a,b in zip(self._v,other,strict=True))
+	def __sub__(self,other:Sequence[float])->"Vector":
+		return Vector(a-b for a,b in zip(self._v,other,strict=True))
+	def __neg__(self)->"Vector":
+		return Vector(-a for a in self._v)
+	def __mul__(self,other):
+		if isinstance(other,(int,float)):
+			return Vector(a*other for a in self._v)
+		if isinstance(other,Vector):
+			# Element wise, like mathutils since Blender 2.80.
+			return Vector(a*b for a,b in zip(self._v,other,strict=True))
+		return NotImplemented
+	def __rmul__(self,other):
+		if isinstance(other,(int,float)):
+			return self*other
+		return NotImplemented
+	def __truediv__(self,other:float)->"Vector":
+		return Vector(a/other for a in self._v)
+	def __matmul__(self,other):
+		if isinstance(other,Vector):
+			return self.dot(other)
+		if isinstance(other,Matrix):
+			return other.transposed()@self
+		return NotImplemented
+
+	def copy(self)->"Vector":
+		""" Copy of this vector. """
+		return Vector(self._v)
+	def cross(self,other:Sequence[float])->"Vector":
+		""" Cross product of 3D vectors. """
+		a=self._v
+		return Vector((a[1]*other[2]-a[2]*other[1],a[2]*other[0]-a[0]*other[2],a[0]*other[1]-a[1]*other[0]))
+	def dot(self,other:Sequence[float])->float:
+		""" Dot product. """
+		return sum(a*b for a,b in zip(self._v,other,strict=True))
+	@property
+	def length(self)->float:
+		""" Euclidean length. """
+		return math.sqrt(sum(a*a for a in self._v))
+	@property
+	def length_squared(self)->float:
+		""" Squared length. """
+		return sum(a*a for a in self._v)
+	def normalize(self)->None:
+		""" Make unit length in place. Zero vectors stay zero. """
+		length:float=self.length
+		if length:
+			self._v=[a/length for a in self._v]
+	def normalized(self)->"Vector":
+		""" Unit length copy. """
+		v:Vector=self.copy()
+		v.normalize()
+		return v
+	def rotate(self,other)->None:
+		""" Rotate in place by an Euler or Matrix. """
+		matrix:Matrix=other.to_matrix() if isinstance(other,Euler) else other.to_3x3()
+		self._v=list(matrix@self)
+	def to_tuple(self,precision:int=-1)->tuple[float,...]:
+		""" Values as a tuple, rounded to precision digits if given. """
+		return tuple(self._v) if precision<0 else tuple(round(a,precision) for a in self._v)
+	def to_2d(self)->"Vector":
+		""" First two values. """
+		return Vector(self._v[:2])
+	def to_3d(self)->"Vector":
+		""" First three values, padded with zero. """
+		return Vector((self._v+[0.0,0.0])[:3])
+	def to_4d(self)->"Vector":
+		""" Four values, padded with zero and a W of one. """
+		return Vector((self._v+[0.0,0.0][:max(3-len(self._v),0)]+[1.0])[:4])
+
+	def _get(self,axes:str)->"Vector":
+		return Vector(self._v["xyzw".index(a)] for a in axes)
+	def _set(self,axes:str,values:Sequence[float])->None:
+		for a,value in zip(axes,values,strict=True):
+			self._v["xyzw".index(a)]=float(value)
+	x=property(lambda self:self._v[0],lambda self,value:self._set("x",(value,)))
+	y=property(lambda self:self._v[1],lambda self,value:self._set("y",(value,)))
+	z=property(lambda self:self._v[2],lambda self,value:self._set("z",(value,)))
+	w=property(lambda self:self._v[3],lambda self,value:self._set("w",(value,)))
+	xy=property(lambda self:self._get("xy"),lambda self,value:self._set("xy",value))
+	xyz=property(lambda self:self._get("xyz"),lambda self,value:self._set("xyz",value))
+
+class Matrix:
+	""" Square or rectangular matrix of rows. """
+	__hash__=None # type: ignore
+
+	def __init__(self,rows:Iterable[Iterable[float]]|None=None)->None:
+		if rows is None:
+			rows=numpy.identity(4)
+		self._m:numpy.ndarray=numpy.array([list(r) for r in rows],dtype=numpy.float64)
+
+	@classmethod
+	def _wrap(cls,array:numpy.ndarray)->"Matrix":
+		m:Matrix=cls.__new__(cls)
+		m._m=array
+		return m
+	@classmethod
+	def Identity(cls,size:int)->"Matrix":
+		""" Identity matrix. """
+		return cls._wrap(numpy.identity(size))
+	@classmethod
+	def Translation(cls,vector:Sequence[float])->"Matrix":
+		""" 4x4 translation matrix. """
+		m:numpy.ndarray=numpy.identity(4)
+		m[:3,3]=list(vector)[:3]
+		return cls._wrap(m)
+	@classmethod
+	def Diagonal(cls,vector:Sequence[float])->"Matrix":
+		""" Matrix with vector on its diagonal. """
+		return cls._wrap(numpy.diag(numpy.array(list(vector),dtype=numpy.float64)))
+
+	def __array__(self,dtype=None,copy=None)->numpy.ndarray:
+		return numpy.array(self._m,dtype=dtype)
+	def __len__(self)->int:
+		return len(self._m)
+	def __iter__(self)->Iterator[Vector]:
+		return (Vector(r) for r in self._m)
+	def __getitem__(self,index:int)->Vector:
+		return Vector(self._m[index])
+	def __repr__(self)->str:
+		return f"Matrix({tuple(tuple(r) for r in self._m.tolist())})"
+	def __eq__(self,other)->bool:
+		return isinstance(other,Matrix) and self._m.shape==other._m.shape and bool((self._m==other._m).all())
+	def __add__(self,other:"Matrix")->"Matrix":
+		return Matrix._wrap(self._m+other._m)
+	def __sub__(self,other:"Matrix")->"Matrix":
+		return Matrix._wrap(self._m-other._m)
+	def __mul__(self,other):
+		if isinstance(other,(int,float)):
+			return Matrix._wrap(self._m*other)
+		if isinstance(other,Matrix):
+			return Matrix._wrap(self._m*other._m)
+		return NotImplemented
+	def __rmul__(self,other):
+		if isinstance(other,(int,float)):
+			return Matrix._wrap(self._m*other)
+		return NotImplemented
+	def __matmul__(self,other):
+		if isinstance(other,Matrix):
+			return Matrix._wrap(self._m@other._m)
+		if isinstance(other,(Vector,tuple,list)):
+			v:list[float]=list(other)
+			if len(v)==self._m.shape[1]-1:
+				# 3D point through a 4x4 matrix.
+				return Vector((self._m@numpy.array(v+[1.0]))[:len(v)])
+			return Vector(self._m@numpy.array(v))
+		return NotImplemented
+
+	@property
+	def col(self)->list[Vector]:
+		""" Column vectors. """
+		return [Vector(c) for c in self._m.T]
+	@property
+	def row(self)->list[Vector]:
+		""" Row vectors. """
+		return list(self)
+	@property
+	def translation(self)->Vector:
+		""" Translation part of a 4x4 matrix. """
+		return Vector(self._m[:3,3])
+	def copy(self)->"Matrix":
+		""" Copy of this matrix. """
+		return Matrix._wrap(self._m.copy())
+	def decompose(self)->tuple[Vector,"Quaternion",Vector]:
+		""" Translation, rotation and scale of a 4x4 matrix. """
+		m:numpy.ndarray=self._m[:3,:3]
+		scale:numpy.ndarray=numpy.linalg.norm(m,axis=0)
+		if numpy.linalg.det(m)<0:
+			scale=-scale
+		return self.translation,Matrix._wrap(m/scale).to_quaternion(),Vector(scale)
+	def to_quaternion(self)->"Quaternion":
+		""" Rotation of a 3x3 or 4x4 rotation matrix. """
+		m:numpy.ndarray=self._m[:3,:3]
+		w:float=math.sqrt(max(0.0,1+m[0,0]+m[1,1]+m[2,2]))/2
+		x:float=math.copysign(math.sqrt(max(0.0,1+m[0,0]-m[1,1]-m[2,2]))/2,m[2,1]-m[1,2])
+		y:float=math.copysign(math.sqrt(max(0.0,1-m[0,0]+m[1,1]-m[2,2]))/2,m[0,2]-m[2,0])
+		z:float=math.copysign(math.sqrt(max(0.0,1-m[0,0]-m[1,1]+m[2,2]))/2,m[1,0]-m[0,1])
+		return Quaternion((w,x,y,z))
+	def to_euler(self)->"Euler":
+		""" XYZ angles of a 3x3 or 4x4 rotation matrix. """
+		m:numpy.ndarray=self._m[:3,:3]/numpy.linalg.norm(self._m[:3,:3],axis=0)
+		return Euler((math.atan2(m[2,1],m[2,2]),math.asin(max(-1.0,min(1.0,-m[2,0]))),math.atan2(m[1,0],m[0,0])))
+	def determinant(self)->float:
+		""" Determinant. """
+		return float(numpy.linalg.det(self._m))
+	def inverted(self)->"Matrix":
+		""" Inverse, raise ValueError if singular. """
+		try:
+			return Matrix._wrap(numpy.linalg.inv(self._m))
+		except numpy.linalg.LinAlgError:
+			raise ValueError("Matrix.inverted(): matrix does not have an inverse") from None
+	def inverted_safe(self)->"Matrix":
+		""" Inverse, nudging the diagonal of singular matrices like Blender. """
+		try:
+			return Matrix._wrap(numpy.linalg.inv(self._m))
+		except numpy.linalg.LinAlgError:
+			return Matrix._wrap(numpy.linalg.inv(self._m+numpy.identity(len(self._m))*1e-6))
+	def transposed(self)->"Matrix":
+		""" Transposed copy. """
+		return Matrix._wrap(self._m.T.copy())
+	def to_3x3(self)->"Matrix":
+		""" Upper left 3x3 part. """
+		return Matrix._wrap(self._m[:3,:3].copy())
+	def to_4x4(self)->"Matrix":
+		""" Extend to 4x4 with identity. """
+		m:numpy.ndarray=numpy.identity(4)
+		m[:len(self._m),:self._m.shape[1]]=self._m
+		return Matrix._wrap(m)
+
+class Quaternion:
+	""" Rotation as w, x, y, z. """
+	def __init__(self,values:Iterable[float]=(1.0,0.0,0.0,0.0))->None:
+		self._v:list[float]=[float(a) for a in values]
+	def __iter__(self)->Iterator[float]:
+		return iter(self._v)
+	def __repr__(self)->str:
+		return f"Quaternion(({', '.join(f'{x:.4f}' for x in self._v)}))"
+	def to_matrix(self)->Matrix:
+		""" 3x3 rotation matrix. """
+		w,x,y,z=self._v
+		return Matrix((
+			(1-2*(y*y+z*z),2*(x*y-w*z),2*(x*z+w*y)),
+			(2*(x*y+w*z),1-2*(x*x+z*z),2*(y*z-w*x)),
+			(2*(x*z-w*y),2*(y*z+w*x),1-2*(x*x+y*y))))
+	def to_euler(self)->"Euler":
+		""" XYZ angles. """
+		return self.to_matrix().to_euler()
+	w=property(lambda self:self._v[0])
+	x=property(lambda self:self._v[1])
+	y=property(lambda self:self._v[2])
+	z=property(lambda self:self._v[3])
+
+class Euler:
+	""" Rotation angles in radians, applied X then Y then Z. """
+	__hash__=None # type: ignore
+
+	def __init__(self,angles:Iterable[float]=(0.0,0.0,0.0),order:str="XYZ")->None:
+		self._v:list[float]=[float(a) for a in angles]
+		self.order:str=order
+
+	def __len__(self)->int:
+		return 3
+	def __iter__(self)->Iterator[float]:
+		return iter(self._v)
+	def __getitem__(self,index:int)->float:
+		return self._v[index]
+	def __setitem__(self,index:int,value:float)->None:
+		self._v[index]=float(value)
+	def __repr__(self)->str:
+		return f"Euler(({', '.join(f'{x:.4f}' for x in self._v)}), '{self.order}')"
+	def __eq__(self,other)->bool:
+		try:
+			return len(other)==3 and all(a==b for a,b in zip(self._v,other))
+		except TypeError:
+			return NotImplemented
+
+	def copy(self)->"Euler":
+		""" Copy of this rotation. """
+		return Euler(self._v,self.order)
+	def to_matrix(self)->Matrix:
+		""" 3x3 rotation matrix. """
+		cx,cy,cz=(math.cos(a) for a in self._v)
+		sx,sy,sz=(math.sin(a) for a in self._v)
+		rx=numpy.array(((1,0,0),(0,cx,-sx),(0,sx,cx)))
+		ry=numpy.array(((cy,0,sy),(0,1,0),(-sy,0,cy)))
+		rz=numpy.array(((cz,-sz,0),(sz,cz,0),(0,0,1)))
+		axes:dict[str,numpy.ndarray]={"X":rx,"Y":ry,"Z":rz}
+		m:numpy.ndarray=numpy.identity(3)
+		for axis in self.order:
+			m=axes[axis]@m
+		return Matrix._wrap(m)
+	def to_tuple(self)->tuple[float,float,float]:
+		""" Angles as a tuple. """
+		return tuple(self._v)
+	x=property(lambda self:self._v[0],lambda self,value:self.__setitem__(0,value))
+	y=property(lambda self:self._v[1],lambda self,value:self.__setitem__(1,value))
+	z=property(lambda self:self._v[2],lambda self,value:self.__setitem__(2,value))
+
+from . import geometry # pylint:disable=wrong-import-position
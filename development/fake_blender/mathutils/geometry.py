@@ -0,0 +1,20 @@
+"""
+Stand-in for mathutils.geometry.
+"""
+from typing import Sequence
+
+from . import Vector
+
+def normal(*vectors)->Vector:
+	"""
+	Unit normal of a polygon, from its points or a single list of them.
+	Zero for degenerate polygons.
+	"""
+	points:Sequence=vectors[0] if len(vectors)==1 else vectors
+	n:list[float]=[0.0,0.0,0.0]
+	for i,a in enumerate(points):
+		b=points[(i+1)%len(points)]
+		n[0]+=(a[1]-b[1])*(a[2]+b[2])
+		n[1]+=(a[2]-b[2])*(a[0]+b[0])
+		n[2]+=(a[0]-b[0])*(a[1]+b[1])
+	return Vector(n).normalized()
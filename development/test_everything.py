@@ -2,12 +2,37 @@
 Tests ran by pytest.
 """
 # pylint: skip-file
+import bz2
+import gzip
+import lzma
 import os
 import sys
 
+import numpy
+import pytest
+
+# The add-on package itself, and its modules as top level ones.
+sys.path.append(os.getcwd())
 sys.path.append(os.getcwd()+"/blender_t3d")
+try:
+	import bpy
+except ImportError:
+	# Run the importer and exporter on stand-ins outside Blender.
+	sys.path.append(os.getcwd()+"/development/fake_blender")
+	import bpy
+import bvh
+import csg
+import geometry
+import t3d
+import t3d_diff
+import t3d_generate
+import t3d_obj
 import t3d_parser
-from t3d import CsgOper, SheerAxis, Vec3, Vertex
+import t3d_scan
+import t3d_validate
+import textures
+from t3d import (Brush, CsgOper, Polygon, SheerAxis, Vec3, Vertex, serialize_brushes,
+	serialize_brushes_parallel, transform_point)
 
 def test_t3d()->None:
 	assert str(Vertex(1,-2.5))=="Vertex\t+00001.000000,-00002.500000,+00000.000000\n"
@@ -38,4 +63,555 @@ def test_t3d()->None:
 	assert SheerAxis(7)==SheerAxis.NONE
 
 def test_parser()->None:
-	t3d_parser.test()
\ No newline at end of file
+	t3d_parser.test()
+
+def test_background_parser()->None:
+	path="development/checkers/test_map.t3d"
+	expected=[str(b) for b in t3d_parser.t3d_open(path)]
+	assert [str(b) for b in t3d_parser.BackgroundParser(path,queue_size=2)]==expected
+
+def test_background_parser_error(tmp_path)->None:
+	text=open("development/checkers/test_map.t3d").read()
+	bad=tmp_path/"bad.t3d"
+	bad.write_text(text.replace("Begin Polygon","Begin Polygon Flags=abc",1))
+	try:
+		list(t3d_parser.BackgroundParser(str(bad)))
+		assert False
+	except ValueError:
+		pass
+	bad.write_text(text.replace("Vertex ","Vertex zero,",1))
+	try:
+		t3d_parser.t3d_open(str(bad))
+		assert False
+	except t3d_parser.ParseError as e:
+		assert e.filename==str(bad) and e.msg=="Invalid Polygon property"
+
+def test_obj(tmp_path)->None:
+	b=Brush(location=(10,0,0))
+	b.rotation=(0,0,16384)
+	b.prepivot=(1,0,0)
+	assert [round(c,6) for c in transform_point(b.get_matrix(),(1,0,0))]==[10,0,0]
+	assert [round(c,6) for c in transform_point(b.get_matrix(),(2,0,0))]==[10,1,0]
+	stats=t3d_obj.convert("development/checkers/test_map.t3d",str(tmp_path/"test_map.obj"))
+	lines=(tmp_path/"test_map.obj").read_text().splitlines()
+	assert stats["polygons"]==sum(1 for l in lines if l.startswith("f "))
+	assert stats["vertices"]==sum(1 for l in lines if l.startswith("v "))
+	assert (tmp_path/"test_map.mtl").exists()
+
+def test_obj_batch(tmp_path,capsys)->None:
+	text=open("development/checkers/test_map.t3d").read()
+	(tmp_path/"in").mkdir()
+	(tmp_path/"in"/"good.t3d").write_text(text)
+	(tmp_path/"in"/"bad.t3d").write_text(text.replace("Begin Polygon","Begin Polygon Flags=abc",1))
+	t3d_obj.main([str(tmp_path/"in"),"-o",str(tmp_path/"out"),"-j","2"])
+	output=capsys.readouterr().out
+	assert "bad.t3d: failed: ValueError" in output and "Converted 1 of 2 files" in output
+	assert (tmp_path/"out"/"good.obj").exists()
+
+def test_serialize()->None:
+	brushes=t3d_parser.t3d_open("development/checkers/test_map.t3d")
+	data=[b.to_data() for b in brushes]
+	expected="".join(str(b) for b in brushes)
+	assert serialize_brushes(data)==expected
+	assert serialize_brushes_parallel(data,2)==expected
+
+def test_scan(tmp_path)->None:
+	path="development/checkers/test_map.t3d"
+	brushes=t3d_parser.t3d_open(path)
+	report=t3d_scan.scan(path)
+	assert report.brushes==len(brushes)
+	assert report.polygons==sum(len(b.polygons) for b in brushes)
+	assert report.vertices==sum(len(p.vertices) for b in brushes for p in b.polygons)
+	assert not report.errors
+	broken=tmp_path/"broken.t3d"
+	broken.write_text("""Begin Map
+Begin Actor Class=Brush Name=Brush1
+Begin Brush Name=Model1
+Begin PolyList
+Begin Polygon
+Vertex 0,0,0
+Vertex 1,zero,0
+End Polygon
+End PolyList
+End Brush
+End Map
+""")
+	errors=[(e.lineno,e.msg) for e in t3d_scan.scan(str(broken)).errors]
+	assert errors==[(7,"Invalid Polygon property"),(5,"Polygon has 2 vertices"),
+		(11,"Expected End actor for line 2")]
+
+def test_weld()->None:
+	brushes=t3d_parser.t3d_open("development/checkers/test_map.t3d")
+	cube=brushes[1]
+	verts,_,faces=cube.get_pydata()
+	welded,_,welded_faces=cube.get_pydata(0.01)
+	assert len(verts)==24 and len(welded)==8
+	assert len(faces)==len(welded_faces)
+	for face,welded_face in zip(faces,welded_faces):
+		assert [verts[i] for i in face]==[welded[i] for i in welded_face]
+	# A vertex repeated further along the polygon.
+	touching=Brush([Polygon([Vertex(v) for v in ((0,0,0),(1,0,0),(0.001,0,0),(0,1,0))])])
+	welded,_,welded_faces=touching.get_pydata(0.01)
+	assert len(welded_faces[0])==len(set(welded_faces[0]))==4
+
+def test_snap()->None:
+	brushes=t3d_parser.t3d_open("development/checkers/test_map.t3d")
+	expected=[[Vertex(v.coords) for p in b.polygons for v in p.vertices] for b in brushes]
+	for vertices in expected:
+		for v in vertices:
+			v.snap(16)
+	for b,vertices in zip(brushes,expected):
+		b.snap(16)
+		assert [v for p in b.polygons for v in p.vertices]==vertices
+		assert all(c%16==0 for c in b.location)
+	b=Brush([Polygon([Vertex(v) for v in ((0,0,0),(31.9,0.2,0),(32.1,-0.3,0),(32,32,0.4))]),
+		Polygon([Vertex(v) for v in ((0,0,0),(16.2,0.3,0),(32,-0.1,0))]),
+		Polygon([Vertex(v) for v in ((0,0,0),(0.4,0,0),(0,0.2,0))])],(3,5,-7))
+	assert t3d.snap_brushes([b],1.0)=={"edges collapsed":4,"polygons degenerate":2}
+	assert [[v.coords for v in p.vertices] for p in b.polygons]==[[[0,0,0],[32,0,0],[32,32,0]]]
+	assert b.location==(3,5,-7)
+
+def test_merge_coplanar()->None:
+	polygons=[]
+	for x in range(3):
+		for y in range(2):
+			a,b,c,d=(x,y,0),(x+1,y,0),(x+1,y+1,0),(x,y+1,0)
+			for triangle in ((a,b,c),(a,c,d)):
+				p=Polygon([Vertex(v) for v in triangle])
+				p.texture="Floor"
+				polygons.append(p)
+	polygons[-1].texture="Other"
+	merged=geometry.merge_coplanar(polygons)
+	assert sorted(len(p.vertices) for p in merged)==[3,3,4,4]
+	# Different mapping isn't merged.
+	polygons[0].u=(2.,0.,0.)
+	assert any(p is polygons[0] for p in geometry.merge_coplanar(polygons))
+	cubes=t3d_parser.t3d_open("development/checkers/test_map.t3d")
+	assert all(len(geometry.merge_coplanar(b.polygons))==len(b.polygons) for b in cubes)
+
+def test_csg()->None:
+	def cube(location,half,oper):
+		corners=[(x,y,z) for x in (-half,half) for y in (-half,half) for z in (-half,half)]
+		faces=((0,1,3,2),(4,6,7,5),(0,4,5,1),(2,3,7,6),(0,2,6,4),(1,5,7,3))
+		b=Brush([Polygon([Vertex(corners[i]) for i in f]) for f in faces],location)
+		b.csg=oper
+		return b
+	def area(model):
+		total=0.0
+		for f in model.polygons():
+			n=[0.0,0.0,0.0]
+			for a,b in zip(f.points,f.points[1:]+f.points[:1]):
+				n=[x+y for x,y in zip(n,geometry.cross(a,b))]
+			total+=geometry.dot(n,n)**0.5/2
+		return total
+	brushes=[cube((0,0,0),256,"csg_subtract"),cube((256,256,256),256,"csg_subtract"),
+		cube((-128,-128,-128),64,"csg_add")]
+	model=csg.CsgModel(brushes)
+	assert round(area(model))==2*6*512**2-2*3*256**2+6*128**2
+	# Faces look into empty space.
+	for f in model.polygons():
+		centre=[sum(c)/len(f.points) for c in zip(*f.points)]
+		to_centre=geometry.dot(geometry.polygon_normal(f.points),geometry.sub(brushes[f.brush].location,centre))
+		assert to_centre<0 if f.brush==2 else to_centre>0
+	# Moving the box redoes the box, the room it left and the room it entered.
+	assert model.update(2,cube((400,400,400),64,"csg_add"))==3
+	assert round(area(model))==round(area(csg.CsgModel(model.brushes)))==2*6*512**2-2*3*256**2+6*128**2
+	# Box half in the wall.
+	model.update(2,cube((0,0,-256),64,"csg_add"))
+	assert round(area(model))==2*6*512**2-2*3*256**2-128**2+128**2+4*128*64
+	# Sheets don't cut, their face shows where there is empty space.
+	sheet=Brush([Polygon([Vertex(v) for v in ((-64,-64,0),(64,-64,0),(64,64,0),(-64,64,0))])],(-256,0,0))
+	model=csg.CsgModel([brushes[0],sheet])
+	assert not model.solids[1].solid
+	assert round(area(model))==6*512**2+128*64
+	# Edges must pair up, also across T-junctions.
+	box=[[v.coords for v in p.vertices] for p in brushes[0].polygons]
+	assert csg.is_closed(box) and not csg.is_closed(box[:-1]) and not csg.is_closed(box[2:])
+	a,b,c,d=box[1]
+	bc,da=(tuple((x+y)/2 for x,y in zip(b,c)),tuple((x+y)/2 for x,y in zip(d,a)))
+	assert csg.is_closed([box[0],[a,b,bc,da],[da,bc,c,d],*box[2:]])
+	# The preview is found again and left out of brushes after being renamed.
+	import importer
+	preview,_=importer.build_csg_preview(bpy.context,brushes[:2])
+	preview.name="renamed"
+	assert importer.build_csg_preview(bpy.context,brushes[:2])[0] is preview and preview["t3d_csg_preview"]
+
+def test_bvh()->None:
+	brushes=t3d_parser.t3d_open("development/samples/ut99/DOM-Cinder.t3d")
+	boxes=[bvh.brush_bounds(b) for b in brushes]
+	tree=bvh.BVH.from_brushes(brushes)
+	def overlap(a,b):
+		return all(a[0][i]<=b[1][i] and b[0][i]<=a[1][i] for i in range(3))
+	assert tree.overlap_pairs()==[(i,j) for i in range(len(boxes)) for j in range(i+1,len(boxes)) if overlap(boxes[i],boxes[j])]
+	region=((-512,-512,-512),(512,512,512))
+	assert tree.query_box(*region)==[i for i,b in enumerate(boxes) if overlap(b,region)]
+	def distance(p,b):
+		return sum(max(b[0][i]-p[i],0,p[i]-b[1][i])**2 for i in range(3))**0.5
+	i,d=tree.nearest((3000,-2000,100))
+	assert d==distance((3000,-2000,100),boxes[i])==min(distance((3000,-2000,100),b) for b in boxes)
+	hits=tree.query_ray((0,0,100000),(0,0,-1))
+	assert hits==sorted(hits) and all(overlap(boxes[j],((0,0,100000-t),(0,0,100000-t))) for t,j in hits)
+	# Moved brush is found at its new place.
+	tree.update(0,((99990,99990,99990),(100010,100010,100010)))
+	assert tree.nearest((100000,100000,100000))==(0,0.0)
+	assert tree.query_box((99999,)*3,(99999,)*3)==[0]
+	assert bvh.BVH([]).overlap_pairs()==[] and bvh.BVH([]).nearest((0,0,0)) is None
+
+def test_textures(tmp_path)->None:
+	for name in ("ShaneChurch/Textures/Walls/shwall.png","SkyCity/Textures/Sky.pcx","UTtech1.Floor.Grate.bmp","notes.txt"):
+		path=tmp_path/name
+		path.parent.mkdir(parents=True,exist_ok=True)
+		path.write_bytes(b"")
+	index=textures.index_textures(str(tmp_path))
+	assert textures.find_texture(index,"ShaneChurch.Walls.SHWALL").endswith("shwall.png")
+	assert textures.find_texture(index,"shwall").endswith("shwall.png")
+	assert textures.find_texture(index,"skycity.sky").endswith("Sky.pcx")
+	assert textures.find_texture(index,"uttech1.floor.grate").endswith("UTtech1.Floor.Grate.bmp")
+	assert textures.find_texture(index,"Other.Group.Grate").endswith("UTtech1.Floor.Grate.bmp")
+	assert textures.find_texture(index,"notes") is None
+	# Sizes from headers.
+	import struct
+	headers={
+		"a.png":b"\x89PNG\r\n\x1a\n"+struct.pack(">I4sII",13,b"IHDR",512,128),
+		"b.bmp":b"BM"+bytes(12)+struct.pack("<Iii",40,64,-32),
+		"c.tga":bytes(2)+b"\x02"+bytes(9)+struct.pack("<HH",128,1024)+bytes(2),
+		"d.pcx":b"\x0a\x05\x01\x08"+struct.pack("<4H",0,0,255,63),
+	}
+	for name,header in headers.items():
+		(tmp_path/name).write_bytes(header+bytes(32))
+	assert textures.read_image_size(str(tmp_path/"a.png"))==(512,128)
+	assert textures.read_image_size(str(tmp_path/"b.bmp"))==(64,32)
+	assert textures.read_image_size(str(tmp_path/"c.tga"))==(128,1024)
+	assert textures.read_image_size(str(tmp_path/"d.pcx"))==(256,64)
+	index=textures.index_textures(str(tmp_path))
+	assert textures.texture_size("Package.A",index)==(512,128)
+	assert textures.texture_size("shwall",index)==textures.DEFAULT_SIZE
+	assert textures.texture_size("",None,str(tmp_path/"c.tga"))==(128,1024)
+
+def test_generate(tmp_path)->None:
+	settings={"seed":5,"sides":(3,6),"textures":4,"transform":0.5,"nonsolid":0.2}
+	path=str(tmp_path/"generated.t3d")
+	assert t3d_generate.generate_map(path,200,**settings)==200
+	expected=list(t3d_generate.generate_brushes(200,**settings))
+	assert [str(b) for b in expected]!=[str(b) for b in t3d_generate.generate_brushes(200,seed=6)]
+	brushes=t3d_parser.t3d_open(path)
+	assert len(brushes)==200 and brushes[0].group=="cube"
+	assert {b.csg for b in brushes[1:]}=={"csg_add","csg_subtract"}
+	assert any(b.postscale for b in brushes) and any(b.prepivot for b in brushes) and any(b.polyflags for b in brushes)
+	for b,e in zip(brushes,expected):
+		assert (b.postscale,b.rotation,b.polyflags)==(e.postscale,e.rotation,e.polyflags)
+		points=[[v.coords for v in p.vertices] for p in b.polygons]
+		assert csg.is_closed(points) and csg.signed_volume(points)>0
+	assert len({p.texture for b in brushes for p in b.polygons})==4
+	assert t3d_scan.scan(path).errors==[]
+
+def test_parser_backends(tmp_path)->None:
+	assert t3d_parser.dict_from_t3d_property('group="none,group1"')=={"group":"none,group1"}
+	path=str(tmp_path/"generated.t3d")
+	t3d_generate.generate_map(path,100,seed=2,sides=(3,7),transform=0.5,nonsolid=0.2)
+	assert "line" in t3d_parser.available_backends()
+	for sample in ("development/checkers/test_map.t3d",path):
+		expected=[b.to_data() for b in t3d_parser.open_brushes(sample)]
+		for name in t3d_parser.available_backends():
+			assert [b.to_data() for b in t3d_parser.open_brushes(sample,name)]==expected
+
+def test_compressed(tmp_path)->None:
+	path="development/checkers/test_map.t3d"
+	data=open(path,"rb").read()
+	expected=[str(b) for b in t3d_parser.t3d_open(path)]
+	# Detected by content, the last file has a misleading name.
+	for name,compress in (("a.t3d.gz",gzip.compress),("b.t3d.xz",lzma.compress),("c.t3d.bz2",bz2.compress),("d.t3d",gzip.compress)):
+		(tmp_path/name).write_bytes(compress(data))
+		compressed=str(tmp_path/name)
+		assert [str(b) for b in t3d_parser.t3d_open(compressed)]==expected
+		parser=t3d_parser.BackgroundParser(compressed,queue_size=2)
+		assert [str(b) for b in parser]==expected and parser.fraction==1.0
+		assert t3d_scan.scan(compressed).brushes==len(expected)
+	assert [p.name for p in t3d_obj.find_t3d_files([str(tmp_path)])]==["a.t3d.gz","b.t3d.xz","c.t3d.bz2","d.t3d"]
+	assert t3d_obj.output_path(tmp_path/"a.t3d.gz",[],None).name=="a.obj"
+	(tmp_path/"e.t3d").write_bytes(gzip.compress(data)[:200])
+	parser=t3d_parser.BackgroundParser(str(tmp_path/"e.t3d"))
+	try:
+		list(parser)
+		assert False
+	except EOFError:
+		pass
+
+def test_addon_registration()->None:
+	import importlib
+	import blender_t3d
+	modules=[f"blender_t3d.{name}" for name in blender_t3d.MODULES]
+	blender_t3d.register()
+	assert not any(name in sys.modules for name in modules)
+	blender_t3d.unregister()
+	assert blender_t3d.T3D_FILTER==";".join("*"+e for e in t3d_parser.T3D_EXTENSIONS)
+	# Reloading reloads the modules operators have imported.
+	from blender_t3d import exporter
+	export=exporter.export
+	importlib.reload(blender_t3d)
+	assert exporter.export is not export and "blender_t3d.importer" not in sys.modules
+	blender_t3d.register()
+	blender_t3d.unregister()
+
+def test_export_round_trip()->None:
+	import exporter
+	import importer
+	from mathutils import Vector
+	def world(brushes):
+		return numpy.array([importer.brush_matrix(b)@Vector(v.coords) for b in brushes for p in b.polygons for v in p.vertices])
+	collection=bpy.data.collections.new("round trip")
+	bpy.context.scene.collection.children.link(collection)
+	for path in ("development/checkers/test_map.t3d","development/samples/ut99/DOM-Cinder.t3d"):
+		brushes=[b for b in t3d_parser.t3d_open(path) if b.polygons]
+		expected=[(p.texture,p.flags,tuple(p.pan)) for b in brushes for p in b.polygons]
+		objects=[importer.create_object(collection,b)[0] for b in brushes]
+		exported=[exporter.brush_from_object(o) for o in objects]
+		assert [(p.texture,p.flags,p.pan) for b in exported for p in b.polygons]==expected
+		assert numpy.allclose(world(exported),world(brushes),atol=1e-2)
+		assert exporter.export(objects,jobs=2)==exporter.export(objects)
+		merged,_=importer.create_merged_object(collection,"merged",brushes,False)
+		exported=exporter.brushes_from_merged_object(merged)
+		assert [(p.texture,p.flags,p.pan) for b in exported for p in b.polygons]==expected
+		assert numpy.allclose(world(exported),world(brushes),atol=1e-2)
+
+def test_export_retextured()->None:
+	import exporter
+	import importer
+	bpy.reset()
+	brushes=[b for b in t3d_parser.t3d_open("development/checkers/test_map.t3d") if b.polygons]
+	expected=[p.texture for b in brushes for p in b.polygons]
+	# Only one texture has a material, found whatever its case.
+	bpy.data.materials.new("CHECKERS_BASE")
+	collection=bpy.data.collections.new("retextured")
+	bpy.context.scene.collection.children.link(collection)
+	objects=[importer.create_object(collection,b)[0] for b in brushes]
+	merged,_=importer.create_merged_object(collection,"merged",brushes,False)
+	assert [p.texture for o in objects for p in exporter.brush_from_object(o).polygons]==expected
+	assert [p.texture for b in exporter.brushes_from_merged_object(merged) for p in b.polygons]==expected
+	new=bpy.data.materials.new("NewTexture")
+	for o in [*objects,merged]:
+		o.data.materials.append(new)
+		o.data.polygons.foreach_set("material_index",numpy.full(len(o.data.polygons),len(o.data.materials)-1,dtype=numpy.int32))
+	assert {p.texture for o in objects for p in exporter.brush_from_object(o).polygons}=={"NewTexture"}
+	assert {p.texture for b in exporter.brushes_from_merged_object(merged) for p in b.polygons}=={"NewTexture"}
+
+def test_export_legacy_texture_layer()->None:
+	import exporter
+	m=bpy.data.meshes.new("legacy")
+	m.from_pydata([(0,0,0),(1,0,0),(1,1,0),(0,1,0)],[],[(0,1,2),(0,2,3)])
+	layer=m.attributes.new("texture",'STRING','FACE')
+	layer.data[0].value=b"Rock"
+	layer.data[1].value=b"Grass"
+	assert exporter.face_texture_names(m)==["Rock","Grass"]
+	brush=exporter.brush_from_object(bpy.data.objects.new("legacy",m))
+	assert [p.texture for p in brush.polygons]==["Rock","Grass"]
+
+def test_nonplanar()->None:
+	import exporter
+	def brush():
+		# Square, quad with one corner lifted, and a triangle.
+		b=Brush([Polygon([Vertex(v) for v in ((0,0,0),(64,0,0),(64,64,0),(0,64,0))]),
+			Polygon([Vertex(v) for v in ((0,0,0),(64,0,0),(80,64,8),(0,64,0))]),
+			Polygon([Vertex(v) for v in ((0,0,0),(64,0,5),(0,64,9))])],(0,0,0))
+		b.actor_name="nonplanar"
+		b.polygons[1].texture="Wall"
+		return b
+	coords=numpy.array([v.coords for p in brush().polygons for v in p.vertices],dtype=float)
+	_,normals,deviations=exporter.polygon_planes(coords,numpy.array([4,4,3]))
+	assert numpy.allclose(normals[0],(0,0,1)) and deviations[0]==0 and deviations[1]>1 and deviations[2]<1e-9
+	b=brush()
+	assert exporter.repair_nonplanar([b],'NONE')=={"polygons nonplanar":1}
+	b=brush()
+	assert exporter.repair_nonplanar([b],'SPLIT')=={"polygons nonplanar":1,"polygons split":1}
+	assert [len(p.vertices) for p in b.polygons]==[4,3,3,3]
+	assert [p.texture for p in b.polygons]==["","Wall","Wall",""]
+	coords=numpy.array([v.coords for p in b.polygons for v in p.vertices],dtype=float)
+	assert max(exporter.polygon_planes(coords,numpy.array([4,3,3,3]))[2])<=exporter.PLANAR_TOLERANCE
+	b=brush()
+	assert exporter.repair_nonplanar([b],'FLATTEN')=={"polygons nonplanar":1,"polygons flattened":1}
+	assert len(b.polygons)==3 and b.polygons[0].vertices[1].coords==[64,0,0]
+	coords=numpy.array([v.coords for p in b.polygons for v in p.vertices],dtype=float)
+	assert max(exporter.polygon_planes(coords,numpy.array([4,4,3]))[2])<1e-6
+
+def test_export_instances(monkeypatch)->None:
+	import exporter
+	import importer
+	from mathutils import Vector
+	brush=t3d_parser.t3d_open("development/checkers/test_map.t3d")[1]
+	source=bpy.data.collections.new("instance source")
+	bpy.context.scene.collection.children.link(source)
+	original,_=importer.create_object(source,brush)
+	duplicates=[bpy.data.objects.new(f"duplicate{i}",original.data) for i in range(3)]
+	for i,o in enumerate(duplicates):
+		o.location=(i*100,0,0)
+		o.rotation_euler=(0,0,i*0.5)
+		source.objects.link(o)
+	cache={}
+	exported=[exporter.brush_from_object(o,1.0,cache) for o in (original,*duplicates)]
+	assert len(cache)==1 and all(b.polygons[0] is exported[0].polygons[0] for b in exported)
+	source.instance_offset=Vector((0,0,50))
+	instancer=bpy.data.objects.new("instancer",None)
+	instancer.instance_type="COLLECTION"
+	instancer.instance_collection=source
+	instancer.location=(0,1000,0)
+	bpy.context.scene.collection.objects.link(instancer)
+	stats={}
+	text=exporter.export([original,*duplicates,instancer],stats=stats)
+	brushes=list(t3d_parser.iter_brushes(text.splitlines(keepends=True)))
+	# The instancer counts as the brushes it makes.
+	assert len(brushes)==stats["brushes"]==8
+	assert [b.actor_name for b in brushes[4:]]==[f"instancer_{o.name}_1".lower() for o in (original,*duplicates)]
+	def world(b):
+		return numpy.array([importer.brush_matrix(b)@Vector(v.coords) for p in b.polygons for v in p.vertices])
+	for b,instanced in zip(brushes[:4],brushes[4:]):
+		assert numpy.allclose(world(b)+(0,1000,-50),world(instanced),atol=1e-2)
+	# Without instancers the depsgraph isn't evaluated.
+	monkeypatch.setattr(bpy.context,"evaluated_depsgraph_get",lambda:pytest.fail("depsgraph evaluated"))
+	assert exporter.brushes_from_instances([original,*duplicates])==[]
+	# Linked duplicates with materials linked to the object.
+	for o,name in zip(duplicates,("Red","Blue")):
+		material=bpy.data.materials.new(name)
+		for slot in o.material_slots:
+			slot.link="OBJECT"
+			slot.material=material
+	cache={}
+	exported=[exporter.brush_from_object(o,1.0,cache) for o in (original,*duplicates)]
+	assert len(cache)==3
+	assert [{p.texture for p in b.polygons} for b in exported[1:3]]==[{"Red"},{"Blue"}]
+	assert exported[3].polygons[0] is exported[0].polygons[0]
+
+def test_validate(monkeypatch)->None:
+	import exporter
+	import importer
+	def prism(name,outline,height=64,top=True):
+		bottom=[Vertex(x,y,0) for x,y in reversed(outline)]
+		faces=[bottom]+([[Vertex(x,y,height) for x,y in outline]] if top else [])
+		for (x0,y0),(x1,y1) in zip(outline,outline[1:]+outline[:1]):
+			faces.append([Vertex(x0,y0,0),Vertex(x1,y1,0),Vertex(x1,y1,height),Vertex(x0,y0,height)])
+		b=Brush([Polygon(f) for f in faces],(0,0,0))
+		b.actor_name=name
+		return b
+	square=[(0,0),(64,0),(64,64),(0,64)]
+	sheet=Brush([Polygon([Vertex(x,y,0) for x,y in square])],(0,0,0))
+	sheet.actor_name="sheet"
+	sheet.polyflags=t3d.PF_NOT_SOLID
+	brushes=[prism("box",square),prism("open",square,top=False),
+		prism("corner",[(0,0),(64,0),(64,32),(32,32),(32,64),(0,64)]),Brush(),sheet]
+	brushes[3].actor_name="empty"
+	report=t3d_validate.validate_brushes(brushes)
+	assert [(c.closed,c.convex,c.solid) for c in report.checks]==[(True,True,True),(False,True,True),(True,False,True),(False,True,True),(False,True,False)]
+	assert report.checks[2].concavity==32 and report.has_errors() and [c.name for c in report.invalid()]==["open","corner","empty"]
+	assert report.summary()=="Brushes: 5 brushes, 2 open, 1 concave, 1 non-solid."
+	cubes=t3d_parser.t3d_open("development/checkers/test_map.t3d")
+	assert not t3d_validate.validate_brushes(cubes).has_errors()
+	# Edges must pair up: an uncapped tube and a cube missing a face are open,
+	# a top split in two leaves T-junctions but is closed.
+	tube=prism("tube",square,top=False)
+	tube.polygons=tube.polygons[1:]
+	missing=prism("missing",square)
+	missing.polygons=missing.polygons[:-1]
+	split=prism("split",square)
+	split.polygons[1:2]=[Polygon([Vertex(x,y,64) for x,y in half]) for half in ([(0,0),(32,0),(32,64),(0,64)],[(32,0),(64,0),(64,64),(32,64)])]
+	checks=t3d_validate.validate_brushes([tube,missing,split]).checks
+	assert [c.closed for c in checks]==[False,False,True]
+	assert t3d_validate.validate_brushes([tube]).has_errors() and t3d_validate.validate_brushes([missing]).has_errors()
+	# Small batches give the same result.
+	monkeypatch.setattr(t3d_validate,"BATCH_SIZE",7)
+	assert t3d_validate.validate_brushes(brushes).checks==report.checks
+	collection=bpy.data.collections.new("validate")
+	objects=[importer.create_object(collection,b)[0] for b in (*brushes[:3],sheet)]
+	merged,_=importer.create_merged_object(collection,"merged",[sheet,*brushes[2::-1]],False)
+	checks=exporter.validate_objects([*objects,merged]).checks
+	expected=[(True,True,True),(False,True,True),(True,False,True),(False,True,False)]
+	assert [(c.closed,c.convex,c.solid) for c in checks[:4]]==[(c.closed,c.convex,c.solid) for c in checks[:3:-1]]==expected
+	assert [c.name for c in checks[4:]]==["sheet","corner","open","box"]
+
+def test_proxy_import()->None:
+	import exporter
+	import importer
+	path="development/checkers/test_map.t3d"
+	brushes=[b for b in t3d_parser.t3d_open(path) if b.group!="cube"]
+	for mode in importer.PROXY_MODES:
+		job=importer.ImportJob(bpy.context,path,False,1.0,False,mode)
+		job.step()
+		assert len(job.objects)==len(brushes)
+		for o,b in zip(job.objects,brushes):
+			assert o["t3d_actor"]==b.actor_name and o["t3d_proxy"]==mode[6:]
+			assert o.display_type==("WIRE" if b.csg=="csg_subtract" else "SOLID")
+			assert "uv_layers" not in o.data.attributes and len(o.data.uv_layers)==0
+			lo,hi=exporter.object_bounds(o)
+			world=numpy.array(importer.brush_matrix(b))
+			local=numpy.array([v.coords for p in b.polygons for v in p.vertices])
+			points=local@world[:3,:3].T+world[:3,3]
+			assert numpy.allclose(lo,points.min(axis=0),atol=1e-3) and numpy.allclose(hi,points.max(axis=0),atol=1e-3)
+		assert exporter.export(job.objects)==""
+		# Realize half, the rest stay proxies.
+		objects,_,not_found=importer.realize_proxies(job.objects[::2])
+		assert not not_found and [o.name.split(".")[0] for o in objects]==[b.actor_name for b in brushes[::2]]
+		assert all(not o.get("t3d_proxy") and len(o.data.polygons)==len(b.polygons) for o,b in zip(objects,brushes[::2]))
+		assert all(o in job.collection.objects for o in objects)
+		assert sum(bool(o.get("t3d_proxy")) for o in job.collection.objects)==len(brushes[1::2])
+
+def test_merged_import_steps()->None:
+	import importer
+	path="development/checkers/test_map.t3d"
+	bpy.reset()
+	job=importer.ImportJob(bpy.context,path,False,1.0,False,"MERGED")
+	steps:int=1
+	while not job.step(1e-4):
+		assert not job.objects
+		steps+=1
+	assert steps>1 and job.done==len(t3d_parser.t3d_open(path)) and not job.pending
+	expected=importer.ImportJob(bpy.context,path,False,1.0,False,"MERGED")
+	expected.step()
+	assert [len(o.data.polygons) for o in job.objects]==[len(o.data.polygons) for o in expected.objects]
+
+def test_import_error(tmp_path)->None:
+	import importer
+	text=open("development/checkers/test_map.t3d").read()
+	i=text.rfind("Begin Polygon")
+	bad=tmp_path/"bad.t3d"
+	bad.write_text(text[:i]+text[i:].replace("Begin Polygon","Begin Polygon Flags=abc",1))
+	bpy.reset()
+	for mode in ("OBJECTS","MERGED"):
+		try:
+			importer.import_t3d_file(bpy.context,str(bad),False,1.0,False,mode)
+			assert False
+		except ValueError:
+			pass
+		assert len(bpy.data.collections)==0 and len(bpy.data.objects)==0 and len(bpy.data.meshes)==0
+
+def test_diff(tmp_path)->None:
+	import random
+	brushes=t3d_parser.t3d_open("development/checkers/test_map.t3d")
+	old=tmp_path/"old.t3d"
+	old.write_text(f"Begin Map\n{''.join(str(b) for b in brushes)}End Map\n")
+	assert not t3d_diff.diff_files(old,old)
+	# Changes below tolerance and reordering aren't differences.
+	for b in brushes:
+		for p in b.polygons:
+			p.vertices=[Vertex(tuple(c+0.001 for c in v.coords)) for v in p.vertices[1:]+p.vertices[:1]]
+		random.Random(1).shuffle(b.polygons)
+	random.Random(2).shuffle(brushes)
+	by_name={b.actor_name:b for b in brushes}
+	by_name["brush3"].location=tuple(c+64 for c in by_name["brush3"].location)
+	by_name["brush4"].polygons[0].texture="other"
+	by_name["brush5"].polygons[0].vertices[0].x+=8
+	by_name["brush6"].csg="csg_subtract" if by_name["brush6"].csg=="csg_add" else "csg_add"
+	by_name["brush7"].actor_name="brush70"
+	by_name["brush8"].actor_name="brush80"
+	by_name["brush8"].location=tuple(c+64 for c in by_name["brush8"].location)
+	brushes.remove(by_name["brush9"])
+	added=Brush([Polygon([Vertex(0,0,0),Vertex(1,0,0),Vertex(0,1,0)])])
+	added.actor_name="brushnew"
+	brushes.append(added)
+	new=tmp_path/"new.t3d"
+	new.write_text(f"Begin Map\n{''.join(str(b) for b in brushes)}End Map\n")
+	report=t3d_diff.diff_files(old,new)
+	assert report.added==["brushnew"] and report.removed==["brush9"]
+	assert sorted(report.renamed)==[("brush7","brush70"),("brush8","brush80")]
+	assert report.changed=={"brush3":["moved"],"brush4":["retextured"],"brush5":["geometry"],"brush6":["csg"],"brush80":["moved"]}
+	assert report.counts()["unchanged"]==len(brushes)-7
+	with pytest.raises(SystemExit) as e:
+		t3d_diff.main([str(old),str(new)])
+	assert e.value.code==1